@@ -1,57 +1,69 @@
 import os
 import json
-import re
-from typing import Dict, Any
-import google.generativeai as genai
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterator
 from dotenv import load_dotenv
 
+from curriculum_stream import IncrementalCurriculumParser, curriculum_events
+from gemini_scheduler import gemini_scheduler, estimate_tokens, parse_retry_delay, GEMINI_SHARED_QUOTA
+from generated_store import generated_store, generated_key
+from shared_state import shared_state
+from domain_resolver import DomainResolver, DOMAIN_ALIASES
+from provider_cassette import cassette
+from metrics import track_llm_call, gemini_prompt_tokens_saved_total
+from outbound_scheduler import outbound_scheduler, OutboundRejected
+from schemas import CurriculumResponse, Course
+from json_extract import extract_json, validate_json
+from fast_json import JsonBody, dumps_bytes
+from event_log import log_event, error_dedup_key
+
 # Load environment variables
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# GEMINI_API_ENDPOINT points the client at another host (e.g. the benchmark stand-in server);
+# it implies the REST transport since plain-HTTP gRPC is not supported.
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
 
-if not GOOGLE_API_KEY:
-    raise ValueError("Missing GOOGLE_API_KEY in .env file!")
+# The Gemini SDK is imported and configured on first use of the AI tier: importing
+# google.generativeai takes most of a cold start, and the database and template tiers need
+# neither the SDK nor a key. Without GOOGLE_API_KEY the AI tier is skipped for the Smart Fallback.
+_genai = None
+_genai_lock = threading.Lock()
 
-# Configure Gemini
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
 
-def extract_json_from_response(text: str) -> dict:
-    """
-    Robustly extract valid JSON from LLM response.
-    Handles plain JSON, markdown code blocks, and embedded JSON.
-    """
-    if not text or not text.strip():
-        raise ValueError("Empty response")
+def _get_genai():
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                if not GOOGLE_API_KEY:
+                    raise ValueError("Missing GOOGLE_API_KEY in .env file!")
+                import google.generativeai as genai
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(api_key=GOOGLE_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+                else:
+                    genai.configure(api_key=GOOGLE_API_KEY)
+                _genai = genai
+    return _genai
 
-    # Try direct parsing first
-    try:
-        return json.loads(text.strip())
-    except json.JSONDecodeError:
-        pass
 
-    # Try to find JSON inside ```json ... ``` or ``` ... ```
-    code_block_match = re.search(r"```(?:json)?\s*({.*?})\s*```", text, re.DOTALL | re.IGNORECASE)
-    if code_block_match:
-        try:
-            return json.loads(code_block_match.group(1))
-        except json.JSONDecodeError:
-            pass
+def gemini_available() -> bool:
+    """True when the AI tier can run: a key is configured, or a provider cassette replays the calls."""
+    return bool(GOOGLE_API_KEY) or cassette.mode == "replay"
 
-    # Try to find the outermost {...} object
-    curly_match = re.search(r"({.*})", text, re.DOTALL)
-    if curly_match:
-        try:
-            return json.loads(curly_match.group(1))
-        except json.JSONDecodeError:
-            pass
-
-    raise ValueError("No valid JSON object found in response")
 
 # ==========================================
 # DATABASE-FIRST LOOKUP
 # ==========================================
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "curriculum_database.json")
+DATABASE_POLL_SECONDS = float(os.getenv("CURRICULUM_DB_POLL_SECONDS", "5"))
+# Serialized database hits kept in memory (LRU), keyed by every input that shapes the response
+SERIALIZED_CACHE_MAX_ENTRIES = int(os.getenv("SERIALIZED_CACHE_MAX_ENTRIES", "1024"))
 
 def load_curriculum_database() -> Dict[str, Any]:
     """Load the local curriculum database JSON file."""
@@ -62,54 +74,214 @@ def load_curriculum_database() -> Dict[str, Any]:
         print(f"Database load failed: {e}")
         return {}
 
-def lookup_curriculum_in_database(data: Dict[str, Any]) -> Dict[str, Any] | None:
+
+class CurriculumIndex:
     """
-    Check if a curriculum exists in the local database.
-    Returns the curriculum dict if found, None otherwise.
+    Read-only in-memory view of the curriculum database.
+    Built once per file version and swapped in whole, so readers never see a partial reload.
     """
-    db = load_curriculum_database()
-    
-    # Create lookup key: "program_type_domain"
+
+    def __init__(self, db: Dict[str, Any], mtime_ns: int | None = None):
+        self.mtime_ns = mtime_ns
+        # (program_type, domain) -> curriculum
+        self.by_key: Dict[tuple, Dict[str, Any]] = {}
+        # domain -> [program_type, ...]
+        self.by_domain: Dict[str, list] = {}
+
+        for raw_key, curriculum in db.items():
+            program_type, _, domain = raw_key.partition("_")
+            program_type = curriculum.get("program_type", program_type)
+            domain = curriculum.get("domain", domain)
+            self.by_key[(program_type, domain)] = curriculum
+            self.by_domain.setdefault(domain, []).append(program_type)
+
+    def get(self, program_type: str, domain: str) -> Dict[str, Any] | None:
+        return self.by_key.get((program_type, domain))
+
+    def programs_for_domain(self, domain: str) -> list:
+        return self.by_domain.get(domain, [])
+
+
+_database_index: CurriculumIndex | None = None  # built by preload_local_tiers() or on first use
+_serialized_cache: "OrderedDict[tuple, JsonBody]" = OrderedDict()
+_serialized_lock = threading.Lock()
+_database_reload_lock = threading.Lock()
+_database_watcher: threading.Thread | None = None
+
+
+def _database_mtime_ns() -> int | None:
+    try:
+        return os.stat(DATABASE_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def reload_curriculum_database(force: bool = False) -> bool:
+    """
+    Rebuild the in-memory index if the database file changed on disk.
+    Returns True when a new index was swapped in.
+    """
+    global _database_index
+    with _database_reload_lock:
+        mtime_ns = _database_mtime_ns()
+        if not force and _database_index is not None and mtime_ns == _database_index.mtime_ns:
+            return False
+        _database_index = CurriculumIndex(load_curriculum_database(), mtime_ns)
+        with _serialized_lock:
+            _serialized_cache.clear()
+        print(f"[DATABASE LOAD] Indexed {len(_database_index.by_key)} curricula from {DATABASE_PATH}")
+        # Database domains feed the resolver, so rebuild it alongside the index
+        _rebuild_domain_resolver()
+        return True
+
+
+def _watch_curriculum_database():
+    while True:
+        time.sleep(DATABASE_POLL_SECONDS)
+        try:
+            reload_curriculum_database()
+        except Exception as e:
+            print(f"Database reload failed: {e}")
+
+
+def start_curriculum_database_watcher():
+    """Start the background thread that hot-reloads the database when its mtime changes."""
+    global _database_watcher
+    if _database_watcher is not None or DATABASE_POLL_SECONDS <= 0:
+        return
+    _database_watcher = threading.Thread(target=_watch_curriculum_database, name="curriculum-db-watcher", daemon=True)
+    _database_watcher.start()
+
+
+def get_curriculum_index() -> CurriculumIndex:
+    """Return the current database index (no file I/O once loaded)."""
+    if _database_index is None:
+        reload_curriculum_database(force=True)
+    return _database_index
+
+
+def preload_local_tiers():
+    """Startup hook: index the curriculum database and start its hot-reload watcher."""
+    get_curriculum_index()
+    start_curriculum_database_watcher()
+
+
+
+def _lookup_curriculum(data: Dict[str, Any]) -> tuple:
+    """Database lookup that also reports which store answered: ("database" | "generated", curriculum)."""
     program_type = data.get("program_type", "")
     domain = data.get("domain", "")
     lookup_key = f"{program_type}_{domain}"
-    
-    if lookup_key in db:
+    entry = get_curriculum_index().get(program_type, domain)
+
+    if entry is not None:
         print(f"[DATABASE HIT] Found curriculum for: {lookup_key}")
-        curriculum = db[lookup_key].copy()
+        # Shallow copy: only top-level fields are overridden, nested course data is shared read-only
+        curriculum = dict(entry)
         
         # Override with user-specified values
         curriculum["academic_level"] = data.get("academic_level", curriculum.get("academic_level"))
         curriculum["total_semesters"] = min(data.get("duration_semesters", 8), curriculum.get("total_semesters", 8))
         curriculum["accreditation_aligned"] = f"Aligned with {data.get('accreditation_body', 'Global')} Standards"
         
-        return curriculum
+        return "database", curriculum
+    
+    # Previously generated AI curricula (keyed by every prompt parameter, so no overrides needed)
+    stored = generated_store.get(data)
+    if stored is not None:
+        age_hours = (time.time() - stored["created_at"]) / 3600
+        print(f"[GENERATED HIT] Reusing {stored['provenance']} curriculum for: {lookup_key} ({age_hours:.1f}h old)")
+        return "generated", stored["curriculum"]
     
     print(f"[DATABASE MISS] No match for: {lookup_key}, checking templates...")
-    return None
+    return None, None
 
-def generate_curriculum_with_gemini(data: Dict[str, Any]) -> Dict[str, Any]:
+
+def lookup_curriculum_in_database(data: Dict[str, Any]) -> Dict[str, Any] | None:
     """
-    Generate a full curriculum. 
-    Priority: 1) Local JSON Database → 2) Template Generator → 3) Gemini API → 4) Smart Fallback
+    Check if a curriculum exists in the local database or the generated-curricula store.
+    Returns the curriculum dict if found, None otherwise.
     """
-    # STEP 1: Check local JSON database first
-    db_result = lookup_curriculum_in_database(data)
+    return _lookup_curriculum(data)[1]
+
+
+def _serialized_database_hit(data: Dict[str, Any], curriculum: Dict[str, Any]) -> JsonBody:
+    """Database curricula only change on reload (which clears this cache), so serialize each variant once."""
+    key = (data.get("program_type"), data.get("domain"), data.get("academic_level"),
+           data.get("duration_semesters"), data.get("accreditation_body"))
+    with _serialized_lock:
+        body = _serialized_cache.get(key)
+        if body is not None:
+            _serialized_cache.move_to_end(key)
+            return body
+    body = dumps_bytes(curriculum)
+    with _serialized_lock:
+        _serialized_cache[key] = body
+        while len(_serialized_cache) > SERIALIZED_CACHE_MAX_ENTRIES:
+            _serialized_cache.popitem(last=False)
+    return body
+
+
+def resolve_local_tier(data: Dict[str, Any], as_bytes: bool = False) -> tuple:
+    """
+    Try the tiers that need no API call.
+    Returns (tier, curriculum) where tier is "database", "generated" or "template", or (None, None) on a miss.
+    With as_bytes=True the curriculum is returned as a JsonBody (serialized JSON with an ETag);
+    database and template hits then come straight from their pre-serialized caches.
+    """
+    # STEP 0: Map aliases/misspellings ("AI", "cyber security") onto a canonical domain
+    requested = data.get("domain", "")
+    domain_resolver = get_domain_resolver()
+    canonical, method = domain_resolver.resolve(requested)
+    resolved = canonical is not None and canonical != requested
+    if resolved:
+        print(f"[DOMAIN RESOLVED] '{requested}' -> '{canonical}' ({method})")
+        data = {**data, "domain": canonical}
+    
+    # STEP 1: Check local JSON database (and stored AI results) first
+    tier, db_result = _lookup_curriculum(data)
     if db_result:
-        return db_result
+        if resolved:
+            domain_resolver.record_rescue()
+        if as_bytes:
+            if tier == "database":
+                return tier, _serialized_database_hit(data, db_result)
+            return tier, dumps_bytes(db_result)
+        return tier, db_result
     
     # STEP 2: Use template-based generator (covers ALL domain combinations)
     try:
-        from curriculum_templates import generate_curriculum_from_template, DOMAIN_TEMPLATES
+        from curriculum_templates import generate_curriculum_from_template, generate_curriculum_template_bytes, DOMAIN_TEMPLATES
         domain = data.get("domain", "")
         if domain in DOMAIN_TEMPLATES:
             print(f"[TEMPLATE HIT] Generating from template for: {domain}")
-            return generate_curriculum_from_template(data)
+            if resolved:
+                domain_resolver.record_rescue()
+            if as_bytes:
+                return "template", generate_curriculum_template_bytes(data)
+            return "template", generate_curriculum_from_template(data)
     except ImportError:
         print("[TEMPLATE MISS] Template module not found, proceeding to AI")
     
-    # STEP 3: If not in templates, use Gemini API
-    prompt = f"""
+    return None, None
+
+
+def resolve_served_curriculum(data: Dict[str, Any], tier: str) -> JsonBody | None:
+    """
+    Re-derive the curriculum previously served for `data` by `tier`, without calling Gemini
+    (Gemini results are found in the generated store). None if it is no longer available.
+    """
+    if tier == "fallback":
+        return dumps_bytes(generate_mock_fallback(data))
+    _, body = resolve_local_tier(data, as_bytes=True)
+    if body is None and tier == "replay":
+        return dumps_bytes(generate_mock_fallback(data))
+    return body
+
+
+def build_gemini_prompt(data: Dict[str, Any]) -> str:
+    """Build the full curriculum-generation prompt for Gemini."""
+    return f"""
 You are an Elite Academic Curriculum Architect and Industry Strategist. 
 Generate a comprehensive, high-resolution academic program based on these parameters:
 
@@ -172,25 +344,469 @@ Output ONLY a single valid JSON object. Do not include markdown code blocks or e
 }}
 """
 
-    try:
-        # Using the latest Gemini 2.0 model for speed and robustness
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
 
+# ==========================================
+# STRUCTURED OUTPUT (COMPACT PROMPT)
+# ==========================================
+# "structured": short prompt + JSON response MIME type, plus a response schema for non-streamed calls.
+# "json": short prompt stating the shape in one line + JSON response MIME type, no schema (fewest input tokens).
+# "prompt": the original prose prompt with an example skeleton, answer scraped out of free text.
+GEMINI_OUTPUT_MODE = os.getenv("GEMINI_OUTPUT_MODE", "structured").lower()
+if GEMINI_OUTPUT_MODE not in ("structured", "json", "prompt"):
+    print(f"[GEMINI] Unknown GEMINI_OUTPUT_MODE '{GEMINI_OUTPUT_MODE}', using structured")
+    GEMINI_OUTPUT_MODE = "structured"
+
+
+def _to_gemini_schema(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate a pydantic JSON schema node into the OpenAPI subset Gemini accepts."""
+    if "$ref" in node:
+        return _to_gemini_schema(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+    if "anyOf" in node:  # Optional[X]
+        option = next(o for o in node["anyOf"] if o.get("type") != "null")
+        return {**_to_gemini_schema(option, defs), "nullable": True}
+    schema = {"type": node.get("type", "string")}
+    if "properties" in node:
+        schema["properties"] = {name: _to_gemini_schema(value, defs) for name, value in node["properties"].items()}
+        schema["required"] = list(node["properties"])  # ask for every field, defaults included
+    if "items" in node:
+        schema["items"] = _to_gemini_schema(node["items"], defs)
+    return schema
+
+
+def build_gemini_response_schema() -> Dict[str, Any]:
+    """
+    Gemini response schema derived from schemas.CurriculumResponse.
+    Gemini schemas cannot express maps, so courses_by_semester is requested as
+    "semesters": [{"semester": n, "courses": [...]}] and mapped back by _semesters_to_map().
+    """
+    curriculum = CurriculumResponse.model_json_schema()
+    course_schema = Course.model_json_schema()
+    course = _to_gemini_schema(course_schema, course_schema.get("$defs", {}))
+    schema = _to_gemini_schema(curriculum, curriculum.get("$defs", {}))
+    semesters = {"type": "array", "items": {
+        "type": "object",
+        "properties": {"semester": {"type": "integer"}, "courses": {"type": "array", "items": course}},
+        "required": ["semester", "courses"],
+    }}
+    schema["properties"] = {
+        ("semesters" if name == "courses_by_semester" else name): (semesters if name == "courses_by_semester" else value)
+        for name, value in schema["properties"].items()
+    }
+    schema["required"] = list(schema["properties"])
+    return schema
+
+
+GEMINI_RESPONSE_SCHEMA = build_gemini_response_schema()
+# The schema is sent with every structured request and counts towards its input tokens
+_SCHEMA_TOKENS = estimate_tokens(json.dumps(GEMINI_RESPONSE_SCHEMA, separators=(",", ":")))
+
+# Stated in the prompt when no schema is sent (json mode and streams). Streams always use it: the incremental
+# parser needs the root fields before courses_by_semester, and schema-constrained output is alphabetical.
+_COMPACT_SHAPE = (
+    "Return one JSON object with keys in this order: program_title, program_type, domain, academic_level, "
+    "total_semesters, program_rationale, target_careers[], accreditation_aligned, "
+    'courses_by_semester{"Semester 1":[course],...}, recommended_skills[], industry_alignment_notes, '
+    "optimization_tips[]. course = {course_code, course_name, category, description, credits, prerequisites[], "
+    "weekly_topics[{week,title,description,resources[]}], outcomes[{outcome,bloom_level,code}]}."
+)
+
+
+def build_compact_gemini_prompt(data: Dict[str, Any], with_schema: bool = True) -> str:
+    """Short curriculum prompt for the JSON output modes; the schema replaces the example skeleton."""
+    prompt = f"""Design a rigorous academic program.
+Program Type: {data['program_type']}
+Domain: {data['domain']}
+Academic Level: {data['academic_level']}
+Intended Duration: {data['duration_semesters']} semesters
+Accreditation Standard: {data['accreditation_body']}
+Requirements: 2026-era research and industry practice; course names and topics specific to {data['domain']}, no placeholders; 6-8 progressive weekly topics per course, each with a measurable target; a 2-paragraph program_rationale on the {data['domain']} skills gap; 5 target_careers with seniority; outcomes at Bloom's Analyze/Evaluate/Create levels with {data['accreditation_body']} PO/CO codes."""
+    if with_schema:
+        return prompt + f"\nInclude all {data['duration_semesters']} semesters."
+    return prompt + "\n" + _COMPACT_SHAPE
+
+
+def _gemini_request(data: Dict[str, Any], stream: bool = False) -> tuple:
+    """(prompt, generation_config, estimated input tokens) for the configured output mode."""
+    if GEMINI_OUTPUT_MODE == "prompt":
+        prompt = build_gemini_prompt(data)
+        return prompt, None, estimate_tokens(prompt)
+    if stream or GEMINI_OUTPUT_MODE == "json":
+        prompt = build_compact_gemini_prompt(data, with_schema=False)
+        return prompt, {"response_mime_type": "application/json"}, estimate_tokens(prompt)
+    prompt = build_compact_gemini_prompt(data)
+    config = {"response_mime_type": "application/json", "response_schema": GEMINI_RESPONSE_SCHEMA}
+    return prompt, config, estimate_tokens(prompt) + _SCHEMA_TOKENS
+
+
+def _semesters_to_map(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a schema-constrained answer back into the CurriculumResponse shape and field order."""
+    semesters = result.pop("semesters", None)
+    if semesters is not None and "courses_by_semester" not in result:
+        ordered = sorted(semesters, key=lambda s: s.get("semester") or 0)
+        result["courses_by_semester"] = {
+            f"Semester {s.get('semester') or i}": s.get("courses", []) for i, s in enumerate(ordered, 1)
+        }
+    ordered_result = {name: result[name] for name in CurriculumResponse.model_fields if name in result}
+    ordered_result.update((k, v) for k, v in result.items() if k not in ordered_result)
+    return ordered_result
+
+
+def _prompt_savings(data: Dict[str, Any], estimated: int, prompt_tokens: int | None) -> Dict[str, Any]:
+    """
+    Input tokens saved against the prose prompt, for the event log and metrics. The baseline is
+    estimated (~4 chars/token); usage reported by Gemini is preferred for the compact request.
+    """
+    if GEMINI_OUTPUT_MODE == "prompt":
+        return {"output_mode": GEMINI_OUTPUT_MODE, "prompt_tokens": prompt_tokens}
+    baseline = estimate_tokens(build_gemini_prompt(data))
+    used = prompt_tokens or estimated
+    saved = baseline - used
+    if saved > 0:
+        gemini_prompt_tokens_saved_total.inc(saved, mode=GEMINI_OUTPUT_MODE)
+    return {"output_mode": GEMINI_OUTPUT_MODE, "prompt_tokens": used,
+            "prompt_tokens_baseline": baseline, "prompt_tokens_saved": saved}
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _log_ai_failure(e: Exception, started: float, stream: bool = False):
+    """Queue a structured failure record (the background writer formats the traceback)."""
+    log_event(
+        "gemini_failure", logging.WARNING, exc=e, dedup_key=error_dedup_key("gemini_failure", e),
+        tier="fallback", model=GEMINI_MODEL_NAME, stream=stream, latency_ms=_elapsed_ms(started),
+        error_class=type(e).__name__, error=str(e)[:500], retry_delay=parse_retry_delay(e),
+    )
+    print(f"[GEMINI FAILED] {type(e).__name__}, switching to Smart Fallback")
+
+
+def _log_ai_skipped(reason: str, stream: bool = False):
+    log_event("gemini_skipped", logging.WARNING, dedup_key=error_dedup_key("gemini_skipped", Exception(reason)),
+              tier="fallback", model=GEMINI_MODEL_NAME, stream=stream, reason=reason)
+    print(f"[GEMINI SKIPPED] {reason}, using Smart Fallback")
+
+
+def _cassette_request(prompt: str, generation_config: Dict[str, Any] | None, stream: bool = False) -> Dict[str, Any]:
+    request = {"model": GEMINI_MODEL_NAME, "prompt": prompt}
+    if generation_config:
+        request["output"] = "schema" if "response_schema" in generation_config else "json"
+    if stream:
+        request["stream"] = True
+    return request
+
+
+def _gemini_generate(prompt: str, generation_config: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    One Gemini call returning {"text", "prompt_tokens", "completion_tokens"}
+    (recorded/replayed when a provider cassette is active).
+    """
+    def live():
+        response = _get_genai().GenerativeModel(GEMINI_MODEL_NAME).generate_content(prompt, generation_config=generation_config)
         if not response or not response.text:
             raise ValueError("No response from AI")
+        usage = response.usage_metadata
+        return {"text": response.text, "prompt_tokens": usage.prompt_token_count,
+                "completion_tokens": usage.candidates_token_count}
+
+    with track_llm_call("gemini", "ai_engine", GEMINI_MODEL_NAME) as call:
+        result = cassette.call("gemini", _cassette_request(prompt, generation_config), live)
+        call.status = 200
+        call.tokens(result.get("prompt_tokens"), result.get("completion_tokens"))
+    return result
+
+
+def _gemini_stream_text(prompt: str, generation_config: Dict[str, Any] | None = None,
+                        usage: Dict[str, int] | None = None) -> Iterator[str]:
+    """
+    Streaming Gemini call yielding text chunks (recorded/replayed when a provider cassette is active).
+    Token counts land in `usage` ("prompt", "completion") when the stream finishes.
+    """
+    usage = {} if usage is None else usage
+
+    def live():
+        for chunk in _get_genai().GenerativeModel(GEMINI_MODEL_NAME).generate_content(
+                prompt, generation_config=generation_config, stream=True):
+            # Usage is cumulative; the last chunk carries the totals
+            if chunk.usage_metadata and chunk.usage_metadata.candidates_token_count:
+                usage["prompt"] = chunk.usage_metadata.prompt_token_count
+                usage["completion"] = chunk.usage_metadata.candidates_token_count
+            yield chunk.text
+
+    with track_llm_call("gemini", "ai_engine", GEMINI_MODEL_NAME) as call:
+        yield from cassette.stream("gemini", _cassette_request(prompt, generation_config, stream=True), live)
+        call.status = 200
+        call.tokens(usage.get("prompt"), usage.get("completion"))
+
+
+def generate_curriculum_with_tier(data: Dict[str, Any], max_wait: float | None = None) -> tuple:
+    """
+    Generate a full curriculum and report which tier served it.
+    Priority: 1) Local JSON Database → 2) Stored AI Results → 3) Template Generator → 4) Gemini API → 5) Smart Fallback
+    Returns (tier, curriculum). max_wait overrides how long to wait for Gemini quota (batch callers wait longer).
+    """
+    tier, local_result = resolve_local_tier(data)
+    if local_result:
+        return tier, local_result
+    return generate_ai_tier(data, max_wait)
+
+
+# ==========================================
+# CROSS-WORKER GENERATION LEASES
+# ==========================================
+# How long a worker waits for another worker generating the same curriculum before calling Gemini itself.
+# Kept under typical 30-60 s client/proxy timeouts: waiting longer than the client does helps nobody.
+GENERATION_LEASE_WAIT = float(os.getenv("GENERATION_LEASE_WAIT", "30"))
+# Polls start fast (a peer may be about to finish) and back off towards GENERATION_LEASE_POLL_MAX
+GENERATION_LEASE_POLL_MIN = 0.05
+GENERATION_LEASE_POLL_MAX = 2.0
+
+
+def _claim_generation(data: Dict[str, Any]) -> tuple:
+    """
+    Claim the host-wide lease for generating `data`, so identical requests on different workers
+    make one Gemini call. Returns (lease, stored): `stored` is the curriculum another worker wrote
+    while we waited; `lease` is None when there is nothing to release (sharing off, unavailable,
+    or the wait timed out and we proceed anyway).
+    """
+    if not GEMINI_SHARED_QUOTA:
+        return None, None
+    key = generated_key(data)
+    deadline = time.monotonic() + GENERATION_LEASE_WAIT
+    poll = GENERATION_LEASE_POLL_MIN
+    while True:
+        try:
+            owner = shared_state.acquire_lease(key)
+        except sqlite3.Error as e:
+            print(f"[GENERATION LEASE] Unavailable, generating without coordination: {e}")
+            return None, None
+        stored = generated_store.get(data)
+        if stored is not None:
+            # A peer finished between our lookup and the claim
+            if owner is not None:
+                _release_generation((key, owner))
+            return None, stored["curriculum"]
+        if owner is not None:
+            return (key, owner), None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None, None
+        time.sleep(min(poll, remaining))
+        poll = min(poll * 2, GENERATION_LEASE_POLL_MAX)
+
+
+def _release_generation(lease: tuple | None):
+    if lease is None:
+        return
+    try:
+        shared_state.release_lease(*lease)
+    except sqlite3.Error as e:
+        print(f"[GENERATION LEASE] Release failed (expires on its own): {e}")
+
+
+def generate_ai_tier(data: Dict[str, Any], max_wait: float | None = None) -> tuple:
+    """Gemini with Smart Fallback. Returns ("gemini" | "generated" | "fallback", curriculum)."""
+    lease, stored = _claim_generation(data)
+    if stored is not None:
+        return "generated", stored
+    try:
+        return _generate_ai_tier(data, max_wait)
+    finally:
+        _release_generation(lease)
+
+
+def _generate_ai_tier(data: Dict[str, Any], max_wait: float | None) -> tuple:
+    # STEP 4: If not in templates, use Gemini API (when configured, and quota and circuit allow)
+    if not gemini_available():
+        _log_ai_skipped("GOOGLE_API_KEY not set")
+        return "fallback", generate_mock_fallback(data)
+    prompt, generation_config, estimated = _gemini_request(data)
+    # Quota first, then the outbound slot: waiting for the window (minutes for batch callers) holds no slot
+    admitted, reason = gemini_scheduler.acquire(estimated, max_wait)
+    if not admitted:
+        _log_ai_skipped(reason)
+        return "fallback", generate_mock_fallback(data)
+    try:
+        with outbound_scheduler.slot("gemini", GEMINI_MODEL_NAME, "ai_engine"):
+            return _call_gemini_tier(data, prompt, generation_config, estimated)
+    except OutboundRejected as e:
+        # Local admission control, not a Gemini failure: hand the quota back and serve the fallback
+        gemini_scheduler.refund(estimated)
+        _log_ai_skipped(str(e))
+        return "fallback", generate_mock_fallback(data)
 
-        result = extract_json_from_response(response.text)
-        return result
 
+def _call_gemini_tier(data: Dict[str, Any], prompt: str, generation_config: Dict[str, Any] | None,
+                      estimated: int) -> tuple:
+    started = time.perf_counter()
+    try:
+        # Using the latest Gemini 2.0 model for speed and robustness
+        response = _gemini_generate(prompt, generation_config)
+        if generation_config and "response_schema" in generation_config:
+            result = validate_json(_semesters_to_map(extract_json(response["text"])), CurriculumResponse)
+        else:
+            result = extract_json(response["text"], CurriculumResponse)
+        gemini_scheduler.record_success()
+        log_event("gemini_generation", tier="gemini", model=GEMINI_MODEL_NAME, latency_ms=_elapsed_ms(started),
+                  **_prompt_savings(data, estimated, response.get("prompt_tokens")))
+        # Write-through so the next identical request is served from the store
+        generated_store.put(data, result, GEMINI_MODEL_NAME)
+        return "gemini", result
+
+    except Exception as e:
+        gemini_scheduler.record_failure(e)
+        _log_ai_failure(e, started)
+        return "fallback", generate_mock_fallback(data)
+
+
+def generate_curriculum_with_gemini(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a full curriculum. 
+    Priority: 1) Local JSON Database → 2) Stored AI Results → 3) Template Generator → 4) Gemini API → 5) Smart Fallback
+    """
+    return generate_curriculum_with_tier(data)[1]
+
+
+def stream_curriculum_with_gemini(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of generate_curriculum_with_gemini.
+    Yields "program", "semester" and "complete" events; Gemini output is parsed incrementally
+    so each semester is emitted as soon as its JSON closes.
+    """
+    tier, local_result = resolve_local_tier(data)
+    if local_result:
+        yield from curriculum_events(local_result, tier)
+        return
+
+    lease, stored = _claim_generation(data)
+    if stored is not None:
+        yield from curriculum_events(stored, "generated")
+        return
+    try:
+        yield from _stream_ai_tier(data)
+    finally:
+        _release_generation(lease)
+
+
+def _stream_ai_tier(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    if not gemini_available():
+        _log_ai_skipped("GOOGLE_API_KEY not set", stream=True)
+        yield from curriculum_events(generate_mock_fallback(data), "fallback")
+        return
+    prompt, generation_config, estimated = _gemini_request(data, stream=True)
+    admitted, reason = gemini_scheduler.acquire(estimated)
+    if not admitted:
+        _log_ai_skipped(reason, stream=True)
+        yield from curriculum_events(generate_mock_fallback(data), "fallback")
+        return
+    try:
+        with outbound_scheduler.slot("gemini", GEMINI_MODEL_NAME, "ai_engine"):
+            yield from _stream_gemini_tier(data, prompt, generation_config, estimated)
+    except OutboundRejected as e:
+        # Only the slot raises this, before anything has been emitted
+        gemini_scheduler.refund(estimated)
+        _log_ai_skipped(str(e), stream=True)
+        yield from curriculum_events(generate_mock_fallback(data), "fallback")
+
+
+def _stream_gemini_tier(data: Dict[str, Any], prompt: str, generation_config: Dict[str, Any] | None,
+                        estimated: int) -> Iterator[Dict[str, Any]]:
+    parser = IncrementalCurriculumParser()
+    usage: Dict[str, int] = {}
+    emitted = False
+    started = time.perf_counter()
+    try:
+        for text in _gemini_stream_text(prompt, generation_config, usage):
+            for event in parser.feed(text):
+                if event["event"] == "program":
+                    event = {"event": "program", "tier": "gemini", **{k: v for k, v in event.items() if k != "event"}}
+                emitted = True
+                yield event
+        result = validate_json(parser.result(), CurriculumResponse)
+        gemini_scheduler.record_success()
+        log_event("gemini_generation", tier="gemini", model=GEMINI_MODEL_NAME, stream=True,
+                  latency_ms=_elapsed_ms(started), **_prompt_savings(data, estimated, usage.get("prompt")))
+        generated_store.put(data, result, GEMINI_MODEL_NAME)
     except Exception as e:
-        import traceback
-        # Write to a persistent log for debugging
-        with open("ai_debug.log", "a") as f:
-            f.write(f"\n--- AI FAILURE ---\n{str(e)}\n{traceback.format_exc()}\n")
-        print(f"AI generation path failed, switching to Smart Fallback. See ai_debug.log")
-        return generate_mock_fallback(data)
+        gemini_scheduler.record_failure(e)
+        _log_ai_failure(e, started, stream=True)
+        if emitted:
+            # Partial AI output already sent: tell the client to discard it
+            yield {"event": "reset", "reason": "AI generation failed mid-stream"}
+        yield from curriculum_events(generate_mock_fallback(data), "fallback")
+
+
+# Domain Knowledge Map (Granular), used by the Smart Fallback
+FALLBACK_KNOWLEDGE_MAP = {
+    # Specialized Tech Domains
+    "ai": {
+        "foundations": ["Linear Algebra for ML", "Probability & Statistics", "Python for AI"],
+        "core": ["Machine Learning Fundamentals", "Deep Learning Architectures", "Natural Language Processing", "Computer Vision"],
+        "advanced": ["Reinforcement Learning", "Generative AI", "AI Ethics & Governance", "Edge AI"],
+        "topics": ["Neural Network Backpropagation", "Transformer Models", "CNN & RNN Architectures", "Gradient Descent Optimization", "Large Language Models", "Federated Learning"]
+    },
+    "data_science": {
+        "foundations": ["Statistics & Probability", "Data Wrangling with Pandas", "SQL Mastery"],
+        "core": ["Exploratory Data Analysis", "Machine Learning for DS", "Data Visualization", "Feature Engineering"],
+        "advanced": ["Big Data Analytics", "Time Series Forecasting", "MLOps & Deployment", "A/B Testing"],
+        "topics": ["Regression Analysis", "Clustering Algorithms", "Hypothesis Testing", "Dashboard Design", "Data Pipelines", "Model Interpretability"]
+    },
+    "cybersecurity": {
+        "foundations": ["Networking Fundamentals", "Operating System Security", "Cryptography Basics"],
+        "core": ["Ethical Hacking", "Security Operations", "Cloud Security", "Threat Intelligence"],
+        "advanced": ["Penetration Testing", "Incident Response", "Zero Trust Architecture", "Security Automation"],
+        "topics": ["OWASP Top 10", "Firewall Configuration", "SIEM Analysis", "Malware Analysis", "Identity Management", "Vulnerability Assessment"]
+    },
+    "vlsi": {
+        "foundations": ["Digital Electronics", "CMOS Technology", "Verilog HDL"],
+        "core": ["ASIC Design Flow", "FPGA Programming", "Physical Design", "Timing Analysis"],
+        "advanced": ["Low Power Design", "Design for Testability", "SoC Architecture", "Nanoscale CMOS"],
+        "topics": ["Synthesis & Optimization", "Floor Planning", "Clock Tree Synthesis", "RTL Verification", "Static Timing Analysis", "Power Grid Analysis"]
+    },
+    # General Tech
+    "tech": {
+        "foundations": ["Computational Logic", "Data Structures", "Algorithm Design"],
+        "core": ["System Architecture", "Database Management", "Software Engineering", "Network Security"],
+        "advanced": ["Machine Learning", "Distributed Systems", "Cloud Computing", "AI Ethics"],
+        "topics": ["Asymptotic Analysis", "SQL Optimization", "Concurrent Programming", "Microservices", "API Integration", "Scalability Patterns"]
+    },
+    # Business
+    "business": {
+        "foundations": ["Microeconomics", "Business Communication", "Accounting Principles"],
+        "core": ["Strategic Marketing", "Financial Management", "Operations Logistics", "Organizational Behavior"],
+        "advanced": ["Corporate Governance", "Market Analytics", "International Finance", "Entrepreneurship"],
+        "topics": ["Supply Chain Optimization", "SWOT Analysis", "Regression Modeling", "Crisis Management", "Venture Capital Valuation", "ESG Standards"]
+    },
+    # Health
+    "health": {
+        "foundations": ["Anatomy & Physiology", "Medical Terminology", "Health Psychology"],
+        "core": ["Pathophysiology", "Pharmacology", "Clinical Assessment", "Epidemiology"],
+        "advanced": ["Health Informatics", "Biostatistics", "Medical Ethics", "Healthcare Policy"],
+        "topics": ["Patient Centered Care", "Molecular Diagnosis", "Drug Interaction Analysis", "HIPAA Compliance", "Global Health Trends", "Clinical Protocol Design"]
+    },
+    # Engineering
+    "engineering": {
+        "foundations": ["Engineering Mathematics", "Solid Mechanics", "Thermodynamics"],
+        "core": ["Fluid Dynamics", "Control Systems", "Material Science", "CAD/CAM Modeling"],
+        "advanced": ["Robotics Engineering", "Finite Element Analysis", "Structural Integrity", "Sustainable Design"],
+        "topics": ["Stress-Strain Analysis", "Kinematics", "Heat Transfer", "Mechatronics", "Failure Mode Analysis", "Lean Manufacturing"]
+    },
+    # Science
+    "science": {
+        "foundations": ["Scientific Method", "Calculus for Science", "Experimental Techniques"],
+        "core": ["Quantitative Analysis", "Organic Chemistry", "Quantum Mechanics", "Genetics"],
+        "advanced": ["Nanotechnology", "Astrobiology", "Particle Physics", "Environmental Ethics"],
+        "topics": ["Spectroscopy", "Statistical Thermodynamics", "Genetic Sequencing", "Subatomic Particles", "Ecosystem Dynamics", "Chemical Equilibrium"]
+    }
+}
 
+# Priority-1 keywords for the specialized categories (checked in order, substring match)
+FALLBACK_CATEGORY_KEYWORDS = {
+    "ai": ["artificial intelligence", " ai ", "ai/ml", "machine learning", "deep learning"],
+    "data_science": ["data science", "data analytics", "big data"],
+    "cybersecurity": ["cyber", "security", "ethical hack", "infosec"],
+    "vlsi": ["vlsi", "asic", "fpga", "chip design", "semiconductor"],
+}
 
 def generate_mock_fallback(data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -202,82 +818,14 @@ def generate_mock_fallback(data: Dict[str, Any]) -> Dict[str, Any]:
     level = data.get("academic_level", "Undergraduate")
     semesters = min(data.get("duration_semesters", 4), 8)
     
-    # Domain Knowledge Map (Granular)
-    knowledge_map = {
-        # Specialized Tech Domains
-        "ai": {
-            "foundations": ["Linear Algebra for ML", "Probability & Statistics", "Python for AI"],
-            "core": ["Machine Learning Fundamentals", "Deep Learning Architectures", "Natural Language Processing", "Computer Vision"],
-            "advanced": ["Reinforcement Learning", "Generative AI", "AI Ethics & Governance", "Edge AI"],
-            "topics": ["Neural Network Backpropagation", "Transformer Models", "CNN & RNN Architectures", "Gradient Descent Optimization", "Large Language Models", "Federated Learning"]
-        },
-        "data_science": {
-            "foundations": ["Statistics & Probability", "Data Wrangling with Pandas", "SQL Mastery"],
-            "core": ["Exploratory Data Analysis", "Machine Learning for DS", "Data Visualization", "Feature Engineering"],
-            "advanced": ["Big Data Analytics", "Time Series Forecasting", "MLOps & Deployment", "A/B Testing"],
-            "topics": ["Regression Analysis", "Clustering Algorithms", "Hypothesis Testing", "Dashboard Design", "Data Pipelines", "Model Interpretability"]
-        },
-        "cybersecurity": {
-            "foundations": ["Networking Fundamentals", "Operating System Security", "Cryptography Basics"],
-            "core": ["Ethical Hacking", "Security Operations", "Cloud Security", "Threat Intelligence"],
-            "advanced": ["Penetration Testing", "Incident Response", "Zero Trust Architecture", "Security Automation"],
-            "topics": ["OWASP Top 10", "Firewall Configuration", "SIEM Analysis", "Malware Analysis", "Identity Management", "Vulnerability Assessment"]
-        },
-        "vlsi": {
-            "foundations": ["Digital Electronics", "CMOS Technology", "Verilog HDL"],
-            "core": ["ASIC Design Flow", "FPGA Programming", "Physical Design", "Timing Analysis"],
-            "advanced": ["Low Power Design", "Design for Testability", "SoC Architecture", "Nanoscale CMOS"],
-            "topics": ["Synthesis & Optimization", "Floor Planning", "Clock Tree Synthesis", "RTL Verification", "Static Timing Analysis", "Power Grid Analysis"]
-        },
-        # General Tech
-        "tech": {
-            "foundations": ["Computational Logic", "Data Structures", "Algorithm Design"],
-            "core": ["System Architecture", "Database Management", "Software Engineering", "Network Security"],
-            "advanced": ["Machine Learning", "Distributed Systems", "Cloud Computing", "AI Ethics"],
-            "topics": ["Asymptotic Analysis", "SQL Optimization", "Concurrent Programming", "Microservices", "API Integration", "Scalability Patterns"]
-        },
-        # Business
-        "business": {
-            "foundations": ["Microeconomics", "Business Communication", "Accounting Principles"],
-            "core": ["Strategic Marketing", "Financial Management", "Operations Logistics", "Organizational Behavior"],
-            "advanced": ["Corporate Governance", "Market Analytics", "International Finance", "Entrepreneurship"],
-            "topics": ["Supply Chain Optimization", "SWOT Analysis", "Regression Modeling", "Crisis Management", "Venture Capital Valuation", "ESG Standards"]
-        },
-        # Health
-        "health": {
-            "foundations": ["Anatomy & Physiology", "Medical Terminology", "Health Psychology"],
-            "core": ["Pathophysiology", "Pharmacology", "Clinical Assessment", "Epidemiology"],
-            "advanced": ["Health Informatics", "Biostatistics", "Medical Ethics", "Healthcare Policy"],
-            "topics": ["Patient Centered Care", "Molecular Diagnosis", "Drug Interaction Analysis", "HIPAA Compliance", "Global Health Trends", "Clinical Protocol Design"]
-        },
-        # Engineering
-        "engineering": {
-            "foundations": ["Engineering Mathematics", "Solid Mechanics", "Thermodynamics"],
-            "core": ["Fluid Dynamics", "Control Systems", "Material Science", "CAD/CAM Modeling"],
-            "advanced": ["Robotics Engineering", "Finite Element Analysis", "Structural Integrity", "Sustainable Design"],
-            "topics": ["Stress-Strain Analysis", "Kinematics", "Heat Transfer", "Mechatronics", "Failure Mode Analysis", "Lean Manufacturing"]
-        },
-        # Science
-        "science": {
-            "foundations": ["Scientific Method", "Calculus for Science", "Experimental Techniques"],
-            "core": ["Quantitative Analysis", "Organic Chemistry", "Quantum Mechanics", "Genetics"],
-            "advanced": ["Nanotechnology", "Astrobiology", "Particle Physics", "Environmental Ethics"],
-            "topics": ["Spectroscopy", "Statistical Thermodynamics", "Genetic Sequencing", "Subatomic Particles", "Ecosystem Dynamics", "Chemical Equilibrium"]
-        }
-    }
-
     # Granular Categorization Engine
     category = "tech"  # Default
     
     # Priority 1: Direct keyword match for specific popular domains
-    if any(k in domain_raw for k in ["artificial intelligence", " ai ", "ai/ml", "machine learning", "deep learning"]):
-        category = "ai"
-    elif any(k in domain_raw for k in ["data science", "data analytics", "big data"]):
-        category = "data_science"
-    elif any(k in domain_raw for k in ["cyber", "security", "ethical hack", "infosec"]):
-        category = "cybersecurity"
-    elif any(k in domain_raw for k in ["vlsi", "asic", "fpga", "chip design", "semiconductor"]):
-        category = "vlsi"
+    specific = next((cat for cat, keywords in FALLBACK_CATEGORY_KEYWORDS.items()
+                     if any(k in domain_raw for k in keywords)), None)
+    if specific:
+        category = specific
     # Priority 2: General category match
     elif any(k in domain_raw for k in ["busin", "manag", "mba", "marke", "finan", "econo"]):
         category = "business"
@@ -288,7 +836,7 @@ def generate_mock_fallback(data: Dict[str, Any]) -> Dict[str, Any]:
     elif any(k in domain_raw for k in ["scien", "phys", "chem", "math"]):
         category = "science"
     
-    sector = knowledge_map.get(category, knowledge_map["tech"])
+    sector = FALLBACK_KNOWLEDGE_MAP.get(category, FALLBACK_KNOWLEDGE_MAP["tech"])
     domain_proper = data.get("domain", "Advanced Technology")
 
     courses_by_semester = {}
@@ -364,4 +912,30 @@ def generate_mock_fallback(data: Dict[str, Any]) -> Dict[str, Any]:
             f"Increase focus on sustainability and lifecycle management within the {domain_proper} framework.",
             f"Adopt a cross-disciplinary approach by integrating modules from related fields."
         ]
-    }
\ No newline at end of file
+    }
+
+
+# ==========================================
+# DOMAIN RESOLUTION + STARTUP
+# ==========================================
+_domain_resolver: DomainResolver | None = None
+
+
+def _rebuild_domain_resolver():
+    """Build the resolver from template domains, database domains and the curated alias table."""
+    global _domain_resolver
+    try:
+        from curriculum_templates import DOMAIN_TEMPLATES
+        canonical = set(DOMAIN_TEMPLATES)
+    except ImportError:
+        canonical = set()
+    canonical.update(_database_index.by_domain)
+
+    previous = _domain_resolver.stats if _domain_resolver is not None else None
+    _domain_resolver = DomainResolver(canonical, DOMAIN_ALIASES, stats=previous)
+
+
+def get_domain_resolver() -> DomainResolver:
+    if _domain_resolver is None:
+        get_curriculum_index()  # loading the database builds the resolver
+    return _domain_resolver
@@ -0,0 +1,124 @@
+"""Microbenchmark for json_extract.extract_json against the previous regex-based extractor.
+
+The corpus is built from real curricula (curriculum_database.json) and, with --cassette, the
+Gemini/OpenRouter responses recorded in a provider cassette. Each document is rendered the ways
+LLMs actually return it: clean, fenced, wrapped in chatty prose, with trailing commas, and
+truncated. Reports success rate and mean time per call for each extractor and variant:
+
+    python benchmarks/json_extract_bench.py
+    python benchmarks/json_extract_bench.py --cassette cassettes/providers.jsonl --repeat 200
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from json_extract import extract_json, JsonExtractionError  # noqa: E402
+
+
+def legacy_extract(text: str) -> dict:
+    """The extractor json_extract replaced (three json.loads attempts and a greedy regex)."""
+    if not text or not text.strip():
+        raise ValueError("Empty response")
+    try:
+        return json.loads(text.strip())
+    except json.JSONDecodeError:
+        pass
+    code_block_match = re.search(r"```(?:json)?\s*({.*?})\s*```", text, re.DOTALL | re.IGNORECASE)
+    if code_block_match:
+        try:
+            return json.loads(code_block_match.group(1))
+        except json.JSONDecodeError:
+            pass
+    curly_match = re.search(r"({.*})", text, re.DOTALL)
+    if curly_match:
+        try:
+            return json.loads(curly_match.group(1))
+        except json.JSONDecodeError:
+            pass
+    raise ValueError("No valid JSON object found in response")
+
+
+def _variants(document: str) -> dict:
+    pretty = json.dumps(json.loads(document), indent=2)
+    return {
+        "clean": pretty,
+        "fenced": f"```json\n{pretty}\n```",
+        "chatty": f"Here is the curriculum you asked for {{as JSON}}:\n```json\n{pretty}\n```\nLet me know {{anything}} else!",
+        "trailing_commas": re.sub(r"(\]|\}|\")(\s*\n\s*)(\]|\})", r"\1,\2\3", pretty),
+        "truncated": pretty[: int(len(pretty) * 0.9)],
+    }
+
+
+def load_corpus(cassette_path: str | None) -> list:
+    documents = []
+    with open(os.path.join(REPO_ROOT, "curriculum_database.json"), encoding="utf-8") as f:
+        documents.extend(json.dumps(curriculum) for curriculum in json.load(f).values())
+    if cassette_path:
+        with open(cassette_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                response = entry.get("response")
+                if entry["provider"] == "gemini" and response:
+                    text = response["text"]
+                elif entry["provider"] == "openrouter" and response:
+                    text = json.loads(response["body"])["choices"][0]["message"]["content"]
+                else:
+                    continue
+                try:
+                    documents.append(json.dumps(extract_json(text)))
+                except JsonExtractionError:
+                    continue
+    corpus = []
+    for document in documents:
+        corpus.extend(_variants(document).items())
+    return corpus
+
+
+def run(corpus: list, repeat: int) -> dict:
+    results = {}
+    for name, fn in (("legacy", legacy_extract), ("extract_json", extract_json)):
+        for variant, text in corpus:
+            stats = results.setdefault((name, variant), {"ok": 0, "total": 0, "seconds": 0.0})
+            started = time.perf_counter()
+            for _ in range(repeat):
+                try:
+                    fn(text)
+                    ok = True
+                except ValueError:
+                    ok = False
+            stats["seconds"] += time.perf_counter() - started
+            stats["total"] += 1
+            stats["ok"] += ok
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", help="also use responses recorded in this provider cassette")
+    parser.add_argument("--repeat", type=int, default=50, help="calls per document")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.cassette)
+    # Repairs are printed by the extractor; keep the report readable
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results = run(corpus, args.repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+
+    print(f"{len(corpus)} documents, {args.repeat} calls each\n")
+    print(f"{'extractor':<14}{'variant':<18}{'parsed':>10}{'mean us':>12}")
+    for (name, variant), stats in results.items():
+        mean_us = stats["seconds"] / (stats["total"] * args.repeat) * 1e6
+        print(f"{name:<14}{variant:<18}{stats['ok']:>5}/{stats['total']:<4}{mean_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""End-to-end load test for the CurrHub API.
+
+Starts the OpenRouter and Gemini stand-ins (stub_servers.py), launches the app under uvicorn
+pointed at them (with throwaway cache/store files), drives every endpoint in main.py at the
+configured concurrency and reports RPS and p50/p95/p99 latency per endpoint and per generation
+tier. Results are written as JSON so runs can be compared across commits:
+
+    python benchmarks/load_test.py --requests 100 --concurrency 20 --latency-ms 400
+    python benchmarks/load_test.py --only generate --compare benchmarks/results/<previous>.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import httpx
+
+from stub_servers import OpenRouterHandler, GeminiHandler, start_stub, add_stub_arguments, stub_config_from_args
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# Request mix for the generation endpoints, one per tier the app can serve from
+GENERATION_REQUESTS = {
+    "database": {"program_type": "B.Tech", "domain": "Artificial Intelligence"},
+    "template": {"program_type": "MBA", "domain": "Human Resources"},
+    "alias": {"program_type": "B.Tech", "domain": "cyber security"},
+    "ai": {"program_type": "M.Tech", "domain": "Underwater Robotics"},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+        return rev + ("-dirty" if dirty else "") if rev else "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+# ==========================================
+# SCENARIOS
+# ==========================================
+def generation_payload(i: int, mix: list, repeat: bool, salt: str = "") -> tuple:
+    """(expected tier label, request body) for the i-th generation request."""
+    label = mix[i % len(mix)]
+    body = {"academic_level": "Undergraduate", "duration_semesters": 8, "accreditation_body": "NAAC",
+            **GENERATION_REQUESTS[label]}
+    if label == "ai" and not repeat:
+        # Unique per scenario and request, so every call misses the stored-result tier
+        body["domain"] = f"{body['domain']} {salt}{i}"
+    return label, body
+
+
+def build_scenarios(args) -> list:
+    """Each scenario: (name, method, path, kind, body_fn). kind picks how the response is read."""
+    mix = [label for label in args.generate_mix.split(",") if label]
+    suffix = (lambda i: "") if args.repeat_inputs else (lambda i: f" #{i}")
+    pages = [(f"GET {path}", "GET", path, "page", None) for path in ("/", "/generate", "/gap", "/about", "/contact")]
+    return pages + [
+        ("POST /generate", "POST", "/generate", "generate",
+         lambda i: generation_payload(i, mix, args.repeat_inputs, "g")[1]),
+        ("POST /generate/stream", "POST", "/generate/stream", "ndjson",
+         lambda i: generation_payload(i, mix, args.repeat_inputs, "s")[1]),
+        ("POST /generate/bulk", "POST", "/generate/bulk", "ndjson",
+         lambda i: [generation_payload(i * 5 + k, mix, args.repeat_inputs, "b")[1] for k in range(5)]),
+        ("POST /chat", "POST", "/chat", "json",
+         lambda i: {"message": f"What is a credit hour?{suffix(i)}"}),
+        ("POST /chat/stream", "POST", "/chat/stream", "sse",
+         lambda i: {"message": f"Explain outcome-based education.{suffix(i)}"}),
+        ("POST /generate-syllabus", "POST", "/generate-syllabus", "json",
+         lambda i: {"course_name": f"Machine Learning{suffix(i)}", "program": "B.Tech", "domain": "Artificial Intelligence"}),
+        ("POST /analyze-gap", "POST", "/analyze-gap", "json",
+         lambda i: {"curriculum_summary": f"Python, statistics, databases{suffix(i)}",
+                    "job_description": "Data engineer: Spark, Airflow, SQL, cloud."}),
+        ("POST /get-resources", "POST", "/get-resources", "json",
+         lambda i: {"course_name": f"Computer Networks{suffix(i)}", "domain": "Computer Science"}),
+        ("POST /program-bundle", "POST", "/program-bundle", "ndjson",
+         lambda i: {"database_key": "B.Tech_Data Science", "include_resources": i % 2 == 0}),
+        ("GET /cache-stats", "GET", "/cache-stats", "json", None),
+        ("GET /gemini-status", "GET", "/gemini-status", "json", None),
+        ("GET /domain-stats", "GET", "/domain-stats", "json", None),
+        ("GET /metrics", "GET", "/metrics", "page", None),
+    ]
+
+
+# ==========================================
+# DRIVER
+# ==========================================
+async def timed_request(client: httpx.AsyncClient, method: str, path: str, kind: str, body) -> dict:
+    """Send one request; returns status, total latency, time to first body byte and serving tier."""
+    started = time.perf_counter()
+    ttfb, tier = None, None
+    try:
+        async with client.stream(method, path, json=body) as response:
+            chunks = []
+            async for chunk in response.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - started
+                chunks.append(chunk)
+            status = response.status_code
+            if kind == "generate":
+                tier = response.headers.get("X-Curriculum-Tier")
+            elif kind == "ndjson" and path == "/generate/stream" and status == 200:
+                first = b"".join(chunks).split(b"\n", 1)[0]
+                tier = json.loads(first).get("tier") if first else None
+    except httpx.HTTPError as e:
+        return {"status": type(e).__name__, "latency": time.perf_counter() - started, "ttfb": None, "tier": None}
+    return {"status": status, "latency": time.perf_counter() - started, "ttfb": ttfb, "tier": tier}
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: tuple, requests: int, concurrency: int) -> tuple:
+    """Run `requests` calls at `concurrency`; returns (samples, wall seconds)."""
+    name, method, path, kind, body_fn = scenario
+    next_index = iter(range(requests))
+    samples = []
+
+    async def worker():
+        for i in next_index:
+            samples.append(await timed_request(client, method, path, kind, body_fn(i) if body_fn else None))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    return samples, time.perf_counter() - started
+
+
+def percentile(sorted_values: list, pct: float) -> float | None:
+    """Nearest-rank percentile."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples: list, wall: float) -> dict:
+    latencies = sorted(s["latency"] * 1000 for s in samples)
+    ttfbs = sorted(s["ttfb"] * 1000 for s in samples if s["ttfb"] is not None)
+    statuses = {}
+    for s in samples:
+        statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+    ok = sum(1 for s in samples if isinstance(s["status"], int) and s["status"] < 400)
+    ms = lambda v: round(v, 2) if v is not None else None
+    return {
+        "requests": len(samples),
+        "ok": ok,
+        "errors": len(samples) - ok,
+        "status_codes": statuses,
+        "rps": round(len(samples) / wall, 2) if wall else None,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "ttfb_p50_ms": ms(percentile(ttfbs, 50)),
+        "ttfb_p95_ms": ms(percentile(ttfbs, 95)),
+    }
+
+
+def summarize_tiers(samples: list, wall: float) -> dict:
+    by_tier = {}
+    for s in samples:
+        if s["tier"]:
+            by_tier.setdefault(s["tier"], []).append(s)
+    return {tier: summarize(group, wall) for tier, group in sorted(by_tier.items())}
+
+
+# ==========================================
+# APP PROCESS
+# ==========================================
+def start_app(args, openrouter_port: int, gemini_port: int, workdir: str) -> tuple:
+    port = args.app_port or free_port()
+    env = {
+        **os.environ,
+        "OPENROUTER_URL": f"http://127.0.0.1:{openrouter_port}/api/v1/chat/completions",
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{gemini_port}",
+        # Placeholder keys: nothing leaves the machine, and real keys from .env are never sent
+        "GOOGLE_API_KEY": "benchmark",
+        "OPENROUTER_API_KEY": "benchmark",
+        "GAP_API_KEY": "benchmark",
+        "SYLLABUS_API_KEY": "benchmark",
+        "RESOURCE_API_KEY": "benchmark",
+        "RESPONSE_CACHE_PATH": os.path.join(workdir, "response_cache.sqlite3"),
+        "GENERATED_STORE_PATH": os.path.join(workdir, "generated_curricula.sqlite3"),
+        "AI_LOG_PATH": os.path.join(workdir, "ai_events.jsonl"),
+        "PYTHONUNBUFFERED": "1",
+    }
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    log_path = os.path.join(workdir, "app.log")
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]
+    log = open(log_path, "w")
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, port, log_path
+
+
+def wait_until_ready(port: int, process: subprocess.Popen, log_path: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited with code {process.returncode}; see {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/gemini-status", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"App did not become ready in {timeout:.0f}s; see {log_path}")
+
+
+# ==========================================
+# REPORTING
+# ==========================================
+def print_report(results: dict, baseline: dict | None):
+    header = f"{'endpoint':<34}{'req':>6}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'Δp50':>9}{'Δrps':>9}"
+    print("\n" + header + "\n" + "-" * len(header))
+
+    def row(label, stats, base):
+        fmt = lambda v: f"{v:.1f}" if v is not None else "-"
+        line = (f"{label:<34}{stats['requests']:>6}{stats['errors']:>5}{fmt(stats['rps']):>9}"
+                f"{fmt(stats['p50_ms']):>9}{fmt(stats['p95_ms']):>9}{fmt(stats['p99_ms']):>9}")
+        if baseline:
+            delta = lambda key: (f"{(stats[key] - base[key]) / base[key] * 100:+.0f}%"
+                                 if base and base.get(key) and stats.get(key) is not None else "-")
+            line += f"{delta('p50_ms'):>9}{delta('rps'):>9}"
+        print(line)
+
+    base_endpoints = (baseline or {}).get("endpoints", {})
+    base_tiers = (baseline or {}).get("tiers", {})
+    for name, stats in results["endpoints"].items():
+        row(name, stats, base_endpoints.get(name))
+        for tier, tier_stats in results["tiers"].get(name, {}).items():
+            row(f"  tier={tier}", tier_stats, base_tiers.get(name, {}).get(tier))
+    print(f"\nUpstream calls: {results['upstream']}")
+
+
+async def drive(args, port: int) -> tuple:
+    scenarios = [s for s in build_scenarios(args) if not args.only or re.search(args.only, s[0])]
+    endpoints, tiers = {}, {}
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits) as client:
+        for scenario in scenarios:
+            name = scenario[0]
+            if args.warmup:
+                await run_scenario(client, scenario, args.warmup, args.concurrency)
+            samples, wall = await run_scenario(client, scenario, args.requests, args.concurrency)
+            endpoints[name] = summarize(samples, wall)
+            tier_stats = summarize_tiers(samples, wall)
+            if tier_stats:
+                tiers[name] = tier_stats
+            print(f"[BENCH] {name}: {endpoints[name]['rps']} rps, p95 {endpoints[name]['p95_ms']} ms, "
+                  f"{endpoints[name]['errors']} errors")
+    return endpoints, tiers
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test every CurrHub endpoint against local LLM stand-ins.")
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=0, help="unmeasured requests per endpoint before measuring")
+    parser.add_argument("--only", default="", help="regex selecting endpoints, e.g. 'generate|chat'")
+    parser.add_argument("--generate-mix", default="database,template,alias,ai",
+                        help="comma-separated request kinds cycled by generation endpoints: " + ",".join(GENERATION_REQUESTS))
+    parser.add_argument("--repeat-inputs", action="store_true",
+                        help="reuse identical inputs so caches and stored AI results are hit")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--app-port", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="client timeout per request (seconds)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the app, e.g. --env GEMINI_RPM_LIMIT=1000")
+    parser.add_argument("--output", default="", help="results JSON path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", default="", help="previous results JSON to compare against")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the app log and cache files")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    unknown = set(args.generate_mix.split(",")) - set(GENERATION_REQUESTS) - {""}
+    if unknown:
+        parser.error(f"unknown --generate-mix kinds: {', '.join(sorted(unknown))}")
+
+    stub_config = stub_config_from_args(args)
+    openrouter_port, gemini_port = free_port(), free_port()
+    _, openrouter_stats = start_stub(OpenRouterHandler, openrouter_port, stub_config)
+    _, gemini_stats = start_stub(GeminiHandler, gemini_port, stub_config)
+
+    workdir = tempfile.mkdtemp(prefix="currhub-bench-")
+    process, port, log_path = start_app(args, openrouter_port, gemini_port, workdir)
+    try:
+        wait_until_ready(port, process, log_path)
+        endpoints, tiers = asyncio.run(drive(args, port))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"App log and cache files kept in {workdir}")
+
+    revision = git_revision()
+    results = {
+        "meta": {
+            "revision": revision,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "endpoints": endpoints,
+        "tiers": tiers,
+        "upstream": {"openrouter": openrouter_stats.snapshot(), "gemini": gemini_stats.snapshot()},
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
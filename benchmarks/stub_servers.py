@@ -0,0 +1,295 @@
+"""Local stand-ins for the OpenRouter and Gemini APIs, used by the load-test suite.
+
+Both servers answer in the real wire formats (OpenRouter chat completions with SSE streaming,
+Gemini REST generateContent / streamGenerateContent), with configurable latency, jitter,
+error rate and 429 rate. Run standalone to point a dev server at them:
+
+    python benchmarks/stub_servers.py --openrouter-port 18089 --gemini-port 18090 --latency-ms 300
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 300.0      # base time to first byte
+    jitter_ms: float = 100.0       # uniform +/- jitter added to the latency
+    error_rate: float = 0.0        # fraction of calls answered with HTTP 500
+    rate_429: float = 0.0          # fraction of calls answered with HTTP 429
+    retry_after: float = 2.0       # retry delay advertised on 429s (seconds)
+    stream_chunks: int = 8         # chunks per streamed response
+    chunk_delay_ms: float = 20.0   # delay between streamed chunks
+
+
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+    def add(self, key: str):
+        with self._lock:
+            self.counts["calls"] += 1
+            self.counts[key] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+# ==========================================
+# CANNED CONTENT
+# ==========================================
+_PROMPT_FIELDS = {
+    "program_type": (r"Program Type:\s*(.+)", "B.Tech"),
+    "domain": (r"Domain:\s*(.+)", "General Studies"),
+    "academic_level": (r"Academic Level:\s*(.+)", "Undergraduate"),
+    "duration_semesters": (r"Duration:\s*(\d+)", "4"),
+    "accreditation_body": (r"Accreditation[^:\n]*:\s*(.+)", "NAAC"),
+}
+
+
+def fake_curriculum(prompt: str) -> dict:
+    """A schema-valid curriculum shaped by the parameters found in a curriculum prompt."""
+    fields = {}
+    for name, (pattern, default) in _PROMPT_FIELDS.items():
+        match = re.search(pattern, prompt)
+        fields[name] = match.group(1).strip() if match else default
+    semesters = max(1, min(int(fields["duration_semesters"]), 12))
+    domain = fields["domain"]
+    courses_by_semester = {}
+    for sem in range(1, semesters + 1):
+        courses_by_semester[f"Semester {sem}"] = [
+            {
+                "course_code": f"BEN{sem}{i:02d}",
+                "course_name": f"{domain} Topic {sem}.{i}",
+                "category": "Core" if i < 3 else "Elective",
+                "description": f"Benchmark course {i} of semester {sem} for {domain}.",
+                "credits": 4,
+                "weekly_topics": [
+                    {"week": w, "title": f"Week {w}", "description": f"Material for week {w}.", "resources": ["Stub reading"]}
+                    for w in range(1, 5)
+                ],
+                "outcomes": [{"outcome": "Apply core concepts", "bloom_level": "Apply", "code": "CO1"}],
+                "prerequisites": [],
+            }
+            for i in range(1, 4)
+        ]
+    return {
+        "program_title": f"{fields['program_type']} in {domain}",
+        "program_type": fields["program_type"],
+        "domain": domain,
+        "academic_level": fields["academic_level"],
+        "total_semesters": semesters,
+        "program_rationale": "Generated by the benchmark stand-in server.",
+        "target_careers": ["Engineer", "Analyst"],
+        "accreditation_aligned": fields["accreditation_body"],
+        "courses_by_semester": courses_by_semester,
+        "recommended_skills": ["Problem solving"],
+        "industry_alignment_notes": "Stub output.",
+        "optimization_tips": ["None"],
+    }
+
+
+def fake_chat_reply(messages: list) -> str:
+    system = messages[0].get("content", "") if messages else ""
+    user = messages[-1].get("content", "") if messages else ""
+    if "resource" in system.lower():
+        return '```json\n' + json.dumps({
+            "moocs": [{"title": "Stub MOOC", "platform": "Coursera", "url": "https://example.com"}],
+            "books": [{"title": "Stub Book", "author": "A. Author"}],
+            "youtube": [{"title": "Stub Playlist", "url": "https://example.com"}],
+        }) + '\n```'
+    return f"Stub reply ({len(user)} chars of input). " + "Lorem ipsum dolor sit amet. " * 20
+
+
+def _split(text: str, parts: int) -> list:
+    size = max(1, len(text) // max(1, parts) + 1)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# ==========================================
+# HANDLERS
+# ==========================================
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StubConfig
+    stats: StubStats
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _simulate(self) -> str:
+        """Sleep for the configured latency; pick the outcome ("ok", "errors" or "rate_limited")."""
+        cfg = self.config
+        delay = cfg.latency_ms + random.uniform(-cfg.jitter_ms, cfg.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+        roll = random.random()
+        if roll < cfg.rate_429:
+            outcome = "rate_limited"
+        elif roll < cfg.rate_429 + cfg.error_rate:
+            outcome = "errors"
+        else:
+            outcome = "ok"
+        self.stats.add(outcome)
+        return outcome
+
+    def _chunk_pause(self):
+        time.sleep(self.config.chunk_delay_ms / 1000)
+
+
+class OpenRouterHandler(_StubHandler):
+    def do_POST(self):
+        body = self._read_json()
+        outcome = self._simulate()
+        if outcome == "rate_limited":
+            return self._send_json(429, {"error": {"message": "Rate limit exceeded", "code": 429}},
+                                   {"Retry-After": str(int(self.config.retry_after))})
+        if outcome == "errors":
+            return self._send_json(500, {"error": {"message": "Stub upstream error", "code": 500}})
+
+        content = fake_chat_reply(body.get("messages", []))
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        if body.get("stream"):
+            self._begin_stream("text/event-stream")
+            for piece in _split(content, self.config.stream_chunks):
+                event = {"choices": [{"delta": {"content": piece}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                self._chunk_pause()
+            self._chunk(b"data: [DONE]\n\n")
+            return self._end_stream()
+        self._send_json(200, {
+            "id": "stub", "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                      "total_tokens": prompt_tokens + len(content) // 4},
+        })
+
+
+class GeminiHandler(_StubHandler):
+    """Answers /v1beta/models/<model>:generateContent and :streamGenerateContent."""
+
+    @staticmethod
+    def _candidate(text: str, finished: bool) -> dict:
+        candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finished:
+            candidate["finishReason"] = 1  # STOP (the client asks for integer enums)
+        return candidate
+
+    def do_POST(self):
+        body = self._read_json()
+        outcome = self._simulate()
+        if outcome == "rate_limited":
+            delay = self.config.retry_after
+            return self._send_json(429, {"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED",
+                "message": f"Resource has been exhausted (e.g. check quota). Please retry in {delay}s.",
+            }})
+        if outcome == "errors":
+            return self._send_json(500, {"error": {"code": 500, "status": "INTERNAL", "message": "Stub upstream error"}})
+
+        prompt = "".join(
+            part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+        )
+        curriculum = fake_curriculum(prompt)
+        config = body.get("generationConfig") or body.get("generation_config") or {}
+        schema = config.get("responseSchema") or config.get("response_schema") or {}
+        if "semesters" in schema.get("properties", {}):
+            # Structured-output mode: semesters come back as an array (see ai_engine.build_gemini_response_schema)
+            courses = curriculum.pop("courses_by_semester")
+            curriculum["semesters"] = [{"semester": int(name.split()[-1]), "courses": items} for name, items in courses.items()]
+        text = json.dumps(curriculum, indent=2)
+        usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                 "totalTokenCount": (len(prompt) + len(text)) // 4}
+
+        if ":streamGenerateContent" in self.path:
+            # REST streaming is a JSON array sent element by element
+            pieces = _split(text, self.config.stream_chunks)
+            self._begin_stream("application/json")
+            self._chunk(b"[")
+            for i, piece in enumerate(pieces):
+                last = i == len(pieces) - 1
+                element = {"candidates": [self._candidate(piece, last)]}
+                if last:
+                    element["usageMetadata"] = usage
+                self._chunk((("," if i else "") + json.dumps(element)).encode())
+                self._chunk_pause()
+            self._chunk(b"]")
+            return self._end_stream()
+        self._send_json(200, {"candidates": [self._candidate(text, True)], "usageMetadata": usage})
+
+
+def start_stub(handler: type, port: int, config: StubConfig) -> tuple:
+    """Serve `handler` on 127.0.0.1:port in a daemon thread. Returns (server, stats)."""
+    stats = StubStats()
+    bound = type(handler.__name__, (handler,), {"config": config, "stats": stats})
+    server = ThreadingHTTPServer(("127.0.0.1", port), bound)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    defaults = StubConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-429", type=float, default=defaults.rate_429)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--stream-chunks", type=int, default=defaults.stream_chunks)
+    parser.add_argument("--chunk-delay-ms", type=float, default=defaults.chunk_delay_ms)
+
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(**{field: getattr(args, field) for field in asdict(StubConfig())})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the OpenRouter and Gemini stand-in servers.")
+    parser.add_argument("--openrouter-port", type=int, default=18089)
+    parser.add_argument("--gemini-port", type=int, default=18090)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    config = stub_config_from_args(args)
+    start_stub(OpenRouterHandler, args.openrouter_port, config)
+    start_stub(GeminiHandler, args.gemini_port, config)
+    print(f"OpenRouter stand-in: OPENROUTER_URL=http://127.0.0.1:{args.openrouter_port}/api/v1/chat/completions")
+    print(f"Gemini stand-in:     GEMINI_API_ENDPOINT=http://127.0.0.1:{args.gemini_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
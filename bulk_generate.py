@@ -0,0 +1,226 @@
+"""Bulk curriculum generation: HTTP helper and CLI.
+
+Local tiers (database, stored AI results, templates) run across a process pool; requests that
+miss them go to Gemini with bounded async concurrency under the quota scheduler, falling back to
+the Smart Fallback. Results stream out as JSONL, one line per item, in completion order.
+
+    python bulk_generate.py requests.csv -o curricula.jsonl --processes 4 --gemini-concurrency 2
+"""
+import os
+import csv
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, AsyncIterator, Iterable
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from schemas import CurriculumRequest
+from request_dedup import normalize_curriculum_request
+
+load_dotenv()
+
+BULK_PROCESSES = int(os.getenv("BULK_PROCESSES", str(os.cpu_count() or 2)))
+BULK_GEMINI_CONCURRENCY = int(os.getenv("BULK_GEMINI_CONCURRENCY", "2"))
+# Batch jobs wait for Gemini quota instead of shedding to the fallback immediately; capped at one
+# quota window, after which only an open circuit could still be in the way
+BULK_GEMINI_MAX_WAIT = min(float(os.getenv("BULK_GEMINI_MAX_WAIT", "60")), 60.0)
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+
+# ==========================================
+# INPUT PARSING
+# ==========================================
+def parse_csv(text: str) -> List[Dict[str, Any]]:
+    """CSV with a header row naming CurriculumRequest fields."""
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def parse_json(text: str) -> List[Dict[str, Any]]:
+    """A JSON list, an object with a "requests" list, or JSONL."""
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(payload, dict):
+        payload = payload.get("requests", [payload])
+    if not isinstance(payload, list):
+        raise ValueError(f"expected a list of requests or an object, got {type(payload).__name__}")
+    return payload
+
+
+def validate_items(raw_items: Iterable[Dict[str, Any]]) -> List[tuple]:
+    """Returns [(index, normalized request dict or None, error or None)]."""
+    items = []
+    for index, raw in enumerate(raw_items):
+        try:
+            request = CurriculumRequest(**raw)
+        except (ValidationError, TypeError) as e:
+            items.append((index, None, str(e)[:200]))
+            continue
+        items.append((index, normalize_curriculum_request(request.dict()), None))
+    return items
+
+
+# ==========================================
+# WORKERS
+# ==========================================
+def _local_worker(data: Dict[str, Any]) -> tuple:
+    """Runs in a pool process. Returns (tier or None, serialized curriculum or None, elapsed_ms)."""
+    from ai_engine import resolve_local_tier
+    started = time.perf_counter()
+    tier, body = resolve_local_tier(data, as_bytes=True)
+    return tier, body.decode("utf-8") if body is not None else None, (time.perf_counter() - started) * 1000
+
+
+def _ai_worker(data: Dict[str, Any]) -> tuple:
+    """Runs in a thread of the parent process so it shares the Gemini quota scheduler."""
+    from ai_engine import generate_ai_tier
+    from outbound_scheduler import outbound_priority
+    started = time.perf_counter()
+    token = outbound_priority.set("batch")
+    try:
+        tier, result = generate_ai_tier(data, max_wait=BULK_GEMINI_MAX_WAIT)
+    finally:
+        outbound_priority.reset(token)
+    return tier, json.dumps(result, ensure_ascii=False, separators=(",", ":")), (time.perf_counter() - started) * 1000
+
+
+def _line(index: int, request: Dict[str, Any] | None, **fields) -> str:
+    """Assemble one JSONL line; an already-serialized curriculum is spliced in without re-encoding."""
+    curriculum = fields.pop("curriculum", None)
+    head = json.dumps({"index": index, "request": request, **fields}, ensure_ascii=False)
+    if curriculum is None:
+        return head + "\n"
+    return head[:-1] + ',"curriculum":' + curriculum + "}\n"
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _new_pool(processes: int) -> ProcessPoolExecutor:
+    # "spawn" keeps workers independent of the server's threads and event loop
+    return ProcessPoolExecutor(max_workers=max(1, processes), mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_bulk_pool() -> ProcessPoolExecutor:
+    """Long-lived pool for the HTTP endpoint, so each call does not pay worker start-up."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _new_pool(BULK_PROCESSES)
+        return _pool
+
+
+def shutdown_bulk_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def run_bulk(
+    items: List[tuple],
+    processes: int = BULK_PROCESSES,
+    gemini_concurrency: int = BULK_GEMINI_CONCURRENCY,
+    pool: ProcessPoolExecutor | None = None,
+) -> AsyncIterator[tuple]:
+    """
+    Yield (tier, JSONL line) as items complete; tier is None for failed items.
+    Without a `pool`, a temporary one of `processes` workers is created for this run.
+    """
+    loop = asyncio.get_running_loop()
+    gemini_slots = asyncio.Semaphore(max(1, gemini_concurrency))
+
+    for index, data, error in items:
+        if error is not None:
+            yield None, _line(index, None, tier=None, status="error", error=error)
+
+    async def local(index, data):
+        try:
+            return index, data, *await loop.run_in_executor(pool, _local_worker, data)
+        except Exception as e:
+            return index, data, None, e, 0.0
+
+    async def ai(index, data, local_ms):
+        try:
+            async with gemini_slots:
+                tier, body, elapsed = await asyncio.to_thread(_ai_worker, data)
+        except Exception as e:
+            return index, data, None, e, local_ms
+        return index, data, tier, body, local_ms + elapsed
+
+    owned = pool is None
+    if owned:
+        pool = _new_pool(min(processes, sum(1 for item in items if item[2] is None)))
+    pending = {asyncio.create_task(local(index, data)) for index, data, error in items if error is None}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, data, tier, body, elapsed = task.result()
+                if isinstance(body, Exception):
+                    yield None, _line(index, data, tier=None, status="error", error=str(body)[:200])
+                elif body is None:
+                    # Missed every local tier: queue for Gemini
+                    pending.add(asyncio.create_task(ai(index, data, elapsed)))
+                else:
+                    yield tier, _line(index, data, tier=tier, status="ok", elapsed_ms=round(elapsed, 1), curriculum=body)
+    finally:
+        for task in pending:
+            task.cancel()
+        if owned:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ==========================================
+# CLI
+# ==========================================
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate curricula in bulk from a CSV/JSON/JSONL request file.")
+    parser.add_argument("input", help="CSV with a header row, JSON list, or JSONL of CurriculumRequest fields ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output path (default: stdout)")
+    parser.add_argument("--processes", type=int, default=BULK_PROCESSES, help="process pool size for local tiers")
+    parser.add_argument("--gemini-concurrency", type=int, default=BULK_GEMINI_CONCURRENCY, help="concurrent Gemini calls")
+    args = parser.parse_args(argv)
+
+    try:
+        text = sys.stdin.read() if args.input == "-" else open(args.input, encoding="utf-8").read()
+        raw_items = parse_csv(text) if args.input.lower().endswith(".csv") else parse_json(text)
+    except (ValueError, csv.Error) as e:
+        parser.error(f"could not parse {args.input}: {e}")
+    items = validate_items(raw_items)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    tiers: Dict[str, int] = {}
+    started = time.perf_counter()
+
+    async def drive():
+        async for tier, line in run_bulk(items, args.processes, args.gemini_concurrency):
+            out.write(line)
+            out.flush()
+            tiers[tier or "error"] = tiers.get(tier or "error", 0) + 1
+
+    try:
+        asyncio.run(drive())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Generated {len(items)} items in {time.perf_counter() - started:.1f}s: {tiers}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
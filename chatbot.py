@@ -1,13 +1,19 @@
 """Chatbot module for curriculum assistance using OpenRouter API."""
 import os
 import json
-import requests
+from typing import AsyncIterator
+
+import httpx
 from dotenv import load_dotenv
 
+from openrouter_client import post_chat_completion, stream_chat_completion, OpenRouterStreamError
+from outbound_scheduler import OutboundRejected
+from response_cache import make_cache_key, cache_get, cache_set
+
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "openai/gpt-4o-mini"
 
 SYSTEM_PROMPT = """You are CurrBot, an expert curriculum assistant for CurrHub - an AI-powered curriculum generation platform.
 
@@ -37,44 +43,95 @@ For other programs, provide typical curriculum structure based on standard patte
 Keep responses clear and structured. Use bullet points for lists."""
 
 
-def get_chat_response(user_message: str, conversation_history: list = None) -> str:
+async def get_chat_response(user_message: str, conversation_history: list = None) -> str:
     """Generate a chat response using OpenRouter API."""
     
     # Check if API key is set
     if not OPENROUTER_API_KEY or OPENROUTER_API_KEY == "your_openrouter_api_key_here":
         return "⚠️ Please set your OPENROUTER_API_KEY in the .env file. Get one free at openrouter.ai"
     
+    cache_key = make_cache_key("chatbot", MODEL, SYSTEM_PROMPT, user_message)
+    cached = await cache_get("chatbot", cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8000",
-            "X-Title": "CurrHub"
-        }
-        
         messages = [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_message}
         ]
         
         payload = {
-            "model": "openai/gpt-4o-mini",
+            "model": MODEL,
             "messages": messages,
             "max_tokens": 500,
             "temperature": 0.7
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=20)
+        response = await post_chat_completion(OPENROUTER_API_KEY, payload, "CurrHub", timeout=20, module="chatbot")
         
         if response.status_code == 200:
             data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
+            reply = data["choices"][0]["message"]["content"].strip()
+            await cache_set("chatbot", cache_key, reply)
+            return reply
         elif response.status_code == 402:
             return "⚠️ No credits. Add credits at openrouter.ai/credits"
         else:
             return f"⚠️ API error {response.status_code}"
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return "Response timed out. Please try again."
+    except OutboundRejected:
+        raise
     except Exception as e:
         return f"Error: {str(e)[:100]}"
+
+
+async def stream_chat_response(user_message: str) -> AsyncIterator[str]:
+    """Stream a chat response token-by-token using OpenRouter's streaming API."""
+    
+    if not OPENROUTER_API_KEY or OPENROUTER_API_KEY == "your_openrouter_api_key_here":
+        yield "⚠️ Please set your OPENROUTER_API_KEY in the .env file. Get one free at openrouter.ai"
+        return
+    
+    cache_key = make_cache_key("chatbot", MODEL, SYSTEM_PROMPT, user_message)
+    cached = await cache_get("chatbot", cache_key)
+    if cached is not None:
+        yield cached
+        return
+    
+    payload = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_message}
+        ],
+        "max_tokens": 500,
+        "temperature": 0.7
+    }
+    
+    parts = []
+    try:
+        async for delta in stream_chat_completion(OPENROUTER_API_KEY, payload, "CurrHub", timeout=20, module="chatbot"):
+            parts.append(delta)
+            yield delta
+    except OpenRouterStreamError as e:
+        if e.status_code == 402:
+            yield "⚠️ No credits. Add credits at openrouter.ai/credits"
+        else:
+            yield f"⚠️ API error {e.status_code}"
+        return
+    except httpx.TimeoutException:
+        yield "Response timed out. Please try again."
+        return
+    except OutboundRejected as e:
+        yield f"⚠️ The assistant is busy right now. Please try again in {e.retry_after}s."
+        return
+    except Exception as e:
+        yield f"Error: {str(e)[:100]}"
+        return
+    
+    reply = "".join(parts).strip()
+    if reply:
+        await cache_set("chatbot", cache_key, reply)
@@ -0,0 +1,166 @@
+"""gzip/brotli response compression negotiated from Accept-Encoding.
+
+CompressionMiddleware compresses complete (non-streamed) JSON and HTML responses of at least
+COMPRESSION_MIN_BYTES. Streamed responses (NDJSON, SSE) pass through untouched so events are not
+held back in a compressor buffer. Bodies with a strong ETag never change, so their compressed forms
+are cached by ETag; the ETag itself gets an encoding suffix ("<hash>-br"), which fast_json.etag_matches
+understands, so conditional requests still produce 304s. Every JSON/HTML response carries
+Vary: Accept-Encoding, compressed or not, so shared caches keep the representations apart.
+Brotli is used when the package is installed.
+"""
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "512"))
+COMPRESSIBLE_TYPES = ("application/json", "text/html")
+
+# Preferred first when the client weighs them equally
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_stats = {"compressed": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Pick br or gzip from an Accept-Encoding header (honouring q-values); None means identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """Compress body; static=True uses maximum settings (for assets compressed once at startup)."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if static else COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if static else COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """A distinct strong ETag per encoding, as HTTP requires ('"abc"' -> '"abc-gzip"')."""
+    return etag[:-1] + "-" + encoding + '"' if etag.endswith('"') else etag
+
+
+def get_compression_stats() -> dict:
+    return {**_stats, "encodings": list(SUPPORTED_ENCODINGS), "min_bytes": COMPRESSION_MIN_BYTES}
+
+
+def _compressible_type(headers: MutableHeaders) -> bool:
+    return headers.get("content-type", "").split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def _vary_on_encoding(headers: MutableHeaders):
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware; see the module docstring."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _compress_cached(self, body: bytes, encoding: str, etag: str | None) -> bytes:
+        if etag is None or etag.startswith("W/"):
+            return compress(body, encoding)
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                _stats["cache_hits"] += 1
+                return cached
+        compressed = compress(body, encoding)
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > COMPRESSION_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return compressed
+
+    def _eligible(self, start: dict, headers: MutableHeaders, body: bytes) -> bool:
+        if start["status"] in (204, 304) or len(body) < self.minimum_size or "content-encoding" in headers:
+            return False
+        return _compressible_type(headers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_headers = Headers(scope=scope)
+        # Responses are held and inspected even when the client accepts no encoding: every
+        # compressible response carries Vary, or a shared cache could serve one client's
+        # identity body to another that asked for gzip (or the reverse)
+        encoding = choose_encoding(request_headers.get("accept-encoding"))
+        if_none_match = request_headers.get("if-none-match", "")
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body message shows whether to compress
+                return
+            if passthrough or message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            response_start, start = start, None
+            headers = MutableHeaders(raw=response_start["headers"])
+            body = message.get("body", b"")
+            if _compressible_type(headers):
+                _vary_on_encoding(headers)
+            if response_start["status"] == 304 and "etag" in headers and "content-encoding" not in headers:
+                # Revalidating: a 304 repeats the Vary of the representation it confirms
+                _vary_on_encoding(headers)
+                encoded = encoded_etag(headers["etag"], encoding) if encoding else None
+                if encoded and encoded in if_none_match:
+                    headers["etag"] = encoded
+            if (encoding is None or message.get("more_body", False)
+                    or not self._eligible(response_start, headers, body)):
+                passthrough = True
+                await send(response_start)
+                await send(message)
+                return
+
+            etag = headers.get("etag")
+            compressed = self._compress_cached(body, encoding, etag)
+            _stats["compressed"] += 1
+            _stats["bytes_in"] += len(body)
+            _stats["bytes_out"] += len(compressed)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            if etag:
+                headers["etag"] = encoded_etag(etag, encoding)
+            await send(response_start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
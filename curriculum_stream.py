@@ -0,0 +1,150 @@
+"""Incremental parser that turns a streamed curriculum JSON document into progress events."""
+import json
+from typing import Dict, Any, List
+
+# Fields that follow courses_by_semester in the curriculum schema
+TRAILING_FIELDS = ("recommended_skills", "industry_alignment_notes", "optimization_tips")
+
+
+class IncrementalCurriculumParser:
+    """
+    Single-pass scanner fed with text chunks as the model produces them.
+
+    It tracks string/escape state and container nesting so it can emit:
+      - a "program" event once every root field before courses_by_semester is known,
+      - a "semester" event as soon as each semester's course array closes,
+      - a "complete" event with the remaining fields when the root object closes.
+    Any prose or markdown fence before the first "{" is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.done = False
+        self.fields: Dict[str, Any] = {}
+        self._stack: List[Dict[str, Any]] = []  # {"type", "start", "key", "expect_key"}
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._value_start: int | None = None  # start of the current root-level value
+        self._header_sent = False
+        self._sent_fields: set = set()
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return any events it completed."""
+        self.buffer += text
+        events: List[Dict[str, Any]] = []
+        buf = self.buffer
+        i = self.pos
+        end = len(buf)
+
+        while i < end and not self.done:
+            c = buf[i]
+
+            if not self.started:
+                if c == "{":
+                    self.started = True
+                    self._stack.append({"type": "{", "start": i, "key": None, "expect_key": True})
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._end_string(i, events)
+                i += 1
+                continue
+
+            top = self._stack[-1]
+            at_root = len(self._stack) == 1
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if at_root and not top["expect_key"] and self._value_start is None:
+                    self._value_start = i
+            elif c == "{" or c == "[":
+                if at_root and self._value_start is None:
+                    self._value_start = i
+                self._stack.append({"type": c, "start": i, "key": None, "expect_key": c == "{"})
+            elif c == "}" or c == "]":
+                if at_root and self._value_start is not None:
+                    # A bare scalar ends at the root's closing brace; record it while its key is still on the stack
+                    self._record_root_value(buf[self._value_start:i])
+                closed = self._stack.pop()
+                if not self._stack:
+                    self.done = True
+                    events.extend(self._complete_events())
+                elif len(self._stack) == 1:
+                    self._record_root_value(buf[self._value_start:i + 1])
+                elif (len(self._stack) == 2 and closed["type"] == "["
+                        and self._stack[0]["key"] == "courses_by_semester"):
+                    events.append({
+                        "event": "semester",
+                        "semester": self._stack[1]["key"],
+                        "courses": json.loads(buf[closed["start"]:i + 1]),
+                    })
+            elif c == ",":
+                if top["type"] == "{":
+                    top["expect_key"] = True
+                if at_root and self._value_start is not None:
+                    self._record_root_value(buf[self._value_start:i])
+            elif at_root and not top["expect_key"] and self._value_start is None and c not in " \t\r\n:":
+                # Start of a bare number / true / false / null
+                self._value_start = i
+            i += 1
+
+        self.pos = i
+        return events
+
+    def _end_string(self, i: int, events: List[Dict[str, Any]]):
+        top = self._stack[-1]
+        if top["type"] == "{" and top["expect_key"]:
+            top["key"] = json.loads(self.buffer[self._string_start:i + 1])
+            top["expect_key"] = False
+            if len(self._stack) == 1 and top["key"] == "courses_by_semester" and not self._header_sent:
+                events.append(self._header_event())
+        elif len(self._stack) == 1:
+            self._record_root_value(self.buffer[self._value_start:i + 1])
+
+    def _record_root_value(self, raw: str):
+        key = self._stack[0]["key"]
+        self._value_start = None
+        if key is not None:
+            self.fields[key] = json.loads(raw.strip())
+
+    def _header_event(self) -> Dict[str, Any]:
+        self._header_sent = True
+        header = {k: v for k, v in self.fields.items() if k != "courses_by_semester"}
+        self._sent_fields.update(header)
+        return {"event": "program", **header}
+
+    def _complete_events(self) -> List[Dict[str, Any]]:
+        events = []
+        if not self._header_sent:
+            events.append(self._header_event())
+        rest = {k: v for k, v in self.fields.items()
+                if k not in self._sent_fields and k != "courses_by_semester"}
+        events.append({"event": "complete", **rest})
+        return events
+
+    def result(self) -> Dict[str, Any]:
+        """Return the full parsed document; raises if the stream ended before the root object closed."""
+        if not self.done:
+            raise ValueError("Streamed JSON ended before the curriculum object was complete")
+        return dict(self.fields)
+
+
+def curriculum_events(curriculum: Dict[str, Any], tier: str) -> List[Dict[str, Any]]:
+    """Split an already-complete curriculum into the same event sequence the parser emits."""
+    header = {k: v for k, v in curriculum.items() if k != "courses_by_semester" and k not in TRAILING_FIELDS}
+    events = [{"event": "program", "tier": tier, **header}]
+    for semester, courses in (curriculum.get("courses_by_semester") or {}).items():
+        events.append({"event": "semester", "semester": semester, "courses": courses})
+    events.append({"event": "complete", **{k: curriculum[k] for k in TRAILING_FIELDS if k in curriculum}})
+    return events
@@ -1,7 +1,12 @@
 # Curriculum Templates Database
 # This module provides templates for generating curricula for all program-domain combinations
 
-from typing import Dict, Any, List
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Iterable
+
+from fast_json import JsonBody, dumps_bytes
 
 # ==========================================
 # DOMAIN KNOWLEDGE TEMPLATES
@@ -211,8 +216,8 @@ PROGRAM_METADATA = {
     "Certification": {"level": "Professional", "semesters": 2, "credits": 2},
 }
 
-def generate_curriculum_from_template(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate a curriculum using domain templates."""
+def _build_curriculum_from_template(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a curriculum using domain templates (uncached)."""
     program_type = data.get("program_type", "B.Tech")
     domain = data.get("domain", "Computer Science")
     academic_level = data.get("academic_level", "Undergraduate")
@@ -308,13 +313,144 @@ def generate_curriculum_from_template(data: Dict[str, Any]) -> Dict[str, Any]:
         "academic_level": academic_level,
         "total_semesters": num_semesters,
         "program_rationale": f"This {program_type} in {domain} is designed to meet the growing industry demand for {domain} professionals. The curriculum provides rigorous theoretical foundations combined with hands-on practical experience, preparing graduates for leadership roles in the field.",
-        "target_careers": template["careers"],
+        "target_careers": list(template["careers"]),
         "accreditation_aligned": f"Aligned with {accreditation} Standards",
         "courses_by_semester": courses_by_semester,
-        "recommended_skills": template["skills"],
+        "recommended_skills": list(template["skills"]),
         "industry_alignment_notes": f"This curriculum is aligned with current industry trends in {domain} and meets {accreditation} accreditation requirements.",
         "optimization_tips": [
             f"Consider adding electives in emerging {domain} technologies",
             f"Include industry internship for practical experience"
         ]
     }
+
+
+# ==========================================
+# MEMOIZED, PRE-SERIALIZED TEMPLATE OUTPUT
+# ==========================================
+# Template output depends only on these inputs, so each combination is built and serialized once.
+# The cache holds serialized bodies for the HTTP fast path and evicts the least recently used
+# entries past TEMPLATE_CACHE_MAX_BYTES.
+TEMPLATE_CACHE_MAX_BYTES = int(os.getenv("TEMPLATE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TEMPLATE_PREWARM = os.getenv("TEMPLATE_PREWARM", "1") not in ("0", "false", "False")
+# Comma-separated hot set built at startup (~27 KB per entry, per worker); the rest is built on first use.
+# "*" means every program; empty durations/levels mean "each program's own default".
+TEMPLATE_PREWARM_PROGRAMS = os.getenv("TEMPLATE_PREWARM_PROGRAMS", "B.Tech,M.Tech,B.Sc,MBA")
+TEMPLATE_PREWARM_ACCREDITATIONS = os.getenv("TEMPLATE_PREWARM_ACCREDITATIONS", "NAAC")
+TEMPLATE_PREWARM_DURATIONS = os.getenv("TEMPLATE_PREWARM_DURATIONS", "")
+TEMPLATE_PREWARM_LEVELS = os.getenv("TEMPLATE_PREWARM_LEVELS", "")
+
+_template_cache: "OrderedDict[tuple, JsonBody]" = OrderedDict()
+_template_cache_bytes = 0
+_template_cache_lock = threading.Lock()
+_template_stats = {"hits": 0, "misses": 0, "prewarmed": 0, "evictions": 0}
+
+
+def _template_key(data: Dict[str, Any]) -> tuple:
+    program_type = data.get("program_type", "B.Tech")
+    program_meta = PROGRAM_METADATA.get(program_type, PROGRAM_METADATA["B.Tech"])
+    # Durations beyond the program length produce identical output, so they share an entry
+    duration = min(data.get("duration_semesters", 8), program_meta["semesters"])
+    return (
+        program_type,
+        data.get("domain", "Computer Science"),
+        data.get("academic_level", "Undergraduate"),
+        duration,
+        data.get("accreditation_body", "NAAC"),
+    )
+
+
+def generate_curriculum_template_bytes(data: Dict[str, Any]) -> JsonBody:
+    """Return the template curriculum as immutable, compact UTF-8 JSON bytes with an ETag (memoized)."""
+    global _template_cache_bytes
+    key = _template_key(data)
+    with _template_cache_lock:
+        body = _template_cache.get(key)
+        if body is not None:
+            _template_cache.move_to_end(key)
+            _template_stats["hits"] += 1
+            return body
+        _template_stats["misses"] += 1
+
+    body = dumps_bytes(_build_curriculum_from_template(data))
+    if len(body) > TEMPLATE_CACHE_MAX_BYTES:
+        return body
+    with _template_cache_lock:
+        if key not in _template_cache:
+            _template_cache[key] = body
+            _template_cache_bytes += len(body)
+            while _template_cache_bytes > TEMPLATE_CACHE_MAX_BYTES:
+                _, evicted = _template_cache.popitem(last=False)
+                _template_cache_bytes -= len(evicted)
+                _template_stats["evictions"] += 1
+    return body
+
+
+def generate_curriculum_from_template(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a curriculum using domain templates. Returns a fresh dict the caller may modify.
+    Building it is cheaper than parsing the cached bytes back, so the dict path skips the cache.
+    """
+    return _build_curriculum_from_template(data)
+
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def prewarm_template_cache(
+    programs: Iterable[str] | None = None,
+    accreditations: Iterable[str] | None = None,
+    durations: Iterable[int] | None = None,
+    levels: Iterable[str] | None = None,
+) -> int:
+    """Build every DOMAIN_TEMPLATES combination for the hot programs. Returns the number of entries built."""
+    programs = list(programs or _csv(TEMPLATE_PREWARM_PROGRAMS))
+    if "*" in programs:
+        programs = list(PROGRAM_METADATA)
+    accreditations = list(accreditations or _csv(TEMPLATE_PREWARM_ACCREDITATIONS) or ["NAAC"])
+    durations = list(durations or [int(d) for d in _csv(TEMPLATE_PREWARM_DURATIONS)])
+    levels = list(levels or _csv(TEMPLATE_PREWARM_LEVELS))
+    built = 0
+    for program_type in programs:
+        meta = PROGRAM_METADATA.get(program_type)
+        if meta is None:
+            print(f"[TEMPLATE PREWARM] Skipping unknown program type: {program_type}")
+            continue
+        for domain in DOMAIN_TEMPLATES:
+            for level in levels or [meta["level"]]:
+                for duration in durations or [meta["semesters"]]:
+                    for accreditation in accreditations:
+                        data = {
+                            "program_type": program_type,
+                            "domain": domain,
+                            "academic_level": level,
+                            "duration_semesters": duration,
+                            "accreditation_body": accreditation,
+                        }
+                        with _template_cache_lock:
+                            cached = _template_key(data) in _template_cache
+                        if not cached:
+                            generate_curriculum_template_bytes(data)
+                            built += 1
+    with _template_cache_lock:
+        _template_stats["prewarmed"] += built
+    return built
+
+
+def start_template_prewarm() -> threading.Thread | None:
+    """Pre-warm the template cache in a background thread (no-op when TEMPLATE_PREWARM=0)."""
+    if not TEMPLATE_PREWARM:
+        return None
+
+    def run():
+        built = prewarm_template_cache()
+        print(f"[TEMPLATE PREWARM] Built {built} template curricula ({_template_cache_bytes // 1024} KB)")
+
+    thread = threading.Thread(target=run, name="template-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_template_cache_stats() -> Dict[str, Any]:
+    return {**_template_stats, "entries": len(_template_cache), "bytes": _template_cache_bytes}
@@ -0,0 +1,180 @@
+"""Projections of a curriculum for first paint and lazy loading of course details.
+
+- view=skeleton: the program header plus one stub per course (code, name, category, credits)
+- fields=a,b,courses.x: keep only the listed top-level fields; "courses.<field>" trims each course
+- semesters=2-4: keep only a range of semesters
+
+Projections of immutable curricula (database, template and stored AI hits) are serialized once and
+cached by the full body's ETag, so a repeat skeleton request costs a dict lookup.
+
+Curriculum ids are stateless: URL-safe base64 of the normalized request plus the tier that served
+it. Any worker can resolve one again without shared state, and no id ever triggers a Gemini call.
+"""
+import os
+import re
+import json
+import base64
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from fast_json import JsonBody, dumps_bytes
+from schemas import CurriculumRequest, CurriculumResponse, Course
+
+load_dotenv()
+
+PROJECTION_CACHE_MAX_ENTRIES = int(os.getenv("PROJECTION_CACHE_MAX_ENTRIES", "2048"))
+
+COURSE_STUB_FIELDS = ("course_code", "course_name", "category", "credits")
+COURSES_FIELD = "courses_by_semester"
+HEADER_FIELDS = tuple(name for name in CurriculumResponse.model_fields if name != COURSES_FIELD)
+_ID_FIELDS = tuple(CurriculumRequest.model_fields)
+_SEMESTER_NUMBER = re.compile(r"(\d+)\s*$")
+
+
+class Projection:
+    """A parsed view/fields/semesters combination; key identifies it in the projection cache."""
+
+    def __init__(self, fields: Tuple[str, ...] | None, course_fields: Tuple[str, ...] | None,
+                 semesters: Tuple[int, int] | None):
+        self.fields = fields                # top-level fields to keep (None = all)
+        self.course_fields = course_fields  # fields kept in each course (None = all)
+        self.semesters = semesters          # inclusive semester range (None = all)
+        self.key = (fields, course_fields, semesters)
+
+    def apply(self, curriculum: Dict[str, Any]) -> Dict[str, Any]:
+        projected = {}
+        for name, value in curriculum.items():
+            if self.fields is not None and name not in self.fields:
+                continue
+            if name == COURSES_FIELD and isinstance(value, dict):
+                value = self._project_courses(value)
+            projected[name] = value
+        return projected
+
+    def _project_courses(self, courses_by_semester: Dict[str, list]) -> Dict[str, list]:
+        result = {}
+        for position, (semester, courses) in enumerate(courses_by_semester.items(), 1):
+            if self.semesters is not None:
+                match = _SEMESTER_NUMBER.search(semester)
+                number = int(match.group(1)) if match else position
+                if not self.semesters[0] <= number <= self.semesters[1]:
+                    continue
+            if self.course_fields is not None:
+                courses = [{k: course[k] for k in self.course_fields if k in course} for course in courses]
+            result[semester] = courses
+        return result
+
+
+def parse_projection(view: str = "full", fields: str | None = None, semesters: str | None = None) -> Projection | None:
+    """Parse the /generate query parameters; None means the full document. Raises ValueError on bad input."""
+    if view not in ("full", "skeleton"):
+        raise ValueError("view must be 'full' or 'skeleton'")
+    top: List[str] | None = None
+    course: List[str] | None = None
+    if view == "skeleton":
+        top, course = list(HEADER_FIELDS) + [COURSES_FIELD], list(COURSE_STUB_FIELDS)
+    if fields:
+        top, course = [], None
+        for name in (part.strip() for part in fields.split(",")):
+            if not name:
+                continue
+            if name.startswith("courses."):
+                field = name[len("courses."):]
+                if field not in Course.model_fields:
+                    raise ValueError(f"Unknown course field: {field}")
+                course = (course or []) + [field]
+                if COURSES_FIELD not in top:
+                    top.append(COURSES_FIELD)
+            elif name in CurriculumResponse.model_fields:
+                top.append(name)
+            else:
+                raise ValueError(f"Unknown field: {name}")
+    semester_range = None
+    if semesters:
+        low, _, high = semesters.partition("-")
+        try:
+            semester_range = (int(low), int(high or low))
+        except ValueError:
+            raise ValueError("semesters must look like '3' or '2-4'") from None
+        if semester_range[0] < 1 or semester_range[0] > semester_range[1]:
+            raise ValueError("semesters must be a range of semester numbers, e.g. '2-4'")
+    if top is None and course is None and semester_range is None:
+        return None
+    return Projection(tuple(top) if top is not None else None, tuple(course) if course is not None else None, semester_range)
+
+
+# ==========================================
+# CACHED PROJECTIONS
+# ==========================================
+_projection_cache: "OrderedDict[tuple, JsonBody]" = OrderedDict()
+_projection_lock = threading.Lock()
+
+
+def _cached(key: tuple, build) -> JsonBody | None:
+    with _projection_lock:
+        body = _projection_cache.get(key)
+        if body is not None:
+            _projection_cache.move_to_end(key)
+            return body
+    body = build()
+    if body is None:
+        return None
+    with _projection_lock:
+        _projection_cache[key] = body
+        while len(_projection_cache) > PROJECTION_CACHE_MAX_ENTRIES:
+            _projection_cache.popitem(last=False)
+    return body
+
+
+def project_body(body: JsonBody, projection: Projection, curriculum_id: str) -> JsonBody:
+    """Projection of a pre-serialized curriculum, built once per (content, projection)."""
+    return _cached((body.etag, projection.key, curriculum_id),
+                   lambda: project_curriculum(json.loads(body), projection, curriculum_id))
+
+
+def project_curriculum(curriculum: Dict[str, Any], projection: Projection, curriculum_id: str) -> JsonBody:
+    return dumps_bytes({"curriculum_id": curriculum_id, **projection.apply(curriculum)})
+
+
+def find_course(curriculum: Dict[str, Any], course_code: str) -> Tuple[str, Dict[str, Any]] | None:
+    for semester, courses in curriculum.get(COURSES_FIELD, {}).items():
+        for course in courses:
+            if course.get("course_code") == course_code:
+                return semester, course
+    return None
+
+
+def course_detail_body(body: JsonBody, curriculum_id: str, course_code: str) -> JsonBody | None:
+    """Full course record from a pre-serialized curriculum (cached); None if the code is unknown."""
+    def build():
+        found = find_course(json.loads(body), course_code)
+        if found is None:
+            return None
+        return dumps_bytes({"curriculum_id": curriculum_id, "semester": found[0], "course": found[1]})
+
+    return _cached((body.etag, "course", course_code, curriculum_id), build)
+
+
+# ==========================================
+# CURRICULUM IDS
+# ==========================================
+def encode_curriculum_id(data: Dict[str, Any], tier: str) -> str:
+    payload = {name: data.get(name) for name in _ID_FIELDS}
+    payload["tier"] = tier
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_curriculum_id(curriculum_id: str) -> Tuple[Dict[str, Any], str]:
+    """Returns (request data, tier). Raises ValueError for ids this server did not issue."""
+    try:
+        raw = base64.urlsafe_b64decode(curriculum_id + "=" * (-len(curriculum_id) % 4))
+        payload = json.loads(raw)
+        tier = payload.pop("tier")
+        data = CurriculumRequest(**payload).model_dump()
+    except Exception:
+        raise ValueError("Malformed curriculum id") from None
+    return data, tier
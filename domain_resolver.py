@@ -0,0 +1,185 @@
+"""Resolve free-text domain names to the canonical domains served by the database and template tiers."""
+import re
+import threading
+from typing import Dict, Iterable, Tuple
+
+# Common spellings and abbreviations -> canonical domain. Curated: only true synonyms belong here,
+# a word that merely appears in a domain name ("data", "security") must not.
+# Entries whose target is not a known canonical domain are ignored when the resolver is built.
+DOMAIN_ALIASES = {
+    "ai": "Artificial Intelligence",
+    "a i": "Artificial Intelligence",
+    "ai ml": "Artificial Intelligence",
+    "aiml": "Artificial Intelligence",
+    "ai and ml": "Artificial Intelligence",
+    "ml": "Machine Learning",
+    "ds": "Data Science",
+    "data analytics": "Data Science",
+    "cyber security": "Cybersecurity",
+    "cyber": "Cybersecurity",
+    "information security": "Cybersecurity",
+    "infosec": "Cybersecurity",
+    "ethical hacking": "Cybersecurity",
+    "cs": "Computer Science",
+    "cse": "Computer Science",
+    "computer science and engineering": "Computer Science",
+    "vlsi": "VLSI Design",
+    "chip design": "VLSI Design",
+    "web dev": "Web Development",
+    "cloud": "Cloud Computing",
+    "hr": "Human Resources",
+    "hrm": "Human Resources",
+    "human resource management": "Human Resources",
+    "operations management": "Operations",
+    "biotech": "Biotechnology",
+    "maths": "Mathematics",
+    "math": "Mathematics",
+    "mech": "Mechanical Engineering",
+    "mechanical": "Mechanical Engineering",
+    "civil": "Civil Engineering",
+}
+
+# Words that carry no domain meaning on their own
+STOPWORDS = frozenset({"and", "of", "in", "the", "for", "with", "studies"})
+# Suffixes people add or drop freely ("Mechanical Engg", "Electronics Engineering"); ignored when matching.
+# Everything else is distinguishing: "Chemical" must never match "Mechanical".
+GENERIC_TOKENS = frozenset({"engineering", "engg", "eng", "engineer"})
+
+_MEMO_LIMIT = 4096
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def fold(text: str) -> str:
+    """Case/whitespace/punctuation folding: "  Data-Science " -> "data science"."""
+    return " ".join(_NON_ALNUM.sub(" ", str(text).casefold().replace("&", " and ")).split())
+
+
+def tokens(folded: str) -> frozenset:
+    """Distinguishing tokens of a folded name (stopwords and generic suffixes removed)."""
+    return frozenset(t for t in folded.split() if t not in STOPWORDS and t not in GENERIC_TOKENS)
+
+
+def max_edits(token: str) -> int:
+    """Typos tolerated in one token: none up to 4 letters, one up to 8, two beyond."""
+    return 0 if len(token) <= 4 else 1 if len(token) <= 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance with adjacent transpositions; returns limit + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def token_distance(requested: frozenset, candidate: frozenset) -> int | None:
+    """
+    Total edits to turn `requested` into `candidate` when every token pairs one-to-one with a
+    token of the other side within its typo budget; None when any token has no such partner.
+    """
+    if len(requested) != len(candidate) or not requested:
+        return None
+    remaining = set(candidate)
+    total = 0
+    # Longest tokens first, each taking its closest remaining partner
+    for token in sorted(requested, key=len, reverse=True):
+        limit = max_edits(token)
+        best, best_distance = None, limit + 1
+        for other in remaining:
+            pair_limit = min(limit, max_edits(other))
+            distance = edit_distance(token, other, pair_limit)
+            if distance <= pair_limit and distance < best_distance:
+                best, best_distance = other, distance
+        if best is None:
+            return None
+        remaining.discard(best)
+        total += best_distance
+    return total
+
+
+class DomainResolver:
+    """
+    Maps a requested domain to a canonical one, trying in order:
+    exact, folded, alias, token-set and fuzzy (per-token typo) matching.
+    Exact, folded, alias and token lookups are dict hits; fuzzy results are memoized.
+    Anything ambiguous or with a differing distinguishing token stays unresolved, so the request
+    keeps its own domain and goes to the AI tier.
+    """
+
+    def __init__(self, canonical_domains: Iterable[str], aliases: Dict[str, str],
+                 stats: Dict[str, int] | None = None):
+        self.canonical = frozenset(canonical_domains)
+        self._folded = {fold(d): d for d in self.canonical}
+        self._aliases = {fold(a): d for a, d in aliases.items() if d in self._folded.values()}
+        self._by_tokens: Dict[frozenset, str | None] = {}
+        for folded, domain in sorted(self._folded.items()):
+            key = tokens(folded)
+            # Two canonical domains with the same distinguishing tokens: neither wins
+            self._by_tokens[key] = None if key in self._by_tokens else domain
+        self._memo: Dict[str, Tuple[str | None, str]] = {}
+        self._lock = threading.Lock()
+        # Counters can be carried over when the resolver is rebuilt after a database reload
+        self.stats = stats if stats is not None else {"lookups": 0, "exact": 0, "folded": 0, "alias": 0, "token": 0, "fuzzy": 0, "unresolved": 0, "rescued": 0}
+
+    def resolve(self, domain: str, count: bool = True) -> Tuple[str | None, str]:
+        """Return (canonical_domain or None, method). count=False looks up without touching the stats."""
+        result = self._memo.get(domain)
+        if result is None:
+            result = self._resolve(domain)
+            with self._lock:
+                if len(self._memo) >= _MEMO_LIMIT:
+                    self._memo.clear()
+                self._memo[domain] = result
+        if not count:
+            return result
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.stats[result[1]] += 1
+        return result
+
+    def _resolve(self, domain: str) -> Tuple[str | None, str]:
+        if domain in self.canonical:
+            return domain, "exact"
+        folded = fold(domain)
+        if not folded:
+            return None, "unresolved"
+        if folded in self._folded:
+            return self._folded[folded], "folded"
+        if folded in self._aliases:
+            return self._aliases[folded], "alias"
+        if folded.replace(" ", "") in self._aliases:
+            return self._aliases[folded.replace(" ", "")], "alias"
+        token_set = tokens(folded)
+        if token_set in self._by_tokens:
+            canonical = self._by_tokens[token_set]
+            return (canonical, "token") if canonical is not None else (None, "unresolved")
+
+        matches = []
+        for candidate_tokens, candidate in self._by_tokens.items():
+            distance = token_distance(token_set, candidate_tokens)
+            if distance is not None and candidate is not None:
+                matches.append((distance, candidate))
+        matches.sort()
+        if matches and (len(matches) == 1 or matches[0][0] < matches[1][0]):
+            return matches[0][1], "fuzzy"
+        return None, "unresolved"
+
+    def record_rescue(self):
+        """Count a request that only reached a local tier because its domain was resolved."""
+        with self._lock:
+            self.stats["rescued"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "canonical_domains": len(self.canonical)}
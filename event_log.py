@@ -0,0 +1,212 @@
+"""Structured JSON event log written by a background thread.
+
+Callers enqueue a record and return immediately; a QueueListener thread formats it (including
+tracebacks) and writes it to a size- or time-rotated JSONL file. Identical errors are rate-limited:
+within AI_LOG_DEDUP_WINDOW seconds only the first is written, and the next one written carries a
+"suppressed" count. Each record carries the id of the HTTP request that produced it.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import traceback
+import contextvars
+import logging.handlers
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AI_LOG_PATH = os.getenv("AI_LOG_PATH", os.path.join(os.path.dirname(__file__), "logs", "ai_events.jsonl"))
+# "size" rotates at AI_LOG_MAX_BYTES; "time" rotates on AI_LOG_ROTATE_WHEN (see TimedRotatingFileHandler)
+AI_LOG_ROTATE = os.getenv("AI_LOG_ROTATE", "size").lower()
+AI_LOG_MAX_BYTES = int(os.getenv("AI_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+AI_LOG_ROTATE_WHEN = os.getenv("AI_LOG_ROTATE_WHEN", "midnight")
+AI_LOG_BACKUP_COUNT = int(os.getenv("AI_LOG_BACKUP_COUNT", "5"))
+AI_LOG_DEDUP_WINDOW = float(os.getenv("AI_LOG_DEDUP_WINDOW", "60"))
+AI_LOG_QUEUE_SIZE = int(os.getenv("AI_LOG_QUEUE_SIZE", "10000"))
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+_DIGITS = re.compile(r"\d+(\.\d+)?")
+
+
+# ==========================================
+# FORMATTING AND FILTERING
+# ==========================================
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["traceback"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DedupFilter(logging.Filter):
+    """
+    Drop records whose dedup key was already logged within `window` seconds.
+    Runs in the caller's thread before enqueueing, so suppressed records cost one dict lookup.
+    """
+
+    def __init__(self, window: float):
+        super().__init__()
+        self.window = window
+        self._seen: Dict[str, list] = {}  # key -> [last written at, suppressed since]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "dedup_key", None)
+        if key is None or self.window <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.window:
+                seen[1] += 1
+                return False
+            suppressed = seen[1] if seen else 0
+            self._seen[key] = [now, 0]
+            if len(self._seen) > 4096:
+                cutoff = now - self.window
+                self._seen = {k: v for k, v in self._seen.items() if v[0] >= cutoff}
+        if suppressed:
+            record.fields = {**record.fields, "suppressed": suppressed}
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record as-is (formatting happens on the listener thread); drop it if the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            type(self).dropped += 1
+
+
+# ==========================================
+# PIPELINE
+# ==========================================
+logger = logging.getLogger("currhub.events")
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+_listener: logging.handlers.QueueListener | None = None
+_start_lock = threading.Lock()
+
+
+def _file_handler() -> logging.Handler:
+    os.makedirs(os.path.dirname(os.path.abspath(AI_LOG_PATH)), exist_ok=True)
+    if AI_LOG_ROTATE == "time":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            AI_LOG_PATH, when=AI_LOG_ROTATE_WHEN, backupCount=AI_LOG_BACKUP_COUNT, encoding="utf-8", utc=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            AI_LOG_PATH, maxBytes=AI_LOG_MAX_BYTES, backupCount=AI_LOG_BACKUP_COUNT, encoding="utf-8")
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def start_event_log():
+    """Start the background writer (idempotent; also done on first use)."""
+    global _listener
+    with _start_lock:
+        if _listener is not None:
+            return
+        try:
+            file_handler = _file_handler()
+        except OSError as e:
+            print(f"[EVENT LOG] Cannot open {AI_LOG_PATH}: {e}; events go to stderr")
+            file_handler = logging.StreamHandler(sys.stderr)
+            file_handler.setFormatter(JsonFormatter())
+        log_queue: queue.Queue = queue.Queue(AI_LOG_QUEUE_SIZE)
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(DedupFilter(AI_LOG_DEDUP_WINDOW))
+        logger.addHandler(queue_handler)
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=False)
+        _listener.start()
+
+
+def stop_event_log():
+    """Flush queued records and stop the writer (called on shutdown)."""
+    global _listener
+    with _start_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_event_log)
+
+
+def log_event(event: str, level: int = logging.INFO, exc: BaseException | None = None,
+              dedup_key: str | None = None, **fields: Any):
+    """Queue one structured record; never blocks on disk I/O."""
+    if _listener is None:
+        start_event_log()
+    fields = {"request_id": request_id_var.get(), **fields}
+    exc_info = (type(exc), exc, exc.__traceback__) if exc is not None else None
+    logger.log(level, event, exc_info=exc_info, extra={"fields": fields, "dedup_key": dedup_key})
+
+
+def error_dedup_key(event: str, error: BaseException) -> str:
+    """Errors that differ only in numbers (retry delays, ids) share a key."""
+    return f"{event}|{type(error).__name__}|{_DIGITS.sub('#', str(error))[:300]}"
+
+
+def get_event_log_stats() -> Dict[str, Any]:
+    return {"path": AI_LOG_PATH, "running": _listener is not None, "dropped": _NonBlockingQueueHandler.dropped}
+
+
+# ==========================================
+# REQUEST IDS
+# ==========================================
+class RequestIdMiddleware:
+    """Tag each HTTP request with an id (from X-Request-ID or a new one), echoed in the response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")[:64]
+                break
+        request_id = incoming or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,49 @@
+"""Pre-serialized JSON response bodies with strong ETags.
+
+Immutable curricula (database and template hits) are serialized once and served as bytes.
+orjson is used when installed (several times faster than the standard library on large course
+trees); otherwise json.dumps with compact separators. Both emit compact UTF-8 JSON.
+"""
+import re
+import json
+import hashlib
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Compressed representations carry "<etag>-gzip" / "<etag>-br" (see compression.encoded_etag)
+_ENCODING_SUFFIX = re.compile(r'-(?:gzip|br)"$')
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class JsonBody(bytes):
+    """Serialized JSON that carries its own strong ETag, computed on first use and kept with the bytes."""
+
+    @property
+    def etag(self) -> str:
+        etag = self.__dict__.get("_etag")
+        if etag is None:
+            etag = self.__dict__["_etag"] = strong_etag(self)
+        return etag
+
+
+def dumps_bytes(obj: Any) -> JsonBody:
+    """Serialize obj to compact UTF-8 JSON."""
+    if orjson is not None:
+        return JsonBody(orjson.dumps(obj))
+    return JsonBody(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for this header; any encoding matches)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_ENCODING_SUFFIX.sub('"', tag.strip().removeprefix("W/")) == etag for tag in if_none_match.split(","))
@@ -1,12 +1,16 @@
 """Gap analyzer module using OpenRouter API."""
 import os
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from openrouter_client import post_chat_completion
+from outbound_scheduler import OutboundRejected
+from response_cache import make_cache_key, cache_get, cache_set
+
 load_dotenv()
 
 GAP_API_KEY = os.getenv("GAP_API_KEY") or os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "openai/gpt-4o-mini"
 
 GAP_PROMPT = """You are an expert career advisor analyzing the gap between academic curricula and industry job requirements.
 
@@ -47,20 +51,13 @@ Analyze the provided curriculum against the job description and provide:
 Be specific and actionable. Focus on practical recommendations."""
 
 
-def analyze_gap(curriculum_summary: str, job_description: str) -> str:
+async def analyze_gap(curriculum_summary: str, job_description: str) -> str:
     """Analyze gap between curriculum and job requirements."""
     
     if not GAP_API_KEY or GAP_API_KEY == "your_openrouter_api_key_here":
         return "⚠️ Please set GAP_API_KEY (or OPENROUTER_API_KEY) in your .env file."
     
     try:
-        headers = {
-            "Authorization": f"Bearer {GAP_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8000",
-            "X-Title": "CurrHub Gap Analyzer"
-        }
-        
         user_message = f"""Analyze the following:
 
 CURRICULUM:
@@ -71,27 +68,36 @@ JOB DESCRIPTION:
 
 Provide a detailed gap analysis."""
         
+        cache_key = make_cache_key("gap_analyzer", MODEL, GAP_PROMPT, user_message)
+        cached = await cache_get("gap_analyzer", cache_key)
+        if cached is not None:
+            return cached
+        
         messages = [
             {"role": "system", "content": GAP_PROMPT},
             {"role": "user", "content": user_message}
         ]
         
         payload = {
-            "model": "openai/gpt-4o-mini",
+            "model": MODEL,
             "messages": messages,
             "max_tokens": 1500,
             "temperature": 0.7
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=30)
+        response = await post_chat_completion(GAP_API_KEY, payload, "CurrHub Gap Analyzer", timeout=30, module="gap_analyzer")
         
         if response.status_code == 200:
             data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
+            analysis = data["choices"][0]["message"]["content"].strip()
+            await cache_set("gap_analyzer", cache_key, analysis)
+            return analysis
         else:
             return f"⚠️ API error {response.status_code}: Unable to analyze gap."
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return "Request timed out. Please try again."
+    except OutboundRejected:
+        raise
     except Exception as e:
         return f"Error: {str(e)[:100]}"
@@ -0,0 +1,236 @@
+"""Quota-aware admission and circuit breaker for Gemini calls.
+
+Tracks requests/minute and input tokens/minute against the configured Gemini limits.
+When Gemini answers 429 with a retry_delay, the circuit opens and requests are routed
+straight to the fallback tier until the delay expires, instead of making doomed calls.
+
+With GEMINI_SHARED_QUOTA on (the default) the window and the circuit live in shared_state, so
+every worker process on the host draws from one budget: adding workers does not multiply the
+calls made against the key. If the shared file errors (e.g. "database is locked" past the busy
+timeout) the scheduler counts per process for GEMINI_SHARED_RETRY seconds, then tries it again.
+"""
+import os
+import re
+import time
+import sqlite3
+import threading
+from collections import deque
+
+from dotenv import load_dotenv
+
+from shared_state import shared_state, SharedState
+
+load_dotenv()
+
+# Defaults match the gemini-2.0-flash free tier
+GEMINI_RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "15"))
+GEMINI_TPM_LIMIT = int(os.getenv("GEMINI_TPM_LIMIT", "1000000"))
+# How long a request may wait for window capacity before it is shed to the fallback
+GEMINI_MAX_QUEUE_WAIT = float(os.getenv("GEMINI_MAX_QUEUE_WAIT", "2"))
+GEMINI_MAX_QUEUE_DEPTH = int(os.getenv("GEMINI_MAX_QUEUE_DEPTH", "8"))
+# Cooldown when the error carries no retry_delay, and consecutive failures that open the circuit
+GEMINI_DEFAULT_COOLDOWN = float(os.getenv("GEMINI_DEFAULT_COOLDOWN", "30"))
+GEMINI_FAILURE_THRESHOLD = int(os.getenv("GEMINI_FAILURE_THRESHOLD", "3"))
+# Count quota across all worker processes on the host (see shared_state)
+GEMINI_SHARED_QUOTA = os.getenv("GEMINI_SHARED_QUOTA", "1") not in ("0", "false", "False")
+# Seconds to count per process after a shared-state error before using the shared window again
+GEMINI_SHARED_RETRY = float(os.getenv("GEMINI_SHARED_RETRY", "5"))
+
+WINDOW_SECONDS = 60.0
+
+_RETRY_DELAY_PATTERNS = (
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),       # gRPC error details
+    re.compile(r"retry in\s*([\d.]+)\s*s", re.IGNORECASE),     # REST error message
+    re.compile(r'"retryDelay"\s*:\s*"([\d.]+)s"'),             # REST error JSON
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap input-token estimate (~4 characters per token) used for TPM accounting."""
+    return len(text) // 4 + 1
+
+
+def parse_retry_delay(error: Exception) -> float | None:
+    """Extract the server-suggested retry delay (seconds) from a Gemini error, if present."""
+    message = str(error)
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def is_quota_error(error: Exception) -> bool:
+    message = str(error)
+    return "429" in message or "quota" in message.lower() or type(error).__name__ == "ResourceExhausted"
+
+
+class GeminiScheduler:
+    """Sliding-window RPM/TPM limiter with a bounded wait queue and a circuit breaker."""
+
+    def __init__(self, rpm: int, tpm: int, max_wait: float, max_queue: int, shared: SharedState | None = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+        self.shed_count = 0
+        self._events: deque = deque()  # (timestamp, tokens) of admitted calls in the last minute
+        self._window_tokens = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self.shared = shared
+        self.shared_errors = 0
+        self._shared_retry_at = 0.0
+
+    def _shared_active(self) -> bool:
+        return self.shared is not None and time.monotonic() >= self._shared_retry_at
+
+    def _shared_call(self, fn, *args):
+        """
+        Run a shared_state operation. On SQLite errors return None (the caller counts per process)
+        and skip the shared store for GEMINI_SHARED_RETRY seconds.
+        """
+        if not self._shared_active():
+            return None
+        try:
+            return fn(*args)
+        except sqlite3.Error as e:
+            self.shared_errors += 1
+            self._shared_retry_at = time.monotonic() + GEMINI_SHARED_RETRY
+            print(f"[GEMINI SCHEDULER] Shared quota unavailable, counting per process for {GEMINI_SHARED_RETRY:g}s: {e}")
+            return None
+
+    def _reserve(self, now: float, tokens: int) -> tuple:
+        """(circuit_wait, window_wait) for one call; both 0 means the call was recorded."""
+        circuit_wait = max(0.0, self.open_until - now)
+        if circuit_wait > 0:
+            return circuit_wait, 0.0
+        if self.shared is not None:
+            reserved = self._shared_call(self.shared.reserve, tokens, self.rpm, self.tpm)
+            if reserved is not None:
+                return reserved
+        self._trim(now)
+        wait = self._wait_needed(now, tokens)
+        if wait <= 0:
+            self._events.append((now, tokens))
+            self._window_tokens += tokens
+        return 0.0, max(wait, 0.0)
+
+    def _trim(self, now: float):
+        while self._events and self._events[0][0] <= now - WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._window_tokens -= tokens
+
+    def _wait_needed(self, now: float, tokens: int) -> float:
+        """Seconds until one more call of `tokens` fits in the window (inf if it never can)."""
+        if tokens > self.tpm:
+            return float("inf")
+        wait = 0.0
+        if len(self._events) >= self.rpm:
+            wait = self._events[len(self._events) - self.rpm][0] + WINDOW_SECONDS - now
+        excess = self._window_tokens + tokens - self.tpm
+        if excess > 0:
+            freed = 0
+            for ts, used in self._events:
+                freed += used
+                if freed >= excess:
+                    wait = max(wait, ts + WINDOW_SECONDS - now)
+                    break
+        return wait
+
+    def acquire(self, tokens: int, max_wait: float | None = None) -> tuple:
+        """
+        Reserve capacity for one call. Returns (admitted, reason).
+        Waits up to max_wait (default: the configured queue wait) for the window to free up or the
+        circuit to close; otherwise sheds without calling the API.
+        """
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        with self._cond:
+            if self._waiting >= self.max_queue:
+                return self._shed("queue full")
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    circuit_wait, wait = self._reserve(now, tokens)
+                    if circuit_wait > 0:
+                        if now + circuit_wait > deadline:
+                            return self._shed(f"circuit open for {circuit_wait:.0f}s")
+                        self._cond.wait(circuit_wait)
+                        continue
+                    if wait <= 0:
+                        return True, ""
+                    if now + wait > deadline:
+                        return self._shed("rate limit window full")
+                    self._cond.wait(wait)
+            finally:
+                self._waiting -= 1
+
+    def refund(self, tokens: int):
+        """Give back a reservation whose call was never sent (e.g. refused an outbound slot)."""
+        with self._cond:
+            refunded = self.shared is not None and self._shared_call(self.shared.refund, tokens) is not None
+            if not refunded:
+                # Counted per process (sharing off or unavailable): drop the newest matching event
+                for index in range(len(self._events) - 1, -1, -1):
+                    if self._events[index][1] == tokens:
+                        del self._events[index]
+                        self._window_tokens -= tokens
+                        break
+            self._cond.notify_all()
+
+    def _shed(self, reason: str) -> tuple:
+        self.shed_count += 1
+        return False, reason
+
+    def record_success(self):
+        with self._cond:
+            self.consecutive_failures = 0
+
+    def record_failure(self, error: Exception):
+        """Open the circuit on quota errors (for retry_delay) or after repeated failures."""
+        delay = parse_retry_delay(error)
+        with self._cond:
+            self.consecutive_failures += 1
+            if is_quota_error(error) or delay is not None:
+                cooldown = delay if delay is not None else GEMINI_DEFAULT_COOLDOWN
+            elif self.consecutive_failures >= GEMINI_FAILURE_THRESHOLD:
+                cooldown = GEMINI_DEFAULT_COOLDOWN
+            else:
+                return
+            self.open_until = max(self.open_until, time.monotonic() + cooldown)
+            if self.shared is not None:
+                self._shared_call(self.shared.open_circuit, cooldown)
+            print(f"[GEMINI CIRCUIT OPEN] Routing to fallback for {cooldown:.0f}s")
+            self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            self._trim(now)
+            calls, tokens, circuit_wait = len(self._events), self._window_tokens, max(0.0, self.open_until - now)
+            if self.shared is not None:
+                window = self._shared_call(self.shared.window)
+                if window is not None:
+                    calls, tokens, circuit_wait = window[0], window[1], max(circuit_wait, window[2])
+            return {
+                "shared": self._shared_active(),
+                "shared_errors": self.shared_errors,
+                "circuit_open": circuit_wait > 0,
+                "circuit_open_seconds": round(circuit_wait, 1),
+                "requests_in_window": calls,
+                "tokens_in_window": tokens,
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "waiting": self._waiting,
+                "shed_total": self.shed_count,
+                "consecutive_failures": self.consecutive_failures,
+            }
+
+
+gemini_scheduler = GeminiScheduler(
+    GEMINI_RPM_LIMIT, GEMINI_TPM_LIMIT, GEMINI_MAX_QUEUE_WAIT, GEMINI_MAX_QUEUE_DEPTH,
+    shared=shared_state if GEMINI_SHARED_QUOTA else None,
+)
@@ -0,0 +1,110 @@
+"""Write-through store for successful Gemini curricula, consulted as a lookup tier before templates."""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Any
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from schemas import CurriculumResponse, Course
+
+load_dotenv()
+
+GENERATED_STORE_PATH = os.getenv(
+    "GENERATED_STORE_PATH", os.path.join(os.path.dirname(__file__), "generated_curricula.sqlite3")
+)
+# Entries older than this (seconds) are ignored; 0 keeps them forever
+GENERATED_STORE_MAX_AGE = float(os.getenv("GENERATED_STORE_MAX_AGE", "0"))
+
+# Request fields that shape the generated curriculum
+KEY_FIELDS = ("program_type", "domain", "academic_level", "duration_semesters", "accreditation_body")
+
+
+def generated_key(data: Dict[str, Any]) -> str:
+    material = json.dumps([data.get(field) for field in KEY_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def is_valid_curriculum(curriculum: Dict[str, Any]) -> bool:
+    """Full schema check, including every course (CurriculumResponse leaves courses_by_semester untyped)."""
+    try:
+        CurriculumResponse(**curriculum)
+        for courses in curriculum["courses_by_semester"].values():
+            for course in courses:
+                Course(**course)
+    except (ValidationError, TypeError, AttributeError):
+        return False
+    return True
+
+
+class GeneratedCurriculumStore:
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS generated_curricula ("
+                        " key TEXT PRIMARY KEY, program_type TEXT, domain TEXT,"
+                        " curriculum TEXT NOT NULL, provenance TEXT NOT NULL, created_at REAL NOT NULL)"
+                    )
+                    self._initialized = True
+        return conn
+
+    def get(self, data: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Return {"curriculum", "provenance", "created_at"} for a stored result, or None."""
+        try:
+            row = self._connect().execute(
+                "SELECT curriculum, provenance, created_at FROM generated_curricula WHERE key = ?",
+                (generated_key(data),),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[GENERATED STORE] Read failed: {e}")
+            return None
+        if row is None:
+            return None
+        curriculum, provenance, created_at = row
+        if self.max_age and time.time() - created_at > self.max_age:
+            return None
+        return {"curriculum": json.loads(curriculum), "provenance": provenance, "created_at": created_at}
+
+    def put(self, data: Dict[str, Any], curriculum: Dict[str, Any], provenance: str) -> bool:
+        """Persist a schema-valid curriculum. Invalid results are not stored."""
+        if not is_valid_curriculum(curriculum):
+            print("[GENERATED STORE] Skipping write: result failed schema validation")
+            return False
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO generated_curricula"
+                " (key, program_type, domain, curriculum, provenance, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (generated_key(data), data.get("program_type"), data.get("domain"),
+                 json.dumps(curriculum, ensure_ascii=False), provenance, time.time()),
+            )
+        except sqlite3.Error as e:
+            print(f"[GENERATED STORE] Write failed: {e}")
+            return False
+        return True
+
+    def count(self) -> int:
+        try:
+            return self._connect().execute("SELECT COUNT(*) FROM generated_curricula").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+generated_store = GeneratedCurriculumStore(GENERATED_STORE_PATH, GENERATED_STORE_MAX_AGE)
@@ -0,0 +1,333 @@
+"""Background jobs for AI-tier curriculum generation.
+
+POST /generate with `Prefer: respond-async` answers 202 with a job id instead of holding the
+connection (and a threadpool worker) while Gemini works; clients poll GET /jobs/{id} or follow
+GET /jobs/{id}/events (SSE). Jobs are rows in a SQLite file (WAL), so every worker can report on
+any job and queued work survives a restart:
+  - each process runs jobs on a bounded thread pool (JOB_WORKERS) and refuses new ones once
+    JOB_MAX_PENDING are queued or running there,
+  - a job is leased to the process running it; a sweeper renews its own leases and takes over
+    jobs whose lease lapsed (a crashed or restarted worker), restarting them from scratch,
+  - finished jobs are kept for JOB_RETENTION_SECONDS, then purged.
+Progress is counted in semesters as the Gemini stream delivers them.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from metrics import curriculum_tier_total
+from outbound_scheduler import outbound_priority
+from schemas import CurriculumResponse
+
+load_dotenv()
+
+GENERATION_JOBS_PATH = os.getenv(
+    "GENERATION_JOBS_PATH", os.path.join(os.path.dirname(__file__), "generation_jobs.sqlite3")
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "64"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+# A job whose owner stops renewing for this long is taken over by another process
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_SWEEP_SECONDS = JOB_LEASE_SECONDS / 4
+
+ACTIVE_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobQueueFull(Exception):
+    """This process already has JOB_MAX_PENDING jobs queued or running."""
+
+
+# ==========================================
+# PERSISTENCE
+# ==========================================
+class JobStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS jobs ("
+                        " id TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status TEXT NOT NULL,"
+                        " request TEXT NOT NULL, tier TEXT, semesters_done INTEGER NOT NULL DEFAULT 0,"
+                        " total_semesters INTEGER, result TEXT, error TEXT, owner TEXT, lease_expires REAL NOT NULL,"
+                        " created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint)")
+                    self._initialized = True
+        return conn
+
+    def create(self, job_id: str, fingerprint: str, data: Dict[str, Any], owner: str) -> Tuple[str, bool]:
+        """
+        Insert a queued job unless one with the same fingerprint is active. Returns (job_id, created).
+        The check and the insert share one IMMEDIATE transaction, so concurrent workers create one job.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = self._find_active(conn, fingerprint)
+            if existing is None:
+                conn.execute(
+                    "INSERT INTO jobs (id, fingerprint, status, request, owner, lease_expires, created_at)"
+                    " VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, fingerprint, json.dumps(data, ensure_ascii=False), owner, now + JOB_LEASE_SECONDS, now),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return (job_id, True) if existing is None else (existing, False)
+
+    def find_active(self, fingerprint: str) -> str | None:
+        return self._find_active(self._connect(), fingerprint)
+
+    @staticmethod
+    def _find_active(conn: sqlite3.Connection, fingerprint: str) -> str | None:
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE fingerprint = ? AND status IN ('queued', 'running') ORDER BY created_at LIMIT 1",
+            (fingerprint,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        row = self._connect().execute(
+            "SELECT status, tier, semesters_done, total_semesters, result, error, created_at, started_at, finished_at"
+            " FROM jobs WHERE id = ?", (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        status, tier, done, total, result, error, created_at, started_at, finished_at = row
+        if finished_at is not None and finished_at + JOB_RETENTION_SECONDS < time.time():
+            return None
+        job = {
+            "job_id": job_id, "status": status, "tier": tier,
+            "progress": {"semesters_done": done, "total_semesters": total},
+            "created_at": created_at, "started_at": started_at, "finished_at": finished_at,
+        }
+        if finished_at is not None:
+            job["expires_at"] = finished_at + JOB_RETENTION_SECONDS
+        if error:
+            job["error"] = error
+        if result:
+            job["result"] = json.loads(result)
+        return job
+
+    def update(self, job_id: str, owner: str, **fields):
+        """Update a job this process still owns (a job taken over by another process is left alone)."""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connect().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ?", (*fields.values(), job_id, owner)
+        )
+
+    def renew(self, owner: str):
+        self._connect().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status IN ('queued', 'running')",
+            (time.time() + JOB_LEASE_SECONDS, owner),
+        )
+
+    def claim_orphans(self, owner: str, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """Take over active jobs whose lease lapsed; they restart from the queue."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, request FROM jobs WHERE status IN ('queued', 'running') AND lease_expires < ?"
+                " ORDER BY created_at LIMIT ?", (now, limit),
+            ).fetchall()
+            for job_id, _ in rows:
+                conn.execute(
+                    "UPDATE jobs SET owner = ?, lease_expires = ?, status = 'queued', semesters_done = 0,"
+                    " started_at = NULL WHERE id = ?", (owner, now + JOB_LEASE_SECONDS, job_id),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [(job_id, json.loads(request)) for job_id, request in rows]
+
+    def release_queued(self, owner: str):
+        """On shutdown: let the next process pick up our queued jobs immediately."""
+        self._connect().execute("UPDATE jobs SET lease_expires = 0 WHERE owner = ? AND status = 'queued'", (owner,))
+
+    def purge(self):
+        self._connect().execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - JOB_RETENTION_SECONDS,)
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+
+# ==========================================
+# WORKER POOL
+# ==========================================
+class JobQueue:
+    def __init__(self, store: JobStore, workers: int, max_pending: int):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.pending = 0
+        self.recovered = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self._sweeper: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the pool and the lease sweeper; the first sweep recovers jobs left by a previous process."""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="generation-job")
+        self.sweep()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="generation-job-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        self._stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.store.release_queued(self.owner)
+        except sqlite3.Error as e:
+            print(f"[JOBS] Could not release queued jobs (they resume after the lease expires): {e}")
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                return False
+            self.pending += 1
+            return True
+
+    def _dispatch(self, job_id: str, data: Dict[str, Any]):
+        with self._lock:
+            executor = self._executor
+        if executor is None:
+            # Shutting down: the job stays queued in the store for the next process
+            with self._lock:
+                self.pending -= 1
+            return
+        executor.submit(self._run, job_id, data)
+
+    def submit(self, data: Dict[str, Any], fingerprint: str) -> Tuple[str, bool]:
+        """Queue a generation. Returns (job_id, created); an identical active job is reused."""
+        self.start()
+        if not self._reserve():
+            # No room here, but an identical job that is already running elsewhere can still be shared
+            existing = self.store.find_active(fingerprint)
+            if existing is not None:
+                return existing, False
+            raise JobQueueFull()
+        created = False
+        try:
+            job_id, created = self.store.create(uuid.uuid4().hex, fingerprint, data, self.owner)
+        finally:
+            if not created:  # reused an active job, or the insert failed
+                with self._lock:
+                    self.pending -= 1
+        if created:
+            self._dispatch(job_id, data)
+        return job_id, created
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        return self.store.get(job_id)
+
+    def _run(self, job_id: str, data: Dict[str, Any]):
+        from ai_engine import stream_curriculum_with_gemini
+        # Job threads only run jobs: nobody is blocked on the response, so yield slots to interactive calls
+        outbound_priority.set("batch")
+        try:
+            self.store.update(job_id, self.owner, status="running", started_at=time.time())
+            curriculum: Dict[str, Any] = {}
+            courses: Dict[str, list] = {}
+            tier = None
+            for event in stream_curriculum_with_gemini(data):
+                kind = event["event"]
+                if kind == "program":  # a mid-stream reset sends a second program event
+                    tier = event.get("tier")
+                    curriculum = {k: v for k, v in event.items() if k not in ("event", "tier")}
+                    courses = {}
+                    self.store.update(job_id, self.owner, tier=tier, semesters_done=0,
+                                      total_semesters=curriculum.get("total_semesters"))
+                elif kind == "semester":
+                    courses[event["semester"]] = event["courses"]
+                    self.store.update(job_id, self.owner, semesters_done=len(courses))
+                elif kind == "complete":
+                    curriculum.update({k: v for k, v in event.items() if k != "event"})
+            curriculum["courses_by_semester"] = courses
+            result = CurriculumResponse(**curriculum).model_dump()
+            self.store.update(job_id, self.owner, status="succeeded", finished_at=time.time(),
+                              result=json.dumps(result, ensure_ascii=False))
+            curriculum_tier_total.inc(endpoint="/jobs", tier=tier)
+            print(f"[JOB DONE] {job_id} ({tier})")
+        except Exception as e:
+            print(f"[JOB FAILED] {job_id}: {e}")
+            try:
+                self.store.update(job_id, self.owner, status="failed", finished_at=time.time(), error=str(e))
+            except sqlite3.Error:
+                pass
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def sweep(self):
+        """Renew our leases, adopt orphaned jobs while there is room, and purge expired results."""
+        try:
+            self.store.renew(self.owner)
+            with self._lock:
+                room = self.max_pending - self.pending
+            if room > 0:
+                orphans = self.store.claim_orphans(self.owner, room)
+                for job_id, data in orphans:
+                    with self._lock:
+                        self.pending += 1
+                    self.recovered += 1
+                    print(f"[JOBS] Resuming job {job_id} left by a previous worker")
+                    self._dispatch(job_id, data)
+            self.store.purge()
+        except sqlite3.Error as e:
+            print(f"[JOBS] Sweep failed: {e}")
+
+    def _sweep_loop(self):
+        while not self._stop.wait(JOB_SWEEP_SECONDS):
+            self.sweep()
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            counts = self.store.counts()
+        except sqlite3.Error:
+            counts = {}
+        return {"workers": self.workers, "pending_here": self.pending, "max_pending": self.max_pending,
+                "recovered": self.recovered, "by_status": counts}
+
+
+job_queue = JobQueue(JobStore(GENERATION_JOBS_PATH), JOB_WORKERS, JOB_MAX_PENDING)
@@ -0,0 +1,27 @@
+"""Gunicorn settings for multi-worker deployment: `gunicorn main:app -c gunicorn.conf.py`.
+
+Each worker is a uvicorn event loop in its own process. Host-wide state lives in SQLite files (WAL)
+that every worker opens: shared_state.sqlite3 (Gemini quota window, circuit breaker, generation
+leases, Idempotency-Key results), generated_curricula.sqlite3 (stored Gemini curricula) and
+response_cache.sqlite3 (OpenRouter responses). Adding workers therefore adds throughput without
+multiplying upstream calls. Keep those files on a local disk shared by the workers.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# WEB_CONCURRENCY is the convention on Render/Heroku; default one worker per core
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# uvicorn.workers is deprecated; the worker now ships as the uvicorn-worker package
+worker_class = "uvicorn_worker.UvicornWorker"
+# A Gemini generation can take most of a minute
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+# Background threads (template prewarm, event log writer, database watcher) start per worker in the
+# app's lifespan, so the app is imported after the fork rather than preloaded in the master
+preload_app = False
+
+# Split the bulk-generation process pool between workers instead of giving each one a pool per core
+os.environ.setdefault("BULK_PROCESSES", str(max(1, multiprocessing.cpu_count() // workers)))
@@ -0,0 +1,161 @@
+"""Tolerant extraction of JSON objects from LLM output.
+
+An intact object is decoded in place from its first "{" (json's raw_decode stops at the end of the
+object, so surrounding prose and markdown fences are ignored without regex backtracking). Damaged
+output gets one linear scan that tracks strings, escapes and bracket nesting, repairing on the way:
+  - trailing commas before "}" or "]" are dropped,
+  - a truncated tail is cut back to the last complete value and the open brackets are closed.
+The result can be validated against a pydantic model, so a repaired-but-incomplete answer is
+rejected instead of being served.
+"""
+import re
+import json
+from typing import Any, Dict, List, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+# Structural characters outside strings, and the characters that end or escape inside one
+_STRUCTURAL = re.compile(r'[{}\[\]",:]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+_DECODER = json.JSONDecoder()
+# How many "{" to try before giving up (prose such as "use {braces}" can precede the answer)
+MAX_CANDIDATES = 8
+
+
+class JsonExtractionError(ValueError):
+    """No usable JSON object in the response, or it does not match the expected model."""
+
+
+def _string_end(text: str, pos: int) -> int:
+    """Index of the quote closing the string whose body starts at pos, or -1 if the text ends first."""
+    while True:
+        match = _STRING_SPECIAL.search(text, pos)
+        if match is None:
+            return -1
+        if text[match.start()] == '"':
+            return match.start()
+        pos = match.start() + 2  # skip the escaped character
+
+
+def _join(text: str, start: int, end: int, drops: List[int]) -> str:
+    if not drops:
+        return text[start:end]
+    parts, pos = [], start
+    for drop in drops:
+        if drop >= end:
+            break
+        parts.append(text[pos:drop])
+        pos = drop + 1
+    parts.append(text[pos:end])
+    return "".join(parts)
+
+
+def _scan(text: str, start: int) -> Tuple[str, bool] | None:
+    """
+    Scan the object opening at text[start]. Returns (candidate, repaired): the balanced object, or
+    the text up to the last complete value plus the missing closers. None on mismatched brackets.
+    """
+    stack: List[str] = []
+    closers = ""             # closers for the open containers, innermost first
+    drops: List[int] = []    # trailing commas to remove
+    last_comma = -1          # a comma not yet followed by a value
+    key_pending = False      # next string in the current object is a key
+    safe_end, safe_closers = start + 1, "}"
+    pos = start
+
+    while True:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            break
+        i = match.start()
+        c = text[i]
+        if last_comma >= 0 and text[pos:i].strip():
+            last_comma = -1  # a scalar value followed the comma
+        if c == '"':
+            end = _string_end(text, i + 1)
+            if end < 0:
+                break
+            last_comma = -1
+            if not (key_pending and stack[-1] == "{"):
+                safe_end, safe_closers = end + 1, closers
+            pos = end + 1
+            continue
+        if c == "{" or c == "[":
+            stack.append(c)
+            closers = _CLOSERS[c] + closers
+            key_pending = c == "{"
+            last_comma = -1
+            safe_end, safe_closers = i + 1, closers
+        elif c == "}" or c == "]":
+            if not stack or _CLOSERS[stack[-1]] != c:
+                return None
+            if last_comma >= 0:
+                drops.append(last_comma)
+                last_comma = -1
+            stack.pop()
+            closers = closers[1:]
+            if not stack:
+                return _join(text, start, i + 1, drops), bool(drops)
+            key_pending = False
+            safe_end, safe_closers = i + 1, closers
+        elif c == ",":
+            if last_comma < 0 and stack:
+                safe_end, safe_closers = i, closers
+            last_comma = i
+            key_pending = stack[-1] == "{"
+        else:  # ":"
+            key_pending = False
+        pos = i + 1
+
+    # Truncated: keep everything up to the last complete value and close what is still open
+    return _join(text, start, safe_end, drops) + safe_closers, True
+
+
+def _extract_object(text: str) -> Dict[str, Any]:
+    start = text.find("{")
+    for _ in range(MAX_CANDIDATES):
+        if start < 0:
+            break
+        # Intact object followed by prose or a closing fence: the C decoder stops at its end
+        try:
+            obj = _DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            obj = None
+        if isinstance(obj, dict):
+            return obj
+        scanned = _scan(text, start)
+        if scanned is not None:
+            candidate, repaired = scanned
+            try:
+                obj = json.loads(candidate)
+            except ValueError:
+                obj = None
+            if isinstance(obj, dict):
+                if repaired:
+                    print(f"[JSON REPAIR] Repaired LLM output ({len(text)} chars -> {len(candidate)} chars)")
+                return obj
+        start = text.find("{", start + 1)
+    raise JsonExtractionError("No valid JSON object found in response")
+
+
+def validate_json(obj: Dict[str, Any], model: type[BaseModel]) -> Dict[str, Any]:
+    """Raise JsonExtractionError unless obj matches the model; returns obj unchanged."""
+    try:
+        model.model_validate(obj)
+    except ValidationError as e:
+        raise JsonExtractionError(f"Response does not match {model.__name__} ({e.error_count()} errors)") from e
+    return obj
+
+
+def extract_json(text: str, model: type[BaseModel] | None = None) -> Dict[str, Any]:
+    """
+    Return the first JSON object in an LLM response, repairing trailing commas and truncation.
+    When model is given the object must validate against it.
+    """
+    if not text or not text.strip():
+        raise JsonExtractionError("Empty response")
+    obj = _extract_object(text)
+    if model is not None:
+        validate_json(obj, model)
+    return obj
@@ -1,23 +1,117 @@
-from fastapi import FastAPI, Request
+import csv
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response, HTTPException, Header
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 
 from schemas import CurriculumRequest, CurriculumResponse
-from ai_engine import generate_curriculum_with_gemini
-from chatbot import get_chat_response
+from fast_json import etag_matches, strong_etag
+from compression import CompressionMiddleware, get_compression_stats
+from static_assets import StaticAssets
+from ai_engine import (
+    generate_curriculum_with_tier, stream_curriculum_with_gemini, resolve_local_tier,
+    get_curriculum_index, get_domain_resolver, resolve_served_curriculum, preload_local_tiers,
+)
+from curriculum_stream import curriculum_events
+from curriculum_views import (
+    parse_projection, project_body, project_curriculum, course_detail_body,
+    encode_curriculum_id, decode_curriculum_id,
+)
+from curriculum_templates import start_template_prewarm, get_template_cache_stats
+from chatbot import get_chat_response, stream_chat_response
 from syllabus_generator import generate_syllabus
 from gap_analyzer import analyze_gap
+from openrouter_client import close_client
+from response_cache import get_cache_stats
+from program_bundle import stream_program_bundle
+from gemini_scheduler import gemini_scheduler
+from provider_cassette import cassette
+from event_log import RequestIdMiddleware, start_event_log, stop_event_log, get_event_log_stats
+from metrics import MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE, curriculum_tier_total, register_gauge_function, render_metrics
+from request_dedup import (
+    normalize_curriculum_request, request_fingerprint, generate_flight, generate_stream_flight, idempotency_store,
+)
+from generation_jobs import job_queue, JobQueueFull, TERMINAL_STATUSES
+from outbound_scheduler import outbound_scheduler, OutboundRejected
+from bulk_generate import BULK_MAX_ITEMS, parse_csv, parse_json, validate_items, run_bulk, get_bulk_pool, shutdown_bulk_pool
+
+
+def run_startup() -> list:
+    """Preload the local tiers and start background workers. Returns [(step, ms), ...]."""
+    steps = (
+        ("curriculum database", preload_local_tiers),
+        ("static assets", static_assets.ensure_loaded),
+        # Build every program x domain template combination in the background
+        ("template prewarm", start_template_prewarm),
+        ("event log", start_event_log),
+        # Resumes jobs left queued or running by a previous process
+        ("generation jobs", job_queue.start),
+    )
+    timings = []
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings.append((name, round((time.perf_counter() - started) * 1000, 1)))
+    print("[STARTUP] " + ", ".join(f"{name} {ms} ms" for name, ms in timings))
+    return timings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    run_startup()
+    yield
+    # Release pooled OpenRouter connections and bulk-generation workers
+    await close_client()
+    shutdown_bulk_pool()
+    job_queue.stop()
+    stop_event_log()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+
+@app.exception_handler(OutboundRejected)
+async def outbound_rejected(request: Request, exc: OutboundRejected):
+    """The upstream model is saturated for this priority class: fail fast instead of queueing."""
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
 
-app = FastAPI()
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Static files: hashed, precompressed and held in memory (loaded by run_startup)
+static_assets = StaticAssets("static")
 
 # Templates
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_assets.url
+
+# Pages have no per-request content: each is rendered once, and repeat views revalidate to a 304
+_rendered_pages: dict = {}
+
+
+def render_page(request: Request, name: str) -> Response:
+    page = _rendered_pages.get(name)
+    if page is None:
+        body = templates.TemplateResponse(request, name).body
+        page = _rendered_pages[name] = (body, strong_etag(body))
+    body, etag = page
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def static_file(path: str, request: Request):
+    """Hashed asset URLs are cached as immutable; plain names are revalidated against their ETag."""
+    return static_assets.response(path, request.headers.get("accept-encoding"), request.headers.get("if-none-match"))
 
 
 # Request models
@@ -33,52 +127,306 @@ class GapRequest(BaseModel):
     curriculum_summary: str
     job_description: str
 
+class BundleRequest(BaseModel):
+    curriculum: Optional[dict] = None
+    database_key: Optional[str] = None  # e.g. "B.Tech_Data Science"
+    include_syllabus: bool = True
+    include_resources: bool = True
+
 
 @app.get("/", response_class=HTMLResponse)
 def get_home(request: Request):
-    return templates.TemplateResponse("home.html", {"request": request})
+    return render_page(request, "home.html")
 
 @app.get("/generate", response_class=HTMLResponse)
 def get_generate(request: Request):
-    return templates.TemplateResponse("generate.html", {"request": request})
+    return render_page(request, "generate.html")
 
 @app.get("/gap", response_class=HTMLResponse)
 def get_gap(request: Request):
-    return templates.TemplateResponse("gap.html", {"request": request})
+    return render_page(request, "gap.html")
 
 @app.get("/about", response_class=HTMLResponse)
 def get_about(request: Request):
-    return templates.TemplateResponse("about.html", {"request": request})
+    return render_page(request, "about.html")
 
 @app.get("/contact", response_class=HTMLResponse)
 def get_contact(request: Request):
-    return templates.TemplateResponse("contact.html", {"request": request})
+    return render_page(request, "contact.html")
 
 @app.post("/generate", response_model=CurriculumResponse)
-def generate_curriculum(data: CurriculumRequest):
-    input_data = data.dict()
-    result_dict = generate_curriculum_with_gemini(input_data)
+def generate_curriculum(
+    data: CurriculumRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    prefer: Optional[str] = Header(None, alias="Prefer"),
+    view: str = "full",
+    fields: Optional[str] = None,
+    semesters: Optional[str] = None,
+):
+    """
+    Generate a curriculum. `view=skeleton` returns only the header and course stubs for first
+    paint, `fields` / `semesters` select parts of the document; every response carries an
+    X-Curriculum-Id for GET /curricula/{id}/courses/{code}. With `Prefer: respond-async`, a
+    request that needs the AI tier answers 202 with a job id (see /jobs/{job_id}).
+    """
+    try:
+        projection = parse_projection(view, fields, semesters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    input_data = normalize_curriculum_request(data.dict())
+    fingerprint = request_fingerprint(input_data)
+
+    # A retried request with the same Idempotency-Key gets the stored result back
+    if idempotency_key:
+        stored = idempotency_store.get(idempotency_key)
+        if stored is not None:
+            stored_fingerprint, stored_result = stored
+            if stored_fingerprint != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request.")
+            idempotency_store.replayed += 1
+            curriculum_tier_total.inc(endpoint="/generate", tier="replay")
+            curriculum_id = encode_curriculum_id(input_data, "replay")
+            headers = {"Idempotent-Replayed": "true", "X-Curriculum-Id": curriculum_id}
+            if projection is not None:
+                return Response(content=project_curriculum(stored_result, projection, curriculum_id),
+                                media_type="application/json", headers=headers)
+            response.headers.update(headers)
+            return CurriculumResponse(**stored_result)
+
+    # Fast path: database/template hits are already serialized JSON, so skip pydantic entirely.
+    # Clients that send back the ETag get a bodyless 304 when the curriculum has not changed.
+    tier, body = resolve_local_tier(input_data, as_bytes=True)
+    if body is not None:
+        curriculum_tier_total.inc(endpoint="/generate", tier=tier)
+        curriculum_id = encode_curriculum_id(input_data, tier)
+        if projection is not None:
+            body = project_body(body, projection, curriculum_id)
+        headers = {"X-Curriculum-Tier": tier, "X-Curriculum-Id": curriculum_id,
+                   "ETag": body.etag, "Cache-Control": "no-cache"}
+        resolved_domain = _resolved_domain(input_data)
+        if resolved_domain is not None:
+            headers["X-Domain-Resolved"] = resolved_domain
+        if etag_matches(if_none_match, body.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    if prefer and "respond-async" in prefer.lower():
+        return submit_generation_job(input_data, fingerprint)
+
+    # Identical requests in flight share one upstream generation
+    (tier, result_dict), _ = generate_flight.do(fingerprint, lambda: generate_curriculum_with_tier(input_data))
+    curriculum_tier_total.inc(endpoint="/generate", tier=tier)
+    curriculum_id = encode_curriculum_id(input_data, tier)
+
+    if idempotency_key:
+        idempotency_store.set(idempotency_key, fingerprint, result_dict)
+    if projection is not None:
+        return Response(content=project_curriculum(result_dict, projection, curriculum_id),
+                        media_type="application/json",
+                        headers={"X-Curriculum-Tier": tier, "X-Curriculum-Id": curriculum_id})
+    response.headers["X-Curriculum-Tier"] = tier
+    response.headers["X-Curriculum-Id"] = curriculum_id
     return CurriculumResponse(**result_dict)
 
 
+def _resolved_domain(input_data: dict) -> str | None:
+    """The canonical domain a local-tier answer was served for, when it differs from the one requested."""
+    canonical, _ = get_domain_resolver().resolve(input_data.get("domain", ""), count=False)
+    return canonical if canonical is not None and canonical != input_data.get("domain") else None
+
+
+def submit_generation_job(input_data: dict, fingerprint: str) -> Response:
+    try:
+        job_id, created = job_queue.submit(input_data, fingerprint)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many generation jobs queued; retry shortly.",
+                            headers={"Retry-After": "10"})
+    status_url = f"/jobs/{job_id}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued" if created else "existing",
+                 "status_url": status_url, "events_url": f"{status_url}/events"},
+        headers={"Location": status_url, "Retry-After": "2", "Preference-Applied": "respond-async"},
+    )
+
+
+@app.get("/jobs/{job_id}")
+def get_generation_job(job_id: str):
+    """Status, semester progress and (once succeeded) the curriculum of a generation job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    if job["status"] not in TERMINAL_STATUSES:
+        return JSONResponse(job, headers={"Retry-After": "2", "Cache-Control": "no-cache"})
+    return job
+
+
+# How often the SSE stream re-reads the job, and the idle gap that triggers a keep-alive comment
+JOB_EVENTS_POLL_SECONDS = 0.5
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+
+@app.get("/jobs/{job_id}/events")
+async def generation_job_events(job_id: str):
+    """
+    Job progress as server-sent events: `event: progress` whenever status or semester count
+    changes, then `event: done` with the final job (including the result). Any worker can serve it.
+    """
+    if await asyncio.to_thread(job_queue.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+
+    async def events():
+        last, idle = None, 0.0
+        while True:
+            job = await asyncio.to_thread(job_queue.get, job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'detail': 'Job expired'})}\n\n"
+                return
+            if job["status"] in TERMINAL_STATUSES:
+                yield f"event: done\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                return
+            snapshot = (job["status"], job["tier"], job["progress"]["semesters_done"])
+            if snapshot != last:
+                last, idle = snapshot, 0.0
+                yield f"event: progress\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            elif idle >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"  # stops proxies from closing an idle stream
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+            idle += JOB_EVENTS_POLL_SECONDS
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/curricula/{curriculum_id}/courses/{course_code}")
+def get_course_detail(
+    curriculum_id: str,
+    course_code: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+):
+    """Full record (weekly topics, outcomes, ...) of one course from a curriculum returned by /generate."""
+    try:
+        data, tier = decode_curriculum_id(curriculum_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # Never calls Gemini: AI results are found again in the generated store
+    body = resolve_served_curriculum(data, tier)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Curriculum is no longer available; generate it again.")
+    detail = course_detail_body(body, curriculum_id, course_code)
+    if detail is None:
+        raise HTTPException(status_code=404, detail=f"No course {course_code} in this curriculum.")
+    headers = {"ETag": detail.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, detail.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=detail, media_type="application/json", headers=headers)
+
+
+@app.post("/generate/stream")
+def generate_curriculum_stream(data: CurriculumRequest):
+    """
+    Stream curriculum generation as NDJSON: a program header, one line per semester, then the rest.
+    Identical requests in flight (e.g. a double-click) share one AI-tier generation.
+    """
+    input_data = normalize_curriculum_request(data.dict())
+    tier, local_result = resolve_local_tier(input_data)
+    if local_result:
+        events = curriculum_events(local_result, tier)
+        if _resolved_domain(input_data) is not None:
+            events = _mark_resolved_domain(events, input_data["domain"])
+    else:
+        events = generate_stream_flight.stream(request_fingerprint(input_data),
+                                               lambda: stream_curriculum_with_gemini(input_data))
+
+    def lines():
+        # Sync generator: Starlette iterates it in the threadpool, so blocking Gemini reads are fine
+        tier = None
+        for event in events:
+            if event["event"] == "program":
+                tier = event.get("tier")  # a mid-stream reset sends a second program event
+            elif event["event"] == "complete":
+                curriculum_tier_total.inc(endpoint="/generate/stream", tier=tier)
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _mark_resolved_domain(events, requested: str):
+    """Tell the client its domain was mapped onto a canonical one (the program event carries the new name)."""
+    for event in events:
+        if event["event"] == "program":
+            event = {**event, "domain_resolved_from": requested}
+        yield event
+
+
+@app.post("/generate/bulk")
+async def generate_curriculum_bulk(request: Request):
+    """
+    Generate many curricula in one call. Body: a JSON list of requests, {"requests": [...]},
+    or text/csv with a header row. Streams one NDJSON line per item in completion order.
+    """
+    try:
+        body = (await request.body()).decode("utf-8")
+        if "csv" in request.headers.get("content-type", ""):
+            raw_items = parse_csv(body)
+        else:
+            raw_items = parse_json(body)
+    except (ValueError, csv.Error) as e:  # UnicodeDecodeError and JSONDecodeError are ValueErrors
+        raise HTTPException(status_code=422, detail=f"Could not parse bulk request body: {e}")
+    if not raw_items:
+        raise HTTPException(status_code=422, detail="No requests supplied.")
+    if len(raw_items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} requests per call.")
+
+    items = validate_items(raw_items)
+
+    async def lines():
+        async for tier, line in run_bulk(items, pool=get_bulk_pool()):
+            curriculum_tier_total.inc(endpoint="/generate/bulk", tier=tier or "error")
+            yield line
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.post("/chat")
-def chat(data: ChatRequest):
+async def chat(data: ChatRequest):
     """Handle chatbot messages."""
-    response = get_chat_response(data.message)
+    response = await get_chat_response(data.message)
     return {"response": response}
 
 
+@app.post("/chat/stream")
+async def chat_stream(data: ChatRequest):
+    """Stream chatbot replies as server-sent events (`data: {"delta": ...}`, then `event: done`)."""
+    async def events():
+        async for delta in stream_chat_response(data.message):
+            yield f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/generate-syllabus")
-def syllabus(data: SyllabusRequest):
+async def syllabus(data: SyllabusRequest):
     """Generate detailed syllabus for a course."""
-    result = generate_syllabus(data.course_name, data.program, data.domain)
+    result = await generate_syllabus(data.course_name, data.program, data.domain)
     return {"syllabus": result}
 
 
 @app.post("/analyze-gap")
-def gap(data: GapRequest):
+async def gap(data: GapRequest):
     """Analyze gap between curriculum and job requirements."""
-    result = analyze_gap(data.curriculum_summary, data.job_description)
+    result = await analyze_gap(data.curriculum_summary, data.job_description)
     return {"analysis": result}
 
 
@@ -88,8 +436,81 @@ class ResourceRequest(BaseModel):
 
 
 @app.post("/get-resources")
-def resources(data: ResourceRequest):
+async def resources(data: ResourceRequest):
     """Get curated learning resources for a course."""
     from resource_hub import get_course_resources
-    result = get_course_resources(data.course_name, data.domain)
-    return result
\ No newline at end of file
+    result = await get_course_resources(data.course_name, data.domain)
+    return result
+
+
+@app.post("/program-bundle")
+async def program_bundle(data: BundleRequest):
+    """Stream syllabi and resources for every course in a curriculum as NDJSON, one line per course."""
+    curriculum = data.curriculum
+    if curriculum is None and data.database_key:
+        program_type, _, domain = data.database_key.partition("_")
+        curriculum = get_curriculum_index().get(program_type, domain)
+        if curriculum is None:
+            raise HTTPException(status_code=404, detail=f"No curriculum found for: {data.database_key}")
+    if curriculum is None:
+        raise HTTPException(status_code=422, detail="Provide either 'curriculum' or 'database_key'.")
+
+    async def lines():
+        async for event in stream_program_bundle(curriculum, data.include_syllabus, data.include_resources):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Response cache hit/miss counters per module, plus the template memo, provider cassette and compression."""
+    return {**get_cache_stats(), "templates": get_template_cache_stats(), "provider_cassette": cassette.get_stats(),
+            "compression": get_compression_stats()}
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of route latency, generation tiers, LLM calls and token usage."""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+def _gemini_gauge(field: str):
+    return lambda: {(): float(gemini_scheduler.status()[field])}
+
+
+register_gauge_function("currhub_gemini_circuit_open", "1 while the Gemini circuit breaker is open.", (), _gemini_gauge("circuit_open"))
+register_gauge_function("currhub_gemini_requests_in_window", "Gemini calls admitted in the last minute.", (), _gemini_gauge("requests_in_window"))
+register_gauge_function("currhub_gemini_tokens_in_window", "Estimated Gemini input tokens admitted in the last minute.", (), _gemini_gauge("tokens_in_window"))
+register_gauge_function("currhub_gemini_rpm_limit", "Configured Gemini requests-per-minute limit.", (), _gemini_gauge("rpm_limit"))
+register_gauge_function("currhub_gemini_waiting", "Requests waiting for Gemini quota.", (), _gemini_gauge("waiting"))
+
+
+@app.get("/gemini-status")
+def gemini_status():
+    """Gemini quota window usage and circuit breaker state, plus the AI event log writer, job queue and outbound slots."""
+    return {**gemini_scheduler.status(), "event_log": get_event_log_stats(), "jobs": job_queue.stats(),
+            "outbound": outbound_scheduler.status()}
+
+
+@app.get("/domain-stats")
+def domain_stats():
+    """Domain resolver match counts, including requests rescued from the AI tier."""
+    return get_domain_resolver().get_stats()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run CurrHub with uvicorn.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import and initialization time per module in a fresh process, then exit")
+    args = parser.parse_args()
+    if args.profile_startup:
+        from startup_profile import print_startup_profile
+        print_startup_profile()
+    else:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port)
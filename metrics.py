@@ -0,0 +1,314 @@
+"""In-process Prometheus metrics: counters, gauges and histograms rendered in the text exposition format.
+
+Metrics are per process; with several workers, scrape each one (or aggregate in Prometheus).
+"""
+import re
+import json
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from starlette.routing import Match
+
+# Latency buckets (seconds) for HTTP routes and upstream LLM calls
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_LE_INF = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function: Callable[[], Dict[Tuple[str, ...], float]] | None = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        # Optional callback evaluated at scrape time: returns {label values tuple: value}
+        self._function = function
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        if self._function is not None:
+            items = sorted(self._function().items())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Tuple[float, ...] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, _LE_INF)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ==========================================
+# APPLICATION METRICS
+# ==========================================
+http_request_duration = registry.register(Histogram(
+    "currhub_http_request_duration_seconds", "HTTP request latency until the last body byte is sent.",
+    ("method", "route", "status"), HTTP_BUCKETS))
+http_requests_in_flight = registry.register(Gauge(
+    "currhub_http_requests_in_flight", "HTTP requests currently being served.", ("method", "route")))
+curriculum_tier_total = registry.register(Counter(
+    "currhub_curriculum_tier_total", "Curricula served, by endpoint and the tier that produced them.",
+    ("endpoint", "tier")))
+llm_request_duration = registry.register(Histogram(
+    "currhub_llm_request_duration_seconds", "Upstream LLM call latency (full response or stream).",
+    ("provider", "module", "model"), LLM_BUCKETS))
+llm_requests_total = registry.register(Counter(
+    "currhub_llm_requests_total", "Upstream LLM calls by outcome (HTTP status, 'timeout' or 'error').",
+    ("provider", "module", "model", "status")))
+llm_tokens_total = registry.register(Counter(
+    "currhub_llm_tokens_total", "Tokens reported by upstream LLM responses.",
+    ("provider", "module", "model", "type")))
+llm_requests_in_flight = registry.register(Gauge(
+    "currhub_llm_requests_in_flight", "Upstream LLM calls currently open.", ("provider", "module")))
+gemini_prompt_tokens_saved_total = registry.register(Counter(
+    "currhub_gemini_prompt_tokens_saved_total",
+    "Gemini input tokens saved by the compact structured-output prompt versus the prose prompt (estimated).",
+    ("mode",)))
+
+
+def register_gauge_function(name: str, documentation: str, labelnames: Tuple[str, ...],
+                            function: Callable[[], Dict[Tuple[str, ...], float]]):
+    """Expose values read from elsewhere (scheduler, caches) at scrape time."""
+    registry.register(Gauge(name, documentation, labelnames, function))
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+# ==========================================
+# LLM CALL TRACKING
+# ==========================================
+_USAGE_PATTERN = re.compile(r'"usage"\s*:\s*(\{[^{}]*\})')
+
+
+class track_llm_call:
+    """
+    Context manager timing one upstream LLM call:
+
+        with track_llm_call("openrouter", "chatbot", model) as call:
+            response = ...
+            call.status = response.status_code
+            call.tokens(prompt, completion)
+
+    Exceptions are counted as the error's status code if it has one, else "timeout", "cancelled" or "error".
+    """
+
+    def __init__(self, provider: str, module: str, model: str):
+        self.labels = {"provider": provider, "module": module, "model": model}
+        self.status = None
+
+    def tokens(self, prompt: int | None, completion: int | None):
+        if prompt:
+            llm_tokens_total.inc(prompt, type="prompt", **self.labels)
+        if completion:
+            llm_tokens_total.inc(completion, type="completion", **self.labels)
+
+    def usage_from_body(self, body: str):
+        """Count OpenAI-style `usage` from a raw response body without parsing the whole document."""
+        match = _USAGE_PATTERN.search(body)
+        if match:
+            try:
+                usage = json.loads(match.group(1))
+            except ValueError:
+                return
+            self.tokens(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        llm_requests_in_flight.inc(provider=self.labels["provider"], module=self.labels["module"])
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        llm_requests_in_flight.dec(provider=self.labels["provider"], module=self.labels["module"])
+        llm_request_duration.observe(time.perf_counter() - self._started, **self.labels)
+        status = self.status
+        if status is None:
+            if exc_type is None:
+                status = "ok"
+            elif exc_type is GeneratorExit or exc_type.__name__ == "CancelledError":
+                status = "cancelled"  # the client went away mid-stream
+            elif "Timeout" in exc_type.__name__ or "DeadlineExceeded" in exc_type.__name__:
+                status = "timeout"
+            else:
+                status = getattr(exc, "status_code", None) or getattr(exc, "code", None) or "error"
+        llm_requests_total.inc(status=str(status), **self.labels)
+        return False
+
+
+# ==========================================
+# HTTP MIDDLEWARE
+# ==========================================
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency (through the end of streamed bodies) and in-flight requests."""
+
+    _ROUTE_CACHE_LIMIT = 1024
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+        self._route_cache: Dict[Tuple[str, str], str] = {}
+
+    def _route_label(self, scope) -> str:
+        key = (scope["method"], scope["path"])
+        label = self._route_cache.get(key)
+        if label is not None:
+            return label
+        if self._routes is None:
+            self._routes = scope["app"].router.routes
+        label = "unmatched"
+        for route in self._routes:
+            match, _ = route.matches(scope)
+            if match != Match.NONE:
+                label = route.path
+                if match == Match.FULL:
+                    break
+        if len(self._route_cache) < self._ROUTE_CACHE_LIMIT:
+            self._route_cache[key] = label
+        return label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = self._route_label(scope)
+        status = {"code": 500}
+        started = time.perf_counter()
+        http_requests_in_flight.inc(method=method, route=route)
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if not finished:
+                finished = True
+                http_requests_in_flight.dec(method=method, route=route)
+                http_request_duration.observe(time.perf_counter() - started, method=method, route=route, status=status["code"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
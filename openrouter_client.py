@@ -0,0 +1,205 @@
+"""Shared async HTTP client for the OpenRouter-backed modules."""
+import os
+import json
+import asyncio
+import weakref
+import threading
+from typing import Dict, Any, AsyncIterator
+
+import httpx
+from dotenv import load_dotenv
+
+from provider_cassette import cassette
+from metrics import track_llm_call
+from outbound_scheduler import outbound_scheduler
+
+load_dotenv()
+
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# Pool limits (tunable per deployment)
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "200"))
+OPENROUTER_MAX_KEEPALIVE = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "50"))
+OPENROUTER_KEEPALIVE_EXPIRY = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", "60"))
+OPENROUTER_CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "5"))
+OPENROUTER_HTTP2 = os.getenv("OPENROUTER_HTTP2", "1") not in ("0", "false", "False")
+
+# HTTP/2 needs the optional `h2` package (installed by httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# One pooled client per event loop (a client is tied to the loop it was created on). Normally that
+# is just the server's loop; tests and embedded callers may drive others.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=OPENROUTER_HTTP2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=OPENROUTER_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENROUTER_MAX_KEEPALIVE,
+            keepalive_expiry=OPENROUTER_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(30.0, connect=OPENROUTER_CONNECT_TIMEOUT),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = _clients[loop] = _new_client()
+        return client
+
+
+async def close_client():
+    """
+    Close every pooled client (called on application shutdown). Clients of other loops are closed
+    on their own loop while it still runs; a closed loop has already torn down its connections.
+    """
+    current = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for loop, client in clients:
+        if client.is_closed:
+            continue
+        if loop is current:
+            await client.aclose()
+        elif loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+
+def build_headers(api_key: str, title: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:8000",
+        "X-Title": title
+    }
+
+
+async def post_chat_completion(api_key: str, payload: Dict[str, Any], title: str, timeout: float = 30,
+                               module: str = "openrouter") -> httpx.Response:
+    """
+    POST a chat completion request to OpenRouter over the shared connection pool.
+    Waits for an outbound slot first; raises OutboundRejected when OpenRouter is saturated.
+    """
+    model = payload.get("model", "")
+    async with outbound_scheduler.aslot("openrouter", model, module):
+        with track_llm_call("openrouter", module, model) as call:
+            if cassette.active:
+                response = await _cassette_post(api_key, payload, title, timeout)
+            else:
+                response = await get_client().post(
+                    OPENROUTER_URL,
+                    headers=build_headers(api_key, title),
+                    json=payload,
+                    timeout=httpx.Timeout(timeout, connect=OPENROUTER_CONNECT_TIMEOUT),
+                )
+            call.status = response.status_code
+            call.usage_from_body(response.text)
+    return response
+
+
+def _replayed_error(recorded: Dict[str, Any]) -> Exception:
+    """Rebuild a recorded failure as the exception type callers already handle."""
+    if recorded.get("type") == "OpenRouterStreamError":
+        return OpenRouterStreamError(recorded.get("status_code") or 500)
+    if "Timeout" in (recorded.get("type") or ""):
+        return httpx.ReadTimeout(recorded.get("message", ""))
+    return httpx.TransportError(recorded.get("message", ""))
+
+
+async def _cassette_post(api_key: str, payload: Dict[str, Any], title: str, timeout: float) -> httpx.Response:
+    """Record or replay a chat completion; the response is rebuilt from its status and body."""
+    async def send():
+        response = await get_client().post(
+            OPENROUTER_URL,
+            headers=build_headers(api_key, title),
+            json=payload,
+            timeout=httpx.Timeout(timeout, connect=OPENROUTER_CONNECT_TIMEOUT),
+        )
+        return {"status_code": response.status_code, "body": response.text}
+
+    recorded = await cassette.acall("openrouter", payload, send, _replayed_error)
+    return httpx.Response(
+        recorded["status_code"],
+        content=recorded["body"].encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        request=httpx.Request("POST", OPENROUTER_URL),
+    )
+
+
+class UpstreamError(Exception):
+    """A failed module call; the message is what the module shows the user in place of a result."""
+
+
+class OpenRouterStreamError(Exception):
+    """Raised when a streaming request is rejected before any tokens are sent."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"API error {status_code}")
+        self.status_code = status_code
+
+
+async def stream_chat_completion(api_key: str, payload: Dict[str, Any], title: str, timeout: float = 30,
+                                module: str = "openrouter") -> AsyncIterator[str]:
+    """
+    Stream a chat completion and yield content deltas as they arrive.
+    OpenRouter sends OpenAI-style SSE lines: `data: {...}` chunks terminated by `data: [DONE]`.
+    The outbound slot is held until the stream ends; OutboundRejected is raised before any delta.
+    """
+    model = payload.get("model", "")
+    async with outbound_scheduler.aslot("openrouter", model, module):
+        with track_llm_call("openrouter", module, model) as call:
+            live = lambda: _stream_chat_completion(api_key, payload, title, timeout, call.tokens)
+            if cassette.active:
+                source = cassette.astream("openrouter", {**payload, "stream": True}, live, _replayed_error)
+            else:
+                source = live()
+            async for delta in source:
+                yield delta
+            call.status = 200
+
+
+async def _stream_chat_completion(api_key: str, payload: Dict[str, Any], title: str, timeout: float,
+                                  on_usage=None) -> AsyncIterator[str]:
+    client = get_client()
+    async with client.stream(
+        "POST",
+        OPENROUTER_URL,
+        headers=build_headers(api_key, title),
+        json={**payload, "stream": True},
+        timeout=httpx.Timeout(timeout, connect=OPENROUTER_CONNECT_TIMEOUT),
+    ) as response:
+        if response.status_code != 200:
+            raise OpenRouterStreamError(response.status_code)
+        async for line in response.aiter_lines():
+            # Blank separators and ": OPENROUTER PROCESSING" keep-alive comments carry no data
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            # The final chunk carries token usage
+            usage = chunk.get("usage")
+            if usage and on_usage:
+                on_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
@@ -0,0 +1,281 @@
+"""Admission control for outbound LLM calls (OpenRouter modules and the Gemini path).
+
+Every upstream call holds a slot for its duration. Slots are capped per provider and per model,
+and handed out by priority class:
+  - interactive: chat and /generate, which a user is watching,
+  - standard:    gap analysis, syllabus and resource lookups,
+  - batch:       program bundles, bulk generation and background jobs.
+Lower classes may only fill part of a provider's slots (OUTBOUND_CLASS_SHARES), so a burst of
+batch work always leaves room for chat. Each class has a bounded queue with a maximum wait;
+past either, the call is refused at once with OutboundRejected (served as 429 + Retry-After)
+instead of piling up.
+
+Works from both worlds: async callers wait on a future, threaded callers (Gemini) on an event.
+The priority of a call defaults to its module's class and can be overridden for a task or thread
+with outbound_priority.set(...).
+"""
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Tuple
+
+from dotenv import load_dotenv
+
+from metrics import Counter, registry, register_gauge_function
+
+load_dotenv()
+
+PRIORITIES = ("interactive", "standard", "batch")  # highest first
+
+MODULE_PRIORITIES = {
+    "chatbot": "interactive",
+    "ai_engine": "interactive",
+    "gap_analyzer": "standard",
+    "resource_hub": "standard",
+    "syllabus_generator": "standard",  # a click on a course; bundles and bulk runs set batch themselves
+}
+
+
+def _parse_pairs(value: str, cast=float) -> Dict[str, float]:
+    """"a=1,b=2" -> {"a": 1, "b": 2}"""
+    pairs = {}
+    for part in value.split(","):
+        name, _, number = part.strip().rpartition("=")
+        if name:
+            pairs[name.strip()] = cast(number)
+    return pairs
+
+
+# Concurrent calls per provider, and per model where set ("provider:model=n")
+OUTBOUND_PROVIDER_LIMITS = _parse_pairs(os.getenv("OUTBOUND_PROVIDER_LIMITS", "openrouter=16,gemini=4"), int)
+OUTBOUND_MODEL_LIMITS = _parse_pairs(os.getenv("OUTBOUND_MODEL_LIMITS", ""), int)
+# Fraction of a provider's slots each class may occupy
+OUTBOUND_CLASS_SHARES = {"interactive": 1.0, "standard": 0.75, "batch": 0.5,
+                         **_parse_pairs(os.getenv("OUTBOUND_CLASS_SHARES", ""))}
+OUTBOUND_QUEUE_LIMITS = {"interactive": 32, "standard": 16, "batch": 64,
+                         **_parse_pairs(os.getenv("OUTBOUND_QUEUE_LIMITS", ""), int)}
+# Seconds a call may wait for a slot before it is refused
+OUTBOUND_MAX_WAIT = {"interactive": 10.0, "standard": 15.0, "batch": 60.0,
+                     **_parse_pairs(os.getenv("OUTBOUND_MAX_WAIT", ""))}
+DEFAULT_PROVIDER_LIMIT = 8
+
+outbound_priority: ContextVar[str | None] = ContextVar("outbound_priority", default=None)
+
+outbound_rejected_total = registry.register(Counter(
+    "currhub_outbound_rejected_total", "Outbound LLM calls refused by admission control.",
+    ("provider", "priority", "reason"),
+))
+
+
+class OutboundRejected(Exception):
+    """The call was refused (queue full or wait too long); retry after `retry_after` seconds."""
+
+    def __init__(self, provider: str, priority: str, reason: str, retry_after: int):
+        super().__init__(f"{provider} is busy ({priority} {reason}); retry in {retry_after}s")
+        self.provider = provider
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("key", "priority", "event", "future", "loop", "granted")
+
+    def __init__(self, key: Tuple[str, str], priority: str, loop: asyncio.AbstractEventLoop | None):
+        self.key = key
+        self.priority = priority
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+
+    def wake(self):
+        self.granted = True
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        else:
+            self.event.set()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class OutboundScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}                    # provider -> calls in flight
+        self._active_model: Dict[Tuple[str, str], int] = {}  # (provider, model) -> calls in flight
+        self._active_class: Dict[Tuple[str, str], int] = {}  # (provider, priority) -> calls in flight
+        self._queues: Dict[str, deque] = {priority: deque() for priority in PRIORITIES}
+        self._avg_hold: Dict[str, float] = {}                # provider -> EWMA of slot hold time (s)
+        self.rejected: Dict[str, int] = {}
+
+    # ---- capacity -------------------------------------------------------------------------
+    @staticmethod
+    def provider_limit(provider: str) -> int:
+        return OUTBOUND_PROVIDER_LIMITS.get(provider, DEFAULT_PROVIDER_LIMIT)
+
+    def _fits(self, key: Tuple[str, str], priority: str) -> bool:
+        provider, model = key
+        limit = self.provider_limit(provider)
+        if self._active.get(provider, 0) >= limit:
+            return False
+        model_limit = OUTBOUND_MODEL_LIMITS.get(f"{provider}:{model}")
+        if model_limit is not None and self._active_model.get(key, 0) >= model_limit:
+            return False
+        # Classes above `priority` share its allowance, so each class counts itself and everything below it
+        share = max(1, math.floor(limit * OUTBOUND_CLASS_SHARES.get(priority, 1.0)))
+        lower = PRIORITIES[PRIORITIES.index(priority):]
+        return sum(self._active_class.get((provider, p), 0) for p in lower) < share
+
+    def _take(self, key: Tuple[str, str], priority: str):
+        provider = key[0]
+        self._active[provider] = self._active.get(provider, 0) + 1
+        self._active_model[key] = self._active_model.get(key, 0) + 1
+        self._active_class[(provider, priority)] = self._active_class.get((provider, priority), 0) + 1
+
+    def _queued_ahead(self, key: Tuple[str, str], priority: str) -> bool:
+        """
+        A waiter of the same or a higher class is already queued for this provider and model.
+        Waiters for other models don't count: they may be held back only by their own model's cap.
+        """
+        for p in PRIORITIES[:PRIORITIES.index(priority) + 1]:
+            if any(w.key == key for w in self._queues[p]):
+                return True
+        return False
+
+    def _dispatch(self):
+        """Grant freed slots to queued callers, highest class first (a capped model does not block others)."""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            for waiter in list(queue):
+                if self._fits(waiter.key, priority):
+                    queue.remove(waiter)
+                    self._take(waiter.key, priority)
+                    waiter.wake()
+
+    def _retry_after(self, provider: str, priority: str) -> int:
+        queued = len(self._queues[priority])
+        estimate = self._avg_hold.get(provider, 5.0) * (queued + 1) / self.provider_limit(provider)
+        return int(min(60, max(1, math.ceil(estimate))))
+
+    def _reject(self, key: Tuple[str, str], priority: str, reason: str) -> OutboundRejected:
+        provider = key[0]
+        self.rejected[priority] = self.rejected.get(priority, 0) + 1
+        outbound_rejected_total.inc(provider=provider, priority=priority, reason=reason)
+        print(f"[OUTBOUND REJECTED] {provider}/{key[1]} {priority}: {reason}")
+        return OutboundRejected(provider, priority, reason, self._retry_after(provider, priority))
+
+    # ---- acquire / release ----------------------------------------------------------------
+    def _enter(self, key: Tuple[str, str], priority: str, loop) -> _Waiter | None:
+        """Take a slot now (None) or queue a waiter. Raises OutboundRejected when the queue is full."""
+        with self._lock:
+            if not self._queued_ahead(key, priority) and self._fits(key, priority):
+                self._take(key, priority)
+                return None
+            if len(self._queues[priority]) >= OUTBOUND_QUEUE_LIMITS.get(priority, 0):
+                raise self._reject(key, priority, "queue full")
+            waiter = _Waiter(key, priority, loop)
+            self._queues[priority].append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Called when a wait ends without a grant; True if the slot was granted meanwhile (caller owns it)."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queues[waiter.priority].remove(waiter)
+            return False
+
+    def _release(self, key: Tuple[str, str], priority: str, held: float):
+        provider = key[0]
+        with self._lock:
+            self._active[provider] -= 1
+            self._active_model[key] -= 1
+            self._active_class[(provider, priority)] -= 1
+            previous = self._avg_hold.get(provider)
+            self._avg_hold[provider] = held if previous is None else 0.8 * previous + 0.2 * held
+            self._dispatch()
+
+    @staticmethod
+    def _resolve_priority(module: str, priority: str | None) -> str:
+        priority = priority or outbound_priority.get() or MODULE_PRIORITIES.get(module, "standard")
+        return priority if priority in PRIORITIES else "standard"
+
+    @asynccontextmanager
+    async def aslot(self, provider: str, model: str, module: str, priority: str | None = None):
+        """Hold an outbound slot for the body of an `async with` (async callers)."""
+        priority = self._resolve_priority(module, priority)
+        key = (provider, model)
+        waiter = self._enter(key, priority, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), OUTBOUND_MAX_WAIT.get(priority, 10.0))
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if self._abandon(waiter):
+                    if isinstance(e, asyncio.CancelledError):
+                        self._release(key, priority, 0.0)
+                        raise
+                else:
+                    if isinstance(e, asyncio.CancelledError):
+                        raise
+                    with self._lock:
+                        raise self._reject(key, priority, "wait exceeded") from None
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(key, priority, time.monotonic() - started)
+
+    @contextmanager
+    def slot(self, provider: str, model: str, module: str, priority: str | None = None):
+        """Hold an outbound slot for the body of a `with` (threaded callers)."""
+        priority = self._resolve_priority(module, priority)
+        key = (provider, model)
+        waiter = self._enter(key, priority, None)
+        if waiter is not None and not waiter.event.wait(OUTBOUND_MAX_WAIT.get(priority, 10.0)):
+            if not self._abandon(waiter):
+                with self._lock:
+                    raise self._reject(key, priority, "wait exceeded")
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(key, priority, time.monotonic() - started)
+
+    def status(self) -> dict:
+        with self._lock:
+            providers = set(OUTBOUND_PROVIDER_LIMITS) | set(self._active)
+            return {
+                "providers": {
+                    provider: {
+                        "limit": self.provider_limit(provider),
+                        "active": self._active.get(provider, 0),
+                        "active_by_priority": {p: self._active_class.get((provider, p), 0) for p in PRIORITIES},
+                        "avg_call_seconds": round(self._avg_hold.get(provider, 0.0), 2),
+                    }
+                    for provider in sorted(providers)
+                },
+                "queued": {p: len(q) for p, q in self._queues.items()},
+                "queue_limits": dict(OUTBOUND_QUEUE_LIMITS),
+                "rejected": dict(self.rejected),
+            }
+
+
+outbound_scheduler = OutboundScheduler()
+
+register_gauge_function(
+    "currhub_outbound_active", "Outbound LLM calls in flight.", ("provider",),
+    lambda: {(p,): float(s["active"]) for p, s in outbound_scheduler.status()["providers"].items()},
+)
+register_gauge_function(
+    "currhub_outbound_queued", "Outbound LLM calls waiting for a slot.", ("priority",),
+    lambda: {(p,): float(n) for p, n in outbound_scheduler.status()["queued"].items()},
+)
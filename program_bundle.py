@@ -0,0 +1,107 @@
+"""Program bundle: fetch syllabi and resources for every course of a curriculum concurrently."""
+import os
+import time
+import asyncio
+from typing import Dict, Any, AsyncIterator, List
+
+from dotenv import load_dotenv
+
+from syllabus_generator import generate_syllabus
+from resource_hub import get_course_resources
+from outbound_scheduler import outbound_priority
+
+load_dotenv()
+
+# Upper bound on simultaneous upstream calls made by one bundle request
+BUNDLE_MAX_CONCURRENCY = int(os.getenv("BUNDLE_MAX_CONCURRENCY", "8"))
+
+
+def collect_courses(curriculum: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Flatten courses_by_semester into a list of course stubs, in semester order."""
+    courses = []
+    for semester, semester_courses in (curriculum.get("courses_by_semester") or {}).items():
+        for course in semester_courses or []:
+            name = course.get("course_name")
+            if not name:
+                continue
+            courses.append({
+                "semester": semester,
+                "course_code": course.get("course_code", ""),
+                "course_name": name,
+            })
+    return courses
+
+
+async def stream_program_bundle(
+    curriculum: Dict[str, Any],
+    include_syllabus: bool = True,
+    include_resources: bool = True,
+    max_concurrency: int = BUNDLE_MAX_CONCURRENCY,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield one event per course as soon as its syllabus/resources are ready, then a summary event.
+    A failure in one course is reported on that course only.
+    """
+    # Same program identifier the single-course endpoints send, so both share response-cache entries
+    program = curriculum.get("program_type", "")
+    domain = curriculum.get("domain", "")
+    courses = collect_courses(curriculum)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    started = time.perf_counter()
+
+    yield {"type": "start", "program_title": curriculum.get("program_title", ""), "domain": domain,
+           "total_courses": len(courses)}
+
+    async def limited(coro_fn, *args):
+        async with semaphore:
+            # strict: a failure raises, so the course is reported as an error rather than cached as content
+            return await coro_fn(*args, strict=True)
+
+    async def build(stub: Dict[str, str]) -> Dict[str, Any]:
+        # Each build runs in its own task, so this only lowers the priority of the bundle's calls
+        outbound_priority.set("batch")
+        course_started = time.perf_counter()
+        jobs = {}
+        if include_syllabus:
+            jobs["syllabus"] = limited(generate_syllabus, stub["course_name"], program, domain)
+        if include_resources:
+            jobs["resources"] = limited(get_course_resources, stub["course_name"], domain)
+
+        results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        event = {"type": "course", **stub, "status": "ok"}
+        errors = {}
+        for field, value in zip(jobs.keys(), results):
+            if isinstance(value, Exception):
+                errors[field] = str(value)[:100]
+                event[field] = None
+            else:
+                event[field] = value
+        if errors:
+            event["status"] = "error"
+            event["errors"] = errors
+        event["elapsed_ms"] = round((time.perf_counter() - course_started) * 1000, 1)
+        return event
+
+    tasks = [asyncio.create_task(build(stub)) for stub in courses]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                event = await next_done
+            except Exception as e:
+                event = {"type": "course", "status": "error", "errors": {"course": str(e)[:100]}}
+            if event["status"] != "ok":
+                failed += 1
+            yield event
+    finally:
+        # Client went away or the generator was closed early: stop outstanding upstream calls
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    yield {
+        "type": "done",
+        "total_courses": len(courses),
+        "failed_courses": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
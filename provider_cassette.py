@@ -0,0 +1,217 @@
+"""Record/replay cassettes for LLM provider calls (Gemini and OpenRouter).
+
+PROVIDER_CASSETTE_MODE=record  real calls go out as usual; each request/response pair and its
+                               timing (including per-chunk offsets of streams) is appended to the cassette.
+PROVIDER_CASSETTE_MODE=replay  calls are answered from the cassette with their recorded timing scaled by
+                               PROVIDER_CASSETTE_TIME_SCALE (1 = original, 0 = instant); nothing touches the network.
+
+Requests are matched on provider + request body (model, messages/prompt, options), never on API keys.
+A request recorded several times is replayed in recording order, cycling. A replay miss raises
+CassetteMiss, which callers treat like any other provider failure.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROVIDER_CASSETTE_MODE = os.getenv("PROVIDER_CASSETTE_MODE", "off").lower()
+PROVIDER_CASSETTE_PATH = os.getenv(
+    "PROVIDER_CASSETTE_PATH", os.path.join(os.path.dirname(__file__), "cassettes", "providers.jsonl")
+)
+PROVIDER_CASSETTE_TIME_SCALE = float(os.getenv("PROVIDER_CASSETTE_TIME_SCALE", "1"))
+
+
+class CassetteMiss(Exception):
+    """Replay mode found no recording for a request."""
+
+
+class ReplayedProviderError(Exception):
+    """A provider error recorded in the cassette, raised again on replay with its original message."""
+
+    def __init__(self, recorded: Dict[str, Any]):
+        super().__init__(recorded.get("message", ""))
+        self.recorded_type = recorded.get("type")
+        self.status_code = recorded.get("status_code")
+
+
+def request_key(provider: str, request: Dict[str, Any]) -> str:
+    material = json.dumps([provider, request], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _describe_error(e: BaseException) -> Dict[str, Any]:
+    status_code = getattr(e, "status_code", None) or getattr(e, "code", None)
+    return {"type": type(e).__name__, "message": str(e), "status_code": int(status_code) if isinstance(status_code, int) else None}
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str, time_scale: float):
+        if mode not in ("off", "record", "replay"):
+            print(f"[CASSETTE] Unknown PROVIDER_CASSETTE_MODE '{mode}', treating as off")
+            mode = "off"
+        self.path = path
+        self.mode = mode
+        self.time_scale = max(0.0, time_scale)
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        self._entries: Dict[str, List[Dict[str, Any]]] | None = None
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "off"
+
+    # ---------- storage ----------
+    def _append(self, provider: str, request: Dict[str, Any], entry: Dict[str, Any]):
+        line = json.dumps({"provider": provider, "key": request_key(provider, request), "request": request,
+                           "recorded_at": time.time(), **entry}, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.stats["recorded"] += 1
+
+    def _load(self):
+        entries: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        entries.setdefault(entry["key"], []).append(entry)
+        except FileNotFoundError:
+            print(f"[CASSETTE] No cassette at {self.path}; every replayed call will miss")
+        print(f"[CASSETTE] Loaded {sum(len(v) for v in entries.values())} recordings from {self.path}")
+        self._entries = entries
+
+    def _lookup(self, provider: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        key = request_key(provider, request)
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            recordings = self._entries.get(key)
+            if not recordings:
+                self.stats["misses"] += 1
+                print(f"[CASSETTE MISS] No {provider} recording for request {key[:12]}")
+                raise CassetteMiss(f"No {provider} recording for request {key[:12]}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self.stats["replayed"] += 1
+            return recordings[index % len(recordings)]
+
+    def _scaled(self, seconds: float) -> float:
+        return max(0.0, seconds) * self.time_scale
+
+    # ---------- unary calls ----------
+    def call(self, provider: str, request: Dict[str, Any], fn: Callable[[], Any],
+             error_factory: Callable[[Dict[str, Any]], Exception] = ReplayedProviderError) -> Any:
+        """Sync call whose result is JSON-serializable."""
+        if self.mode == "replay":
+            entry = self._lookup(provider, request)
+            time.sleep(self._scaled(entry["elapsed"]))
+            if "error" in entry:
+                raise error_factory(entry["error"])
+            return entry["response"]
+        if self.mode != "record":
+            return fn()
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self._append(provider, request, {"error": _describe_error(e), "elapsed": time.perf_counter() - started})
+            raise
+        self._append(provider, request, {"response": result, "elapsed": time.perf_counter() - started})
+        return result
+
+    async def acall(self, provider: str, request: Dict[str, Any], fn: Callable[[], Awaitable[Any]],
+                    error_factory: Callable[[Dict[str, Any]], Exception] = ReplayedProviderError) -> Any:
+        """Async counterpart of call()."""
+        if self.mode == "replay":
+            entry = self._lookup(provider, request)
+            await asyncio.sleep(self._scaled(entry["elapsed"]))
+            if "error" in entry:
+                raise error_factory(entry["error"])
+            return entry["response"]
+        if self.mode != "record":
+            return await fn()
+        started = time.perf_counter()
+        try:
+            result = await fn()
+        except Exception as e:
+            self._append(provider, request, {"error": _describe_error(e), "elapsed": time.perf_counter() - started})
+            raise
+        self._append(provider, request, {"response": result, "elapsed": time.perf_counter() - started})
+        return result
+
+    # ---------- streams ----------
+    def stream(self, provider: str, request: Dict[str, Any], fn: Callable[[], Iterator[str]],
+               error_factory: Callable[[Dict[str, Any]], Exception] = ReplayedProviderError) -> Iterator[str]:
+        """Sync text stream; chunks are recorded with their offset from the start of the call."""
+        if self.mode == "replay":
+            entry = self._lookup(provider, request)
+            started = time.perf_counter()
+            for offset, text in entry["chunks"]:
+                time.sleep(max(0.0, started + self._scaled(offset) - time.perf_counter()))
+                yield text
+            time.sleep(max(0.0, started + self._scaled(entry["elapsed"]) - time.perf_counter()))
+            if "error" in entry:
+                raise error_factory(entry["error"])
+            return
+        if self.mode != "record":
+            yield from fn()
+            return
+        started = time.perf_counter()
+        chunks = []
+        try:
+            for text in fn():
+                chunks.append([time.perf_counter() - started, text])
+                yield text
+        except Exception as e:
+            self._append(provider, request, {"chunks": chunks, "error": _describe_error(e),
+                                             "elapsed": time.perf_counter() - started})
+            raise
+        self._append(provider, request, {"chunks": chunks, "elapsed": time.perf_counter() - started})
+
+    async def astream(self, provider: str, request: Dict[str, Any], fn: Callable[[], AsyncIterator[str]],
+                      error_factory: Callable[[Dict[str, Any]], Exception] = ReplayedProviderError) -> AsyncIterator[str]:
+        """Async counterpart of stream()."""
+        loop = asyncio.get_running_loop()
+        if self.mode == "replay":
+            entry = self._lookup(provider, request)
+            started = loop.time()
+            for offset, text in entry["chunks"]:
+                await asyncio.sleep(max(0.0, started + self._scaled(offset) - loop.time()))
+                yield text
+            await asyncio.sleep(max(0.0, started + self._scaled(entry["elapsed"]) - loop.time()))
+            if "error" in entry:
+                raise error_factory(entry["error"])
+            return
+        if self.mode != "record":
+            async for text in fn():
+                yield text
+            return
+        started = loop.time()
+        chunks = []
+        try:
+            async for text in fn():
+                chunks.append([loop.time() - started, text])
+                yield text
+        except Exception as e:
+            self._append(provider, request, {"chunks": chunks, "error": _describe_error(e),
+                                             "elapsed": loop.time() - started})
+            raise
+        self._append(provider, request, {"chunks": chunks, "elapsed": loop.time() - started})
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "path": self.path, "time_scale": self.time_scale, **self.stats}
+
+
+cassette = Cassette(PROVIDER_CASSETTE_PATH, PROVIDER_CASSETTE_MODE, PROVIDER_CASSETTE_TIME_SCALE)
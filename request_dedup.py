@@ -0,0 +1,180 @@
+"""Single-flight coalescing and idempotency-key replay for /generate and /generate/stream.
+
+SingleFlight and StreamFlight coalesce within one process (workers coordinate Gemini calls through the leases in
+shared_state). Idempotency-Key results are also written to shared_state, so a retry that lands
+on another worker is still replayed.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List
+
+from dotenv import load_dotenv
+
+from shared_state import shared_state, SharedState
+
+load_dotenv()
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "2048"))
+IDEMPOTENCY_SHARED = os.getenv("IDEMPOTENCY_SHARED", "1") not in ("0", "false", "False")
+
+
+def normalize_curriculum_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip and collapse whitespace in string fields so equivalent requests look identical."""
+    return {k: " ".join(v.split()) if isinstance(v, str) else v for k, v in data.items()}
+
+
+def request_fingerprint(data: Dict[str, Any]) -> str:
+    """Stable hash of a normalized request."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key onto one execution.
+    The first caller runs `fn`; callers arriving while it runs wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple:
+        """Returns (result, shared) where shared is True if this caller reused another's call."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                leader = True
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result(), False
+
+
+class _Broadcast:
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.cond = threading.Condition()
+
+
+class StreamFlight:
+    """
+    Collapse concurrent streams with the same key onto one run of the event iterator.
+    The run happens in its own thread, so it finishes (and its result is stored) even if the client
+    that started it goes away; every subscriber replays the events so far, then follows live.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Broadcast] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def stream(self, key: str, fn: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        with self._lock:
+            broadcast = self._calls.get(key)
+            if broadcast is not None:
+                self.coalesced += 1
+            else:
+                broadcast = self._calls[key] = _Broadcast()
+                # Carry the caller's context (e.g. outbound priority) into the producer thread
+                context = contextvars.copy_context()
+                threading.Thread(target=context.run, args=(self._produce, key, broadcast, fn),
+                                 name="stream-flight", daemon=True).start()
+
+        index = 0
+        while True:
+            with broadcast.cond:
+                while index >= len(broadcast.events) and not broadcast.done:
+                    broadcast.cond.wait()
+                pending = broadcast.events[index:]
+                done = broadcast.done
+            yield from pending
+            index += len(pending)
+            if done:
+                if broadcast.error is not None:
+                    raise broadcast.error
+                return
+
+    def _produce(self, key: str, broadcast: _Broadcast, fn: Callable[[], Iterator[Any]]):
+        try:
+            for event in fn():
+                with broadcast.cond:
+                    broadcast.events.append(event)
+                    broadcast.cond.notify_all()
+        except BaseException as e:
+            broadcast.error = e
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            with broadcast.cond:
+                broadcast.done = True
+                broadcast.cond.notify_all()
+
+
+class IdempotencyStore:
+    """Bounded TTL map of Idempotency-Key -> (request fingerprint, result), backed by shared_state when given."""
+
+    def __init__(self, ttl: float, max_keys: int, shared: SharedState | None = None):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.shared = shared
+        self.replayed = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, fingerprint, result)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                return entry[1], entry[2]
+        if self.shared is None:
+            return None
+        try:
+            stored = self.shared.get("idempotency", key)
+        except sqlite3.Error as e:
+            print(f"[IDEMPOTENCY] Shared read failed: {e}")
+            return None
+        return (stored[0], stored[1]) if stored else None
+
+    def set(self, key: str, fingerprint: str, result: Any):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, fingerprint, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        if self.shared is not None:
+            try:
+                self.shared.set("idempotency", key, [fingerprint, result], self.ttl)
+            except sqlite3.Error as e:
+                print(f"[IDEMPOTENCY] Shared write failed: {e}")
+
+
+generate_flight = SingleFlight()
+generate_stream_flight = StreamFlight()
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_KEYS, shared_state if IDEMPOTENCY_SHARED else None)
@@ -1,12 +1,17 @@
 """Resource Hub module for curating learning resources using OpenRouter API."""
 import os
-import requests
 from dotenv import load_dotenv
 
+from openrouter_client import post_chat_completion, UpstreamError
+from outbound_scheduler import OutboundRejected
+from json_extract import extract_json
+from schemas import CourseResources
+from response_cache import make_cache_key, cache_get, cache_set
+
 load_dotenv()
 
 RESOURCE_API_KEY = os.getenv("RESOURCE_API_KEY") or os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "openai/gpt-4o-mini"
 
 RESOURCE_PROMPT = """You are an expert educational resource curator. For the given course, provide curated learning resources.
 
@@ -32,63 +37,63 @@ Output EXACTLY in this JSON format (no extra text):
 Provide REAL, EXISTING resources with accurate URLs. Focus on highly-rated, popular resources."""
 
 
-def get_course_resources(course_name: str, domain: str = "") -> dict:
-    """Get curated learning resources for a course."""
-    
-    invalid_keys = ["your_openrouter_api_key_here", "your_key_here", ""]
-    if not RESOURCE_API_KEY or RESOURCE_API_KEY in invalid_keys:
+async def get_course_resources(course_name: str, domain: str = "", strict: bool = False) -> dict:
+    """
+    Get curated learning resources for a course.
+    Failures come back as {"error": ..., <empty lists>}; with strict=True they raise UpstreamError instead.
+    """
+    try:
+        return await _get_course_resources(course_name, domain)
+    except UpstreamError as e:
+        if strict:
+            raise
         return {
-            "error": "Please set a valid RESOURCE_API_KEY in your .env file.",
+            "error": str(e),
             "moocs": [], "books": [], "youtube": []
         }
+
+
+async def _get_course_resources(course_name: str, domain: str) -> dict:
+    invalid_keys = ["your_openrouter_api_key_here", "your_key_here", ""]
+    if not RESOURCE_API_KEY or RESOURCE_API_KEY in invalid_keys:
+        raise UpstreamError("Please set a valid RESOURCE_API_KEY in your .env file.")
     
     try:
-        headers = {
-            "Authorization": f"Bearer {RESOURCE_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8000",
-            "X-Title": "CurrHub Resources"
-        }
-        
         user_message = f"Provide learning resources for the course: {course_name}"
         if domain:
             user_message += f" (Domain: {domain})"
         
+        cache_key = make_cache_key("resource_hub", MODEL, RESOURCE_PROMPT, user_message)
+        cached = await cache_get("resource_hub", cache_key)
+        if cached is not None:
+            return cached
+        
         messages = [
             {"role": "system", "content": RESOURCE_PROMPT},
             {"role": "user", "content": user_message}
         ]
         
         payload = {
-            "model": "openai/gpt-4o-mini",
+            "model": MODEL,
             "messages": messages,
             "max_tokens": 1200,
             "temperature": 0.7
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=30)
+        response = await post_chat_completion(RESOURCE_API_KEY, payload, "CurrHub Resources", timeout=30, module="resource_hub")
         
         if response.status_code == 200:
             data = response.json()
             content = data["choices"][0]["message"]["content"].strip()
             
-            # Parse JSON from response
-            import json
-            # Handle potential markdown code blocks
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            return json.loads(content)
+            # Tolerates markdown fences, trailing commas and truncated output
+            resources = extract_json(content, CourseResources)
+            await cache_set("resource_hub", cache_key, resources)
+            return resources
         else:
-            return {
-                "error": f"API error {response.status_code}",
-                "moocs": [], "books": [], "youtube": []
-            }
+            raise UpstreamError(f"API error {response.status_code}")
             
+    except (UpstreamError, OutboundRejected):
+        raise
     except Exception as e:
-        return {
-            "error": str(e)[:100],
-            "moocs": [], "books": [], "youtube": []
-        }
+        raise UpstreamError(str(e)[:100])
@@ -0,0 +1,218 @@
+"""Content-addressed response cache for the OpenRouter-backed endpoints.
+
+Two tiers: a per-process LRU (TTL + byte budget) in front of a SQLite file that
+survives restarts and is shared by every uvicorn worker on the host.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH", os.path.join(os.path.dirname(__file__), "response_cache.sqlite3")
+)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_ITEMS = int(os.getenv("RESPONSE_CACHE_MAX_ITEMS", "2048"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_MISSING = object()
+
+
+def normalize_input(text: str) -> str:
+    """Fold case and collapse whitespace so trivially different inputs share an entry."""
+    return " ".join(str(text).split()).casefold()
+
+
+def make_cache_key(module: str, model: str, system_prompt: str, user_input: str) -> str:
+    """Hash (module, model, system prompt, normalized user input) into a stable key."""
+    material = json.dumps(
+        [module, model, hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(), normalize_input(user_input)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+# ==========================================
+# IN-MEMORY TIER
+# ==========================================
+class MemoryLRU:
+    """Thread-safe LRU bounded by entry count and total payload bytes, with per-entry expiry."""
+
+    def __init__(self, max_items: int, max_bytes: int):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, size, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.total_bytes -= size
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, size: int, expires_at: float):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (expires_at, size, value)
+            self.total_bytes += size
+            while self._entries and (len(self._entries) > self.max_items or self.total_bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ==========================================
+# SQLITE TIER
+# ==========================================
+class SQLiteStore:
+    """Disk tier in WAL mode so several worker processes can read and write concurrently."""
+
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS response_cache ("
+                        " key TEXT PRIMARY KEY, module TEXT NOT NULL, value TEXT NOT NULL,"
+                        " created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS response_cache_expiry ON response_cache (expires_at)")
+                    self._initialized = True
+        return conn
+
+    def get(self, key: str) -> tuple | None:
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM response_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row
+
+    def set(self, key: str, module: str, value: str, expires_at: float):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, module, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key, module, value, time.time(), expires_at),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+
+
+# ==========================================
+# PUBLIC API
+# ==========================================
+_memory = MemoryLRU(RESPONSE_CACHE_MAX_ITEMS, RESPONSE_CACHE_MAX_BYTES)
+_disk = SQLiteStore(RESPONSE_CACHE_PATH)
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(module: str, field: str):
+    with _stats_lock:
+        counters = _stats.setdefault(module, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "errors": 0})
+        counters[field] += 1
+
+
+def _disk_get(key: str):
+    try:
+        return _disk.get(key)
+    except sqlite3.Error as e:
+        print(f"[CACHE] Disk read failed: {e}")
+        return None
+
+
+def _disk_set(key: str, module: str, encoded: str, expires_at: float) -> bool:
+    try:
+        _disk.set(key, module, encoded, expires_at)
+        return True
+    except sqlite3.Error as e:
+        print(f"[CACHE] Disk write failed: {e}")
+        return False
+
+
+async def cache_get(module: str, key: str) -> Any | None:
+    """Return a cached response or None. Memory first, then SQLite (off the event loop)."""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    value = _memory.get(key)
+    if value is not _MISSING:
+        _count(module, "memory_hits")
+        return value
+    row = await asyncio.to_thread(_disk_get, key)
+    if row is None:
+        _count(module, "misses")
+        return None
+    encoded, expires_at = row
+    value = json.loads(encoded)
+    _memory.set(key, value, len(encoded.encode("utf-8")), expires_at)
+    _count(module, "disk_hits")
+    return value
+
+
+async def cache_set(module: str, key: str, value: Any, ttl: float | None = None):
+    """Store a successful response in both tiers."""
+    if not RESPONSE_CACHE_ENABLED:
+        return
+    encoded = json.dumps(value, ensure_ascii=False)
+    expires_at = time.time() + (RESPONSE_CACHE_TTL if ttl is None else ttl)
+    _memory.set(key, value, len(encoded.encode("utf-8")), expires_at)
+    stored = await asyncio.to_thread(_disk_set, key, module, encoded, expires_at)
+    _count(module, "stores" if stored else "errors")
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Per-module hit/miss counters plus current memory tier usage."""
+    with _stats_lock:
+        modules = {name: dict(counters) for name, counters in _stats.items()}
+    for counters in modules.values():
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        counters["hit_ratio"] = round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 4) if lookups else 0.0
+    return {
+        "enabled": RESPONSE_CACHE_ENABLED,
+        "memory_entries": len(_memory),
+        "memory_bytes": _memory.total_bytes,
+        "modules": modules,
+    }
@@ -44,4 +44,10 @@ class CurriculumResponse(BaseModel):
     courses_by_semester: dict  # e.g., {"Semester 1": [...]}
     recommended_skills: List[str]
     industry_alignment_notes: str
-    optimization_tips: List[str]
\ No newline at end of file
+    optimization_tips: List[str]
+
+# ===== RESOURCE HUB OUTPUT =====
+class CourseResources(BaseModel):
+    moocs: List[dict] = []
+    books: List[dict] = []
+    youtube: List[dict] = []
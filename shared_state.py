@@ -0,0 +1,191 @@
+"""State shared by every worker process on the host, in one SQLite file (WAL mode).
+
+Under gunicorn each worker is a separate process, so in-memory limits and caches would be
+counted once per worker. This file holds what must be counted once per host:
+  - the Gemini quota window (one row per admitted call) and the circuit breaker deadline,
+  - generation leases, so identical requests landing on different workers make one Gemini call,
+  - a small key/value table with expiry (Idempotency-Key results).
+
+Wall-clock time (time.time) is used throughout because monotonic clocks are not comparable
+across processes. Every operation is one short transaction; writers serialize on SQLite's
+lock (BEGIN IMMEDIATE), readers never block.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SHARED_STATE_PATH = os.getenv(
+    "SHARED_STATE_PATH", os.path.join(os.path.dirname(__file__), "shared_state.sqlite3")
+)
+# A lease whose holder died (worker killed mid-call) is taken over after this many seconds
+GENERATION_LEASE_TTL = float(os.getenv("GENERATION_LEASE_TTL", "90"))
+
+WINDOW_SECONDS = 60.0
+PURGE_EVERY = 256
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS quota_events (ts REAL NOT NULL, tokens INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS quota_events_ts ON quota_events (ts)",
+    "CREATE TABLE IF NOT EXISTS circuit (name TEXT PRIMARY KEY, open_until REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS kv (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+    " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))",
+)
+
+
+class SharedState:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    for statement in _SCHEMA:
+                        conn.execute(statement)
+                    self._initialized = True
+        return conn
+
+    def _write(self, fn) -> Any:
+        """Run fn(conn) in an IMMEDIATE transaction (one writer across all processes)."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge()
+        return result
+
+    def purge(self):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("DELETE FROM quota_events WHERE ts <= ?", (now - WINDOW_SECONDS,))
+        conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+    # ==========================================
+    # GEMINI QUOTA WINDOW AND CIRCUIT
+    # ==========================================
+    def reserve(self, tokens: int, rpm: int, tpm: int) -> Tuple[float, float]:
+        """
+        Record one call of `tokens` if the host-wide window and circuit allow it.
+        Returns (circuit_wait, window_wait): both 0.0 means the call was recorded.
+        """
+        def run(conn):
+            now = time.time()
+            row = conn.execute("SELECT open_until FROM circuit WHERE name = 'gemini'").fetchone()
+            circuit_wait = max(0.0, row[0] - now) if row else 0.0
+            if circuit_wait > 0:
+                return circuit_wait, 0.0
+            if tokens > tpm:
+                return 0.0, float("inf")
+            events = conn.execute(
+                "SELECT ts, tokens FROM quota_events WHERE ts > ? ORDER BY ts", (now - WINDOW_SECONDS,)
+            ).fetchall()
+            wait = 0.0
+            if len(events) >= rpm:
+                wait = events[len(events) - rpm][0] + WINDOW_SECONDS - now
+            excess = sum(used for _, used in events) + tokens - tpm
+            if excess > 0:
+                freed = 0
+                for ts, used in events:
+                    freed += used
+                    if freed >= excess:
+                        wait = max(wait, ts + WINDOW_SECONDS - now)
+                        break
+            if wait <= 0:
+                conn.execute("INSERT INTO quota_events (ts, tokens) VALUES (?, ?)", (now, tokens))
+            return 0.0, max(wait, 0.0)
+
+        return self._write(run)
+
+    def refund(self, tokens: int):
+        """Drop the newest recorded call of `tokens` (it was reserved but never sent)."""
+        self._write(lambda conn: conn.execute(
+            "DELETE FROM quota_events WHERE rowid ="
+            " (SELECT rowid FROM quota_events WHERE tokens = ? ORDER BY ts DESC LIMIT 1)", (tokens,)
+        ))
+
+    def open_circuit(self, seconds: float):
+        until = time.time() + seconds
+        self._write(lambda conn: conn.execute(
+            "INSERT INTO circuit (name, open_until) VALUES ('gemini', ?)"
+            " ON CONFLICT(name) DO UPDATE SET open_until = MAX(open_until, excluded.open_until)", (until,)
+        ))
+
+    def window(self) -> Tuple[int, int, float]:
+        """(calls, tokens) in the current minute and seconds the circuit stays open, across all workers."""
+        conn = self._connect()
+        now = time.time()
+        calls, tokens = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM quota_events WHERE ts > ?", (now - WINDOW_SECONDS,)
+        ).fetchone()
+        row = conn.execute("SELECT open_until FROM circuit WHERE name = 'gemini'").fetchone()
+        return calls, tokens, max(0.0, row[0] - now) if row else 0.0
+
+    # ==========================================
+    # GENERATION LEASES
+    # ==========================================
+    def acquire_lease(self, key: str, ttl: float = GENERATION_LEASE_TTL) -> str | None:
+        """Claim `key`; returns the owner token for release_lease, or None while someone else holds it."""
+        owner = f"{os.getpid()}:{threading.get_ident()}:{time.time()}"
+
+        def run(conn):
+            now = time.time()
+            row = conn.execute("SELECT expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+            if row and row[0] > now:
+                return None
+            conn.execute("INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                         (key, owner, now + ttl))
+            return owner
+
+        return self._write(run)
+
+    def release_lease(self, key: str, owner: str):
+        self._write(lambda conn: conn.execute(
+            "DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner)
+        ))
+
+    def lease_held(self, key: str) -> bool:
+        row = self._connect().execute("SELECT expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    # ==========================================
+    # KEY/VALUE WITH EXPIRY
+    # ==========================================
+    def get(self, namespace: str, key: str) -> Any:
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND expires_at > ?", (namespace, key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), time.time() + ttl),
+        ))
+
+
+shared_state = SharedState(SHARED_STATE_PATH)
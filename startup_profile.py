@@ -0,0 +1,80 @@
+"""Cold-start report: import time per module and initialization time per startup step.
+
+    python main.py --profile-startup
+
+A fresh interpreter imports main under `python -X importtime` and then runs main.run_startup(),
+so the numbers are those of a cold worker. Project modules are listed with their own and total
+import time; third-party modules have their own time summed under their top-level package name.
+"""
+import os
+import sys
+import json
+import subprocess
+from typing import Dict, List
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_CHILD = (
+    "import json, time\n"
+    "started = time.perf_counter()\n"
+    "import main\n"
+    "import_ms = (time.perf_counter() - started) * 1000\n"
+    "steps = main.run_startup()\n"
+    "main.stop_event_log()\n"
+    "print('STARTUP_PROFILE ' + json.dumps({'import_ms': import_ms, 'steps': steps}))\n"
+)
+
+
+def _project_modules() -> set:
+    return {name[:-3] for name in os.listdir(PROJECT_DIR) if name.endswith(".py")}
+
+
+def _parse_importtime(stderr: str) -> List[tuple]:
+    """[(module, self_us, cumulative_us), ...] from -X importtime output (children before parents)."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def profile_startup() -> Dict:
+    """Run a cold start in a subprocess; returns the parsed report."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD],
+                          cwd=PROJECT_DIR, capture_output=True, text=True)
+    marker = next((line for line in proc.stdout.splitlines() if line.startswith("STARTUP_PROFILE ")), None)
+    if proc.returncode != 0 or marker is None:
+        raise RuntimeError(f"Startup failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(marker[len("STARTUP_PROFILE "):])
+
+    project = _project_modules()
+    own: Dict[str, List[int]] = {}        # project module -> [self_us, cumulative_us]
+    packages: Dict[str, int] = {}         # third-party top-level package -> summed self_us
+    for module, self_us, cumulative_us in _parse_importtime(proc.stderr):
+        top = module.split(".")[0]
+        if top in project:
+            own[module] = [self_us, cumulative_us]
+        else:
+            packages[top] = packages.get(top, 0) + self_us
+    return {"import_ms": result["import_ms"], "steps": result["steps"], "modules": own, "packages": packages}
+
+
+def print_startup_profile(top: int = 12):
+    report = profile_startup()
+    print(f"Import of main: {report['import_ms']:.1f} ms")
+    print("\nProject modules (own / including imports, ms):")
+    for module, (self_us, cumulative_us) in sorted(report["modules"].items(), key=lambda kv: -kv[1][1]):
+        print(f"  {module:<24} {self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}")
+    print(f"\nHeaviest third-party packages (ms, top {top}):")
+    for package, cumulative_us in sorted(report["packages"].items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {package:<24} {cumulative_us / 1000:9.1f}")
+    print("\nStartup steps (ms):")
+    for name, ms in report["steps"]:
+        print(f"  {name:<24} {ms:9.1f}")
+    total = report["import_ms"] + sum(ms for _, ms in report["steps"])
+    print(f"\nCold start total: {total:.1f} ms")
+
+
+if __name__ == "__main__":
+    print_startup_profile()
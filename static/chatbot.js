@@ -40,21 +40,85 @@ document.addEventListener('DOMContentLoaded', function() {
     // Show typing indicator
     const typingId = showTyping();
 
-    // Send to backend
-    fetch('/chat', {
+    // Stream from backend; fall back to the plain endpoint if streaming is unavailable
+    streamReply(message, typingId).catch(() => {
+      fetch('/chat', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message: message })
+      })
+      .then(res => res.json())
+      .then(data => {
+        removeTyping(typingId);
+        addMessage(data.response, 'bot');
+      })
+      .catch(err => {
+        removeTyping(typingId);
+        addMessage('Sorry, I encountered an error. Please try again.', 'bot');
+      });
+    });
+  }
+
+  async function streamReply(message, typingId) {
+    const response = await fetch('/chat/stream', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ message: message })
-    })
-    .then(res => res.json())
-    .then(data => {
-      removeTyping(typingId);
-      addMessage(data.response, 'bot');
-    })
-    .catch(err => {
-      removeTyping(typingId);
-      addMessage('Sorry, I encountered an error. Please try again.', 'bot');
     });
+    if (!response.ok || !response.body) {
+      throw new Error('Streaming unavailable');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let contentEl = null;
+
+    try {
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+
+        for (const event of events) {
+          const dataLine = event.split('\n').find(line => line.startsWith('data:'));
+          if (!dataLine || event.startsWith('event: done')) continue;
+          const payload = JSON.parse(dataLine.slice(5));
+          if (!payload.delta) continue;
+
+          text += payload.delta;
+          if (!contentEl) {
+            // First token: swap the typing indicator for a live message bubble
+            removeTyping(typingId);
+            contentEl = addStreamingMessage();
+          }
+          contentEl.innerHTML = formatMessage(text);
+          chatMessages.scrollTop = chatMessages.scrollHeight;
+        }
+      }
+    } catch (err) {
+      // Nothing shown yet: let the caller retry on /chat. Otherwise keep the partial reply.
+      if (!contentEl) throw err;
+    }
+
+    removeTyping(typingId);
+    if (contentEl) {
+      contentEl.parentElement.remove();
+    }
+    addMessage(text || 'Sorry, I encountered an error. Please try again.', 'bot');
+  }
+
+  function addStreamingMessage() {
+    const msg = document.createElement('div');
+    msg.className = 'chat-message bot';
+    msg.innerHTML = '<div class="message-content"></div>';
+    chatMessages.appendChild(msg);
+    return msg.querySelector('.message-content');
   }
 
   function addMessage(text, sender) {
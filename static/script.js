@@ -87,18 +87,18 @@ if (form) {
     if (loadingIndicator) loadingIndicator.style.display = 'flex';
 
     try {
-      const response = await fetch('/generate', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(data)
-      });
+      // Paint semesters as they stream in; fall back to the one-shot endpoint if streaming fails early
+      const streamed = await streamCurriculum(data);
+      if (!streamed) {
+        const response = await postGenerate(data);
 
-      if (!response.ok) {
-        throw new Error('Failed to generate curriculum');
-      }
+        if (!response.ok) {
+          throw new Error('Failed to generate curriculum');
+        }
 
-      const result = await response.json();
-      renderPreview(result);
+        const result = await response.json();
+        renderPreview(result);
+      }
     } catch (error) {
       console.error(error);
       if (loadingIndicator) loadingIndicator.style.display = 'none';
@@ -121,6 +121,86 @@ if (form) {
   });
 }
 
+// POST /generate, retrying network errors and 429/5xx answers. Every attempt carries the same
+// Idempotency-Key, so a retry of a request the server already finished is replayed, not regenerated.
+async function postGenerate(data, attempts = 3) {
+  const idempotencyKey = window.crypto?.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+  for (let attempt = 1; ; attempt++) {
+    let response = null;
+    try {
+      response = await fetch('/generate', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
+        body: JSON.stringify(data)
+      });
+    } catch (error) {
+      if (attempt >= attempts) throw error;
+    }
+    if (response && (response.ok || (response.status !== 429 && response.status < 500) || attempt >= attempts)) {
+      return response;
+    }
+    const retryAfter = Number(response?.headers.get('Retry-After')) || attempt;
+    await new Promise((resolve) => setTimeout(resolve, Math.min(retryAfter, 10) * 1000));
+  }
+}
+
+// Stream /generate/stream NDJSON events into renderPreview.
+// Returns false if nothing was rendered (caller should retry on /generate).
+async function streamCurriculum(data) {
+  let response;
+  try {
+    response = await fetch('/generate/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(data)
+    });
+  } catch (error) {
+    return false;
+  }
+  if (!response.ok || !response.body) return false;
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let partial = null;
+
+  const emptyResult = () => ({
+    program_title: '', program_rationale: '', target_careers: [], courses_by_semester: {},
+    industry_alignment_notes: '', optimization_tips: []
+  });
+
+  try {
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const event = JSON.parse(line);
+        if (event.event === 'program' || event.event === 'reset') {
+          partial = emptyResult();
+          if (event.event === 'reset') continue;
+        }
+        if (!partial) continue;
+        const { event: kind, semester, courses, ...fields } = event;
+        if (kind === 'semester') {
+          partial.courses_by_semester[semester] = courses;
+        } else {
+          Object.assign(partial, fields);
+        }
+        renderPreview(partial);
+      }
+    }
+  } catch (error) {
+    if (!partial) return false;
+    throw error;
+  }
+  return partial !== null;
+}
+
 // Handle Back Button
 if (backButton) {
   backButton.addEventListener('click', () => {
@@ -149,6 +229,12 @@ function renderPreview(result) {
   }
 
   previewTitle.textContent = result.program_title;
+  if (result.domain_resolved_from && result.domain !== result.domain_resolved_from) {
+    const note = document.createElement('small');
+    note.style.cssText = 'display: block; font-size: 0.9rem; font-weight: 400; color: #64748b;';
+    note.textContent = `Closest match for "${result.domain_resolved_from}"`;
+    previewTitle.appendChild(note);
+  }
 
   // Add Program Rationale and Target Careers at the top
   let overviewHTML = `
@@ -264,6 +350,7 @@ let currentCurriculumData = null;
 // Store curriculum data when rendered
 function storeCurriculumData(data) {
   currentCurriculumData = data;
+  courseBundleCache = {};
 }
 
 function showFlowchart() {
@@ -339,12 +426,84 @@ document.addEventListener('click', function (e) {
   }
 });
 
+// ==========================================
+// PROGRAM BUNDLE (all syllabi + resources at once)
+// ==========================================
+let courseBundleCache = {};
+
+async function prepareProgramBundle(button) {
+  if (!currentCurriculumData) {
+    alert('Please generate a curriculum first.');
+    return;
+  }
+
+  const label = button ? button.innerHTML : '';
+  courseBundleCache = {};
+
+  try {
+    const response = await fetch('/program-bundle', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ curriculum: currentCurriculumData })
+    });
+    if (!response.ok || !response.body) {
+      throw new Error('Bundle request failed');
+    }
+
+    // NDJSON: one course per line, in completion order
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let total = 0;
+    let received = 0;
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const event = JSON.parse(line);
+        if (event.type === 'start') {
+          total = event.total_courses;
+        } else if (event.type === 'course') {
+          received += 1;
+          if (event.status === 'ok') {
+            courseBundleCache[event.course_name] = event;
+          }
+          if (button) {
+            button.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Preparing ${received}/${total}`;
+          }
+        }
+      }
+    }
+    if (button) button.innerHTML = '<i class="fas fa-check"></i> Syllabi & Resources Ready';
+  } catch (error) {
+    console.error(error);
+    if (button) button.innerHTML = label;
+    alert('Error preparing syllabi and resources. Please try again.');
+  }
+}
+
 // ==========================================
 // SYLLABUS GENERATION
 // ==========================================
 async function generateSyllabus(courseName) {
+  // Serve from the program bundle if it has already been fetched
+  const bundled = courseBundleCache[courseName];
+  if (bundled && bundled.syllabus) {
+    document.getElementById('syllabusTitle').textContent = courseName;
+    document.getElementById('syllabusContent').innerHTML = formatSyllabusMarkdown(bundled.syllabus);
+    document.getElementById('syllabusModal').style.display = 'flex';
+    return;
+  }
+
   // Get program and domain from stored data
-  const program = currentCurriculumData?.program_title || 'Computer Science';
+  // The program type, as the program bundle sends it, so both share cached syllabi
+  const program = currentCurriculumData?.program_type || 'B.Tech';
   const domain = currentCurriculumData?.domain || 'Technology';
 
   // Show modal with loading
@@ -419,6 +578,14 @@ function downloadSyllabus() {
 // RESOURCE HUB
 // ==========================================
 async function getResources(courseName) {
+  const bundled = courseBundleCache[courseName];
+  if (bundled && bundled.resources) {
+    document.getElementById('resourceTitle').textContent = courseName;
+    document.getElementById('resourceContent').innerHTML = renderResources(bundled.resources);
+    document.getElementById('resourceModal').style.display = 'flex';
+    return;
+  }
+
   const domain = currentCurriculumData?.domain || '';
   
   const modal = document.getElementById('resourceModal');
@@ -0,0 +1,101 @@
+"""Static files served from memory with content-hashed URLs, precompression and immutable caching.
+
+At startup every file under the static directory is read, hashed and compressed once (gzip, plus
+brotli when installed). Templates link to /static/<name>.<hash>.<ext> through static_url(), and those
+URLs are served with `Cache-Control: public, max-age=31536000, immutable`: a changed file gets a
+new URL. The plain /static/<name> still works and is revalidated against its ETag.
+Loading (brotli at maximum quality) runs in the app's startup hook, or on first use.
+"""
+import os
+import mimetypes
+import threading
+from typing import Dict
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from compression import SUPPORTED_ENCODINGS, choose_encoding, compress, encoded_etag
+from fast_json import strong_etag, etag_matches
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Files smaller than this are not worth compressing
+STATIC_COMPRESS_MIN_BYTES = 512
+
+
+class StaticAsset:
+    def __init__(self, name: str, body: bytes):
+        self.name = name
+        self.body = body
+        self.etag = strong_etag(body)
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{self.etag[1:9]}{ext}"
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type == "application/javascript":
+            self.media_type += "; charset=utf-8"
+        # encoding -> compressed bytes, kept only when smaller than the original
+        self.encoded: Dict[str, bytes] = {}
+        if len(body) >= STATIC_COMPRESS_MIN_BYTES:
+            for encoding in SUPPORTED_ENCODINGS:
+                compressed = compress(body, encoding, static=True)
+                if len(compressed) < len(body):
+                    self.encoded[encoding] = compressed
+
+
+class StaticAssets:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        self._by_hashed_name: Dict[str, StaticAsset] = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load()
+
+    def load(self):
+        """(Re)read, hash and precompress every file under the directory."""
+        assets, by_hashed_name = {}, {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    asset = StaticAsset(name, f.read())
+                assets[name] = asset
+                by_hashed_name[asset.hashed_name] = asset
+        self.assets, self._by_hashed_name = assets, by_hashed_name
+        self._loaded = True
+        saved = sum(len(a.body) - min(map(len, a.encoded.values()), default=len(a.body)) for a in assets.values())
+        print(f"[STATIC] Hashed and precompressed {len(assets)} assets ({saved // 1024} KB saved at best encoding)")
+
+    def url(self, name: str) -> str:
+        """Content-hashed URL for a template (falls back to the plain path for unknown files)."""
+        self.ensure_loaded()
+        asset = self.assets.get(name)
+        return f"/static/{asset.hashed_name if asset else name}"
+
+    def response(self, name: str, accept_encoding: str | None, if_none_match: str | None) -> Response:
+        self.ensure_loaded()
+        asset = self._by_hashed_name.get(name)
+        cache_control = IMMUTABLE_CACHE_CONTROL
+        if asset is None:
+            asset = self.assets.get(name)
+            cache_control = REVALIDATE_CACHE_CONTROL
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+
+        encoding = choose_encoding(accept_encoding) if asset.encoded else None
+        body = asset.encoded.get(encoding, asset.body) if encoding else asset.body
+        headers = {"Cache-Control": cache_control, "ETag": asset.etag}
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding in asset.encoded:
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = encoded_etag(asset.etag, encoding)
+        if etag_matches(if_none_match, asset.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=asset.media_type, headers=headers)
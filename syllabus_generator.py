@@ -1,12 +1,16 @@
 """Syllabus generator module using OpenRouter API."""
 import os
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from openrouter_client import post_chat_completion, UpstreamError
+from outbound_scheduler import OutboundRejected
+from response_cache import make_cache_key, cache_get, cache_set
+
 load_dotenv()
 
 SYLLABUS_API_KEY = os.getenv("SYLLABUS_API_KEY") or os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "openai/gpt-4o-mini"
 
 SYLLABUS_PROMPT = """You are an expert academic curriculum designer. Generate a detailed syllabus for the given course.
 
@@ -65,44 +69,57 @@ Hours: [X]
 Be specific and detailed. Use actual topics relevant to the course."""
 
 
-def generate_syllabus(course_name: str, program: str, domain: str) -> str:
-    """Generate detailed syllabus for a course."""
-    
+async def generate_syllabus(course_name: str, program: str, domain: str, strict: bool = False) -> str:
+    """
+    Generate detailed syllabus for a course.
+    Failures come back as a message for the user; with strict=True they raise UpstreamError instead.
+    """
+    try:
+        return await _generate_syllabus(course_name, program, domain)
+    except UpstreamError as e:
+        if strict:
+            raise
+        return str(e)
+
+
+async def _generate_syllabus(course_name: str, program: str, domain: str) -> str:
     invalid_keys = ["your_openrouter_api_key_here", "your_key_here", ""]
     if not SYLLABUS_API_KEY or SYLLABUS_API_KEY in invalid_keys:
-        return "⚠️ Please set a valid SYLLABUS_API_KEY (or OPENROUTER_API_KEY) in your .env file."
+        raise UpstreamError("⚠️ Please set a valid SYLLABUS_API_KEY (or OPENROUTER_API_KEY) in your .env file.")
     
     try:
-        headers = {
-            "Authorization": f"Bearer {SYLLABUS_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8000",
-            "X-Title": "CurrHub Syllabus"
-        }
-        
         user_message = f"Generate a detailed syllabus for the course: {course_name}\nProgram: {program}\nDomain: {domain}"
         
+        cache_key = make_cache_key("syllabus_generator", MODEL, SYLLABUS_PROMPT, user_message)
+        cached = await cache_get("syllabus_generator", cache_key)
+        if cached is not None:
+            return cached
+        
         messages = [
             {"role": "system", "content": SYLLABUS_PROMPT},
             {"role": "user", "content": user_message}
         ]
         
         payload = {
-            "model": "openai/gpt-4o-mini",
+            "model": MODEL,
             "messages": messages,
             "max_tokens": 1500,
             "temperature": 0.7
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=30)
+        response = await post_chat_completion(SYLLABUS_API_KEY, payload, "CurrHub Syllabus", timeout=30, module="syllabus_generator")
         
         if response.status_code == 200:
             data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
+            syllabus = data["choices"][0]["message"]["content"].strip()
+            await cache_set("syllabus_generator", cache_key, syllabus)
+            return syllabus
         else:
-            return f"⚠️ API error {response.status_code}: Unable to generate syllabus."
+            raise UpstreamError(f"⚠️ API error {response.status_code}: Unable to generate syllabus.")
             
-    except requests.exceptions.Timeout:
-        return "Request timed out. Please try again."
+    except (UpstreamError, OutboundRejected):
+        raise
+    except httpx.TimeoutException:
+        raise UpstreamError("Request timed out. Please try again.")
     except Exception as e:
-        return f"Error: {str(e)[:100]}"
+        raise UpstreamError(f"Error: {str(e)[:100]}")
@@ -0,0 +1,22 @@
+"""Point every on-disk store at a scratch directory and keep the tests off the network."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_scratch = tempfile.mkdtemp(prefix="currhub-tests-")
+# Set before any project module is imported; load_dotenv() does not override existing variables
+for name, filename in {
+    "SHARED_STATE_PATH": "shared_state.sqlite3",
+    "GENERATED_STORE_PATH": "generated_curricula.sqlite3",
+    "RESPONSE_CACHE_PATH": "response_cache.sqlite3",
+    "GENERATION_JOBS_PATH": "generation_jobs.sqlite3",
+    "AI_LOG_PATH": "ai_events.jsonl",
+}.items():
+    os.environ[name] = os.path.join(_scratch, filename)
+os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+os.environ["TEMPLATE_PREWARM"] = "0"
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["GEMINI_API_ENDPOINT"] = "http://127.0.0.1:9"
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from bulk_generate import parse_csv, parse_json, validate_items
+
+REQUEST = {"program_type": "B.Tech", "domain": "Data Science", "academic_level": "Undergraduate",
+           "duration_semesters": 8, "accreditation_body": "AICTE"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    (json.dumps([REQUEST, REQUEST]), [REQUEST, REQUEST]),
+    (json.dumps({"requests": [REQUEST]}), [REQUEST]),
+    (json.dumps(REQUEST), [REQUEST]),
+    (json.dumps(REQUEST) + "\n\n" + json.dumps(REQUEST) + "\n", [REQUEST, REQUEST]),
+    ("   ", []),
+    ("[]", []),
+])
+def test_parse_json(text, expected):
+    assert parse_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["5", '"x"', "null", "true", '{"requests": 5}', '{"requests": "abc"}', "{oops"])
+def test_parse_json_rejects_non_request_payloads(text):
+    with pytest.raises(ValueError):
+        parse_json(text)
+
+
+def test_parse_csv():
+    text = "program_type,domain,duration_semesters\nB.Tech,Data Science,8\nMBA,Finance,4\n"
+    assert parse_csv(text) == [
+        {"program_type": "B.Tech", "domain": "Data Science", "duration_semesters": "8"},
+        {"program_type": "MBA", "domain": "Finance", "duration_semesters": "4"},
+    ]
+    assert parse_csv("") == []
+
+
+def test_validate_items_reports_bad_items_by_index():
+    items = validate_items([REQUEST, 5, None, {"domain": "Physics"}, {**REQUEST, "domain": " Data  Science "}])
+    assert [index for index, _, _ in items] == [0, 1, 2, 3, 4]
+    assert [error is None for _, _, error in items] == [True, False, False, False, True]
+    assert items[0][1] == items[4][1]
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (b"5", "application/json"),
+    (b"null", "application/json"),
+    (b'"x"', "application/json"),
+    (b"\xff\xfe\x00bad", "application/json"),
+    (b"program_type,domain\n\xffB.Tech,Physics\n", "text/csv"),
+    (b"[]", "application/json"),
+])
+def test_bulk_endpoint_rejects_unusable_bodies(client, body, content_type):
+    response = client.post("/generate/bulk", content=body, headers={"content-type": content_type})
+    assert response.status_code == 422
+    assert response.json()["detail"]
@@ -0,0 +1,74 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from compression import CompressionMiddleware, choose_encoding, encoded_etag
+
+BIG = {"items": ["x" * 40] * 100}
+ETAG = '"abc123"'
+
+
+def _app():
+    async def big(request):
+        return JSONResponse(BIG, headers={"ETag": ETAG})
+
+    async def small(request):
+        return JSONResponse({"ok": True})
+
+    async def text(request):
+        return PlainTextResponse("y" * 5000)
+
+    async def not_modified(request):
+        return Response(status_code=304, headers={"ETag": ETAG})
+
+    app = Starlette(routes=[Route("/big", big), Route("/small", small), Route("/text", text),
+                            Route("/304", not_modified)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+@pytest.fixture
+def client():
+    return _app()
+
+
+@pytest.mark.parametrize("path", ["/big", "/small"])
+@pytest.mark.parametrize("accept", ["gzip", "identity", ""])
+def test_compressible_responses_always_vary(client, path, accept):
+    response = client.get(path, headers={"Accept-Encoding": accept})
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_other_types_do_not_vary(client):
+    response = client.get("/text", headers={"Accept-Encoding": "gzip"})
+    assert "vary" not in response.headers and "content-encoding" not in response.headers
+
+
+def test_gzip_body_and_encoded_etag(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == encoded_etag(ETAG, "gzip")
+    assert response.json() == BIG
+    raw = client.get("/big", headers={"Accept-Encoding": ""})
+    assert "content-encoding" not in raw.headers and raw.headers["etag"] == ETAG
+    assert int(response.headers["content-length"]) < len(raw.content)
+
+
+def test_not_modified_confirms_the_encoded_etag(client):
+    response = client.get("/304", headers={"Accept-Encoding": "gzip", "If-None-Match": encoded_etag(ETAG, "gzip")})
+    assert response.status_code == 304
+    assert response.headers["etag"] == encoded_etag(ETAG, "gzip")
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, identity", None),
+    ("*", choose_encoding("br, gzip")),
+    ("", None),
+    ("GZIP;q=0.5", "gzip"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from curriculum_stream import IncrementalCurriculumParser, curriculum_events
+
+CURRICULUM = {
+    "program_name": "B.Tech in Data Science",
+    "total_credits": 160,
+    "duration_semesters": 2,
+    "courses_by_semester": {
+        "Semester 1": [{"code": "DS101", "title": "Intro to \"Data\" {Science}", "credits": 4}],
+        "Semester 2": [{"code": "DS201", "title": "Statistics, Part [II]", "credits": 3, "lab": True}],
+    },
+    "recommended_skills": ["Python", "SQL"],
+    "optimization_tips": None,
+    "accredited": False,
+}
+
+
+def _feed_split(text, split):
+    parser = IncrementalCurriculumParser()
+    events = parser.feed(text[:split]) + parser.feed(text[split:])
+    return parser, events
+
+
+def _check(text, expected):
+    for split in range(len(text) + 1):
+        parser, events = _feed_split(text, split)
+        assert parser.done, split
+        assert parser.result() == expected, split
+        assert events[-1]["event"] == "complete", split
+
+
+def test_every_chunk_split_of_a_curriculum():
+    _check(json.dumps(CURRICULUM), CURRICULUM)
+
+
+def test_every_chunk_split_of_a_compact_curriculum():
+    _check(json.dumps(CURRICULUM, separators=(",", ":")), CURRICULUM)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a":1,"b":2}', {"a": 1, "b": 2}),
+    ('{"a": true}', {"a": True}),
+    ('{"a": null }', {"a": None}),
+    ('{"a": "x", "total_credits": 160 }', {"a": "x", "total_credits": 160}),
+    ('{"a": [1, 2], "b": -1.5e3}', {"a": [1, 2], "b": -1500.0}),
+    ('{}', {}),
+])
+def test_root_ending_in_any_value(text, expected):
+    _check(text, expected)
+
+
+def test_one_character_at_a_time_emits_events_in_order():
+    parser = IncrementalCurriculumParser()
+    events = []
+    for c in "Here you go:\n```json\n" + json.dumps(CURRICULUM, indent=2) + "\n```":
+        events.extend(parser.feed(c))
+    assert [e["event"] for e in events] == ["program", "semester", "semester", "complete"]
+    assert events[0] == {"event": "program", "program_name": "B.Tech in Data Science",
+                         "total_credits": 160, "duration_semesters": 2}
+    assert events[1]["semester"] == "Semester 1"
+    assert events[2]["courses"] == CURRICULUM["courses_by_semester"]["Semester 2"]
+    assert events[3] == {"event": "complete", "recommended_skills": ["Python", "SQL"],
+                         "optimization_tips": None, "accredited": False}
+
+
+def test_truncated_stream_has_no_result():
+    parser = IncrementalCurriculumParser()
+    parser.feed(json.dumps(CURRICULUM)[:-1])
+    assert not parser.done
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+def test_curriculum_events_match_parser_for_complete_documents():
+    curriculum = {k: v for k, v in CURRICULUM.items() if k != "accredited"}
+    parser = IncrementalCurriculumParser()
+    streamed = parser.feed(json.dumps(curriculum))
+    streamed[0] = {"tier": "ai", **streamed[0]}
+    assert curriculum_events(curriculum, "ai") == streamed
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import curriculum_templates as templates
+
+REQUEST = {"program_type": "B.Tech", "domain": "Robotics", "academic_level": "Undergraduate",
+           "duration_semesters": 8, "accreditation_body": "NAAC"}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(templates, "_template_cache", templates.OrderedDict())
+    monkeypatch.setattr(templates, "_template_cache_bytes", 0)
+    monkeypatch.setattr(templates, "_template_stats", {"hits": 0, "misses": 0, "prewarmed": 0, "evictions": 0})
+
+
+def test_bytes_are_memoized_and_match_the_dict_path():
+    first = templates.generate_curriculum_template_bytes(REQUEST)
+    # Durations past the program length produce the same curriculum and share the entry
+    assert templates.generate_curriculum_template_bytes({**REQUEST, "duration_semesters": 12}) is first
+    assert json.loads(first) == templates.generate_curriculum_from_template(REQUEST)
+    stats = templates.get_template_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_dict_path_returns_independent_copies():
+    first = templates.generate_curriculum_from_template(REQUEST)
+    first["target_careers"].append("Astronaut")
+    assert "Astronaut" not in templates.generate_curriculum_from_template(REQUEST)["target_careers"]
+
+
+def test_lru_eviction_keeps_recent_entries(monkeypatch):
+    size = len(templates.generate_curriculum_template_bytes(REQUEST))
+    monkeypatch.setattr(templates, "TEMPLATE_CACHE_MAX_BYTES", int(size * 2.5))
+    templates.generate_curriculum_template_bytes({**REQUEST, "domain": "Physics"})
+    templates.generate_curriculum_template_bytes(REQUEST)  # most recently used again
+    templates.generate_curriculum_template_bytes({**REQUEST, "domain": "Finance"})
+    keys = [key[1] for key in templates._template_cache]
+    assert keys == ["Robotics", "Finance"]
+    assert templates.get_template_cache_stats()["evictions"] == 1
+
+
+def test_prewarm_builds_only_the_hot_set():
+    built = templates.prewarm_template_cache(["MBA", "Nonexistent"], ["NAAC"])
+    assert built == len(templates.DOMAIN_TEMPLATES)
+    assert {key[0] for key in templates._template_cache} == {"MBA"}
+    assert templates.prewarm_template_cache(["MBA"], ["NAAC"]) == 0
+    assert templates.get_template_cache_stats()["prewarmed"] == built
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from curriculum_views import (
+    HEADER_FIELDS, course_detail_body, decode_curriculum_id, encode_curriculum_id, find_course,
+    parse_projection, project_body, project_curriculum,
+)
+from fast_json import dumps_bytes
+
+
+def _course(code):
+    return {"course_code": code, "course_name": f"Course {code}", "category": "Core", "description": "...",
+            "credits": 4, "weekly_topics": [{"week": 1, "topic": "Intro"}], "outcomes": [], "prerequisites": []}
+
+
+CURRICULUM = {
+    "program_title": "B.Tech in Robotics", "program_type": "B.Tech", "domain": "Robotics",
+    "academic_level": "Undergraduate", "total_semesters": 3, "program_rationale": "...",
+    "target_careers": ["Robotics Engineer"], "accreditation_aligned": "AICTE",
+    "courses_by_semester": {
+        "Semester 1": [_course("RB101"), _course("RB102")],
+        "Semester 2": [_course("RB201")],
+        "Semester 3": [_course("RB301")],
+    },
+    "recommended_skills": ["ROS"], "industry_alignment_notes": "...", "optimization_tips": [],
+}
+REQUEST = {"program_type": "B.Tech", "domain": "Robotics", "academic_level": "Undergraduate",
+           "duration_semesters": 3, "accreditation_body": "AICTE", "industry_keywords": "ROS, ünïcode"}
+
+
+def test_full_view_is_no_projection():
+    assert parse_projection() is None
+    assert parse_projection("full", "", "") is None
+
+
+def test_skeleton_keeps_header_and_course_stubs():
+    projected = parse_projection("skeleton").apply(CURRICULUM)
+    assert set(projected) == set(HEADER_FIELDS) | {"courses_by_semester"}
+    assert projected["courses_by_semester"]["Semester 2"] == [
+        {"course_code": "RB201", "course_name": "Course RB201", "category": "Core", "credits": 4}]
+
+
+def test_fields_and_course_fields():
+    projection = parse_projection(fields="program_title, courses.course_code,courses.credits,")
+    assert projection.apply(CURRICULUM) == {
+        "program_title": "B.Tech in Robotics",
+        "courses_by_semester": {
+            "Semester 1": [{"course_code": "RB101", "credits": 4}, {"course_code": "RB102", "credits": 4}],
+            "Semester 2": [{"course_code": "RB201", "credits": 4}],
+            "Semester 3": [{"course_code": "RB301", "credits": 4}],
+        },
+    }
+
+
+@pytest.mark.parametrize("semesters, expected", [
+    ("2", ["Semester 2"]),
+    ("2-3", ["Semester 2", "Semester 3"]),
+    ("3-9", ["Semester 3"]),
+    ("5", []),
+])
+def test_semester_ranges(semesters, expected):
+    projected = parse_projection(semesters=semesters).apply(CURRICULUM)
+    assert list(projected["courses_by_semester"]) == expected
+    assert projected["program_title"] == CURRICULUM["program_title"]
+
+
+def test_semesters_without_numbers_use_their_position():
+    curriculum = {"courses_by_semester": {"Fall": [], "Spring": [], "Summer": []}}
+    assert list(parse_projection(semesters="2-3").apply(curriculum)["courses_by_semester"]) == ["Spring", "Summer"]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"view": "outline"},
+    {"fields": "program_title,salary"},
+    {"fields": "courses.grade"},
+    {"semesters": "two"},
+    {"semesters": "0"},
+    {"semesters": "4-2"},
+])
+def test_bad_parameters(kwargs):
+    with pytest.raises(ValueError):
+        parse_projection(**kwargs)
+
+
+def test_projected_bodies_are_cached_by_content():
+    body = dumps_bytes(CURRICULUM)
+    projection = parse_projection("skeleton")
+    first = project_body(body, projection, "cid")
+    assert project_body(dumps_bytes(CURRICULUM), parse_projection("skeleton"), "cid") is first
+    assert json.loads(first) == json.loads(project_curriculum(CURRICULUM, projection, "cid"))
+    assert json.loads(first)["curriculum_id"] == "cid"
+
+
+def test_course_detail():
+    body = dumps_bytes(CURRICULUM)
+    assert find_course(CURRICULUM, "RB201") == ("Semester 2", CURRICULUM["courses_by_semester"]["Semester 2"][0])
+    detail = json.loads(course_detail_body(body, "cid", "RB301"))
+    assert detail["semester"] == "Semester 3" and detail["course"]["course_code"] == "RB301"
+    assert course_detail_body(body, "cid", "XX999") is None
+
+
+def test_curriculum_id_round_trip():
+    curriculum_id = encode_curriculum_id(REQUEST, "template")
+    assert "=" not in curriculum_id
+    assert decode_curriculum_id(curriculum_id) == (REQUEST, "template")
+
+
+@pytest.mark.parametrize("curriculum_id", ["", "not-an-id", encode_curriculum_id({"domain": "x"}, "db")])
+def test_foreign_curriculum_ids_are_rejected(curriculum_id):
+    with pytest.raises(ValueError):
+        decode_curriculum_id(curriculum_id)
@@ -0,0 +1,70 @@
+import pytest
+
+from domain_resolver import DomainResolver, DOMAIN_ALIASES, edit_distance, token_distance, tokens, fold
+
+CANONICAL = [
+    "Artificial Intelligence", "Civil Engineering", "Computer Science", "Cybersecurity", "Data Science",
+    "Electrical Engineering", "Electronics", "Machine Learning", "Mechanical Engineering", "Physics",
+    "Robotics", "VLSI Design",
+]
+
+
+@pytest.fixture
+def resolver():
+    return DomainResolver(CANONICAL, DOMAIN_ALIASES)
+
+
+@pytest.mark.parametrize("requested, expected, method", [
+    ("Data Science", "Data Science", "exact"),
+    ("  data-science ", "Data Science", "folded"),
+    ("AI", "Artificial Intelligence", "alias"),
+    ("cyber security", "Cybersecurity", "alias"),
+    ("Science Data", "Data Science", "token"),
+    ("Mechanical Engg", "Mechanical Engineering", "token"),
+    ("Electronics Engineering", "Electronics", "token"),
+    ("Data Sciense", "Data Science", "fuzzy"),
+    ("Artifical Intelligence", "Artificial Intelligence", "fuzzy"),
+    ("Computer Sceince", "Computer Science", "fuzzy"),
+    ("Robotic", "Robotics", "fuzzy"),
+])
+def test_resolves(resolver, requested, expected, method):
+    assert resolver.resolve(requested) == (expected, method)
+
+
+@pytest.mark.parametrize("requested", [
+    "Chemical Engineering",        # differs from Mechanical in its only distinguishing token
+    "Electronics and Communication Engineering",
+    "Engineering",
+    "security", "data", "design",  # words inside domain names are not synonyms
+    "Quantum Basket Weaving",
+    "",
+])
+def test_unresolved(resolver, requested):
+    assert resolver.resolve(requested) == (None, "unresolved")
+
+
+def test_ambiguous_token_sets_stay_unresolved():
+    resolver = DomainResolver(["Electronics", "Electronics Engineering"], {})
+    assert resolver.resolve("Electronics Engg") == (None, "unresolved")
+
+
+def test_tokens_drop_stopwords_and_generic_suffixes():
+    assert tokens(fold("Science & Engineering of Materials")) == frozenset({"science", "materials"})
+
+
+def test_edit_distance_counts_transpositions_and_stops_at_limit():
+    assert edit_distance("sceince", "science", 2) == 1
+    assert edit_distance("chemical", "mechanical", 1) == 2
+
+
+def test_token_distance_requires_every_token_to_pair():
+    assert token_distance(frozenset({"data", "sciense"}), frozenset({"data", "science"})) == 1
+    assert token_distance(frozenset({"chemical"}), frozenset({"mechanical"})) is None
+    assert token_distance(frozenset({"data"}), frozenset({"data", "science"})) is None
+
+
+def test_count_false_leaves_stats_untouched(resolver):
+    resolver.resolve("AI", count=False)
+    assert resolver.get_stats()["lookups"] == 0
+    resolver.resolve("AI")
+    assert resolver.get_stats()["alias"] == 1
@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import gemini_scheduler as scheduler_module
+from gemini_scheduler import GeminiScheduler, is_quota_error, parse_retry_delay
+from shared_state import SharedState
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return SharedState(str(tmp_path / "shared_state.sqlite3"))
+
+
+def test_rpm_window_sheds_when_no_wait_is_allowed():
+    quota = GeminiScheduler(rpm=2, tpm=10_000, max_wait=0, max_queue=4)
+    assert quota.acquire(10) == (True, "")
+    assert quota.acquire(10) == (True, "")
+    assert quota.acquire(10) == (False, "rate limit window full")
+    assert quota.status()["shed_total"] == 1
+
+
+def test_tpm_window_and_oversized_calls():
+    quota = GeminiScheduler(rpm=100, tpm=100, max_wait=0, max_queue=4)
+    assert quota.acquire(60)[0]
+    assert not quota.acquire(50)[0]
+    assert quota.acquire(40)[0]
+    assert not GeminiScheduler(rpm=100, tpm=100, max_wait=5, max_queue=4).acquire(101)[0]
+
+
+def test_waits_for_the_window_to_slide(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "WINDOW_SECONDS", 0.2)
+    quota = GeminiScheduler(rpm=1, tpm=10_000, max_wait=1, max_queue=4)
+    assert quota.acquire(10)[0]
+    started = time.monotonic()
+    assert quota.acquire(10) == (True, "")
+    assert 0.15 <= time.monotonic() - started < 1
+
+
+def test_queue_depth_sheds_immediately(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "WINDOW_SECONDS", 0.3)
+    quota = GeminiScheduler(rpm=1, tpm=10_000, max_wait=1, max_queue=1)
+    assert quota.acquire(10)[0]
+    waiter = threading.Thread(target=quota.acquire, args=(10,))
+    waiter.start()
+    while not quota.status()["waiting"]:
+        time.sleep(0.005)
+    assert quota.acquire(10) == (False, "queue full")
+    waiter.join()
+
+
+def test_quota_error_opens_the_circuit_for_the_retry_delay():
+    quota = GeminiScheduler(rpm=100, tpm=10_000, max_wait=0, max_queue=4)
+    quota.record_failure(Exception("429 Resource exhausted. Please retry in 12.5s."))
+    status = quota.status()
+    assert status["circuit_open"] and 12 <= status["circuit_open_seconds"] <= 12.5
+    admitted, reason = quota.acquire(10)
+    assert not admitted and reason.startswith("circuit open")
+
+
+def test_consecutive_failures_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "GEMINI_FAILURE_THRESHOLD", 3)
+    quota = GeminiScheduler(rpm=100, tpm=10_000, max_wait=0, max_queue=4)
+    quota.record_failure(ValueError("bad json"))
+    quota.record_failure(ValueError("bad json"))
+    quota.record_success()
+    quota.record_failure(ValueError("bad json"))
+    quota.record_failure(ValueError("bad json"))
+    assert not quota.status()["circuit_open"]
+    quota.record_failure(ValueError("bad json"))
+    assert quota.status()["circuit_open"]
+
+
+def test_waits_out_a_short_circuit():
+    quota = GeminiScheduler(rpm=100, tpm=10_000, max_wait=1, max_queue=4)
+    quota.record_failure(Exception("quota exceeded, retry in 0.2s"))
+    started = time.monotonic()
+    assert quota.acquire(10) == (True, "")
+    assert time.monotonic() - started >= 0.15
+
+
+def test_shared_window_and_circuit_span_schedulers(shared):
+    first = GeminiScheduler(rpm=2, tpm=10_000, max_wait=0, max_queue=4, shared=shared)
+    second = GeminiScheduler(rpm=2, tpm=10_000, max_wait=0, max_queue=4, shared=shared)
+    assert first.acquire(10)[0] and second.acquire(10)[0]
+    assert not first.acquire(10)[0]
+    assert second.status()["requests_in_window"] == 2
+    first.record_failure(Exception("429 retry in 30s"))
+    assert second.status()["circuit_open"]
+
+
+def test_shared_errors_fall_back_to_counting_per_process(shared, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "GEMINI_SHARED_RETRY", 0.1)
+    quota = GeminiScheduler(rpm=1, tpm=10_000, max_wait=0, max_queue=4, shared=shared)
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(shared, "reserve", locked)
+    assert quota.acquire(10)[0]
+    assert not quota.status()["shared"] and quota.shared_errors == 1
+    assert not quota.acquire(10)[0]  # counted locally while the shared file is skipped
+    monkeypatch.undo()
+    time.sleep(0.15)
+    assert quota.acquire(10)[0]  # back on the (empty) shared window
+    assert quota.status()["shared"]
+
+
+@pytest.mark.parametrize("message, delay", [
+    ('retry_delay {\n  seconds: 41\n}', 41.0),
+    ("Please retry in 7.5s.", 7.5),
+    ('{"retryDelay": "19s"}', 19.0),
+    ("Internal error", None),
+])
+def test_parse_retry_delay(message, delay):
+    assert parse_retry_delay(Exception(message)) == delay
+
+
+def test_is_quota_error():
+    assert is_quota_error(Exception("429 Too Many Requests"))
+    assert is_quota_error(Exception("Quota exceeded for metric"))
+    assert not is_quota_error(Exception("500 Internal"))
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from generation_jobs import JobQueue, JobQueueFull, JobStore
+
+REQUEST = {"program_type": "B.Tech", "domain": "Quantum Basket Weaving"}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "generation_jobs.sqlite3")
+
+
+@pytest.fixture
+def queue(path, monkeypatch):
+    queue = JobQueue(JobStore(path), workers=1, max_pending=1)
+    dispatched = []
+    monkeypatch.setattr(queue, "start", lambda: None)
+    monkeypatch.setattr(queue, "_dispatch", lambda job_id, data: dispatched.append(job_id))
+    queue.dispatched = dispatched
+    return queue
+
+
+def test_concurrent_creates_make_one_job(path):
+    JobStore(path).counts()  # create the schema once
+    barrier = threading.Barrier(8)
+    results = []
+
+    def create(n):
+        store = JobStore(path)  # one store per thread, as separate worker processes would have
+        barrier.wait()
+        results.append(store.create(f"job-{n}", "same-request", REQUEST, f"owner-{n}"))
+
+    threads = [threading.Thread(target=create, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(created for _, created in results) == 1
+    assert len({job_id for job_id, _ in results}) == 1
+    assert JobStore(path).counts() == {"queued": 1}
+
+
+def test_identical_requests_share_a_job(queue):
+    job_id, created = queue.submit(REQUEST, "fp")
+    assert created and queue.dispatched == [job_id]
+    assert queue.submit(REQUEST, "fp") == (job_id, False)
+    assert queue.pending == 1 and queue.dispatched == [job_id]
+
+
+def test_full_queue_still_shares_active_jobs(queue, path):
+    JobStore(path).create("elsewhere", "fp-other-worker", REQUEST, "another-process")
+    queue.submit(REQUEST, "fp")
+    with pytest.raises(JobQueueFull):
+        queue.submit(REQUEST, "fp-new")
+    assert queue.submit(REQUEST, "fp-other-worker") == ("elsewhere", False)
+    assert queue.pending == 1
+
+
+def test_finished_jobs_are_not_reused(queue):
+    job_id, _ = queue.submit(REQUEST, "fp")
+    queue.store.update(job_id, queue.owner, status="succeeded", finished_at=0.0)
+    queue.pending = 0
+    new_id, created = queue.submit(REQUEST, "fp")
+    assert created and new_id != job_id
@@ -0,0 +1,47 @@
+import pytest
+
+import ai_engine
+
+REQUEST = {"program_type": "B.Tech", "domain": "Quantum Basket Weaving", "academic_level": "Undergraduate",
+           "duration_semesters": 8, "accreditation_body": "AICTE", "industry_keywords": ""}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock advanced by time.sleep; returns the list of sleeps."""
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(ai_engine, "GEMINI_SHARED_QUOTA", True)
+    monkeypatch.setattr(ai_engine.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(ai_engine.time, "sleep", sleep)
+    return sleeps
+
+
+def test_waiting_for_a_peer_backs_off_and_gives_up_at_the_deadline(clock, monkeypatch):
+    monkeypatch.setattr(ai_engine, "GENERATION_LEASE_WAIT", 10.0)
+    monkeypatch.setattr(ai_engine.shared_state, "acquire_lease", lambda key: None)  # a peer holds it
+    assert ai_engine._claim_generation(REQUEST) == (None, None)
+    assert clock[:6] == [0.05, 0.1, 0.2, 0.4, 0.8, 1.6]
+    assert max(clock) == ai_engine.GENERATION_LEASE_POLL_MAX
+    assert sum(clock) == pytest.approx(10.0)
+
+
+def test_result_stored_by_a_peer_ends_the_wait(clock, monkeypatch):
+    stored = {"program_title": "from a peer"}
+    calls = []
+    monkeypatch.setattr(ai_engine.shared_state, "acquire_lease", lambda key: None)
+    monkeypatch.setattr(ai_engine.generated_store, "get",
+                        lambda data: calls.append(1) or ({"curriculum": stored} if len(calls) == 3 else None))
+    assert ai_engine._claim_generation(REQUEST) == (None, stored)
+    assert clock == [0.05, 0.1]
+
+
+def test_free_lease_is_claimed_at_once(clock, monkeypatch):
+    monkeypatch.setattr(ai_engine.shared_state, "acquire_lease", lambda key: "owner-token")
+    lease, stored = ai_engine._claim_generation(REQUEST)
+    assert lease[1] == "owner-token" and stored is None and clock == []
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from pydantic import BaseModel
+
+from json_extract import JsonExtractionError, _scan, extract_json, validate_json
+
+DOC = {
+    "program_name": "B.Sc \"Physics\" {Honours}",
+    "total_credits": 120,
+    "tags": ["a,b", "c]", []],
+    "nested": {"ok": True, "none": None, "deep": [{"x": -1.5}]},
+    "path": "C:\\temp\\",
+}
+
+
+class Program(BaseModel):
+    program_name: str
+    total_credits: int
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(DOC),
+    "Sure! Here it is:\n```json\n" + json.dumps(DOC, indent=2) + "\n```\nHope that helps {really}.",
+    "Use {braces} and {\"not\": json here} -> " + json.dumps(DOC),
+])
+def test_intact_objects_inside_prose(text):
+    assert extract_json(text) == DOC
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+    ('{"a": [1, 2 , ] }', {"a": [1, 2]}),
+    ('{"a": "x,]", "b": 1,\n}', {"a": "x,]", "b": 1}),
+])
+def test_trailing_commas_are_dropped(text, expected):
+    candidate, repaired = _scan(text, 0)
+    assert repaired and json.loads(candidate) == expected
+    assert extract_json(text) == expected
+
+
+def test_every_truncation_repairs_to_a_prefix_of_the_document():
+    text = json.dumps(DOC, indent=1)
+    for cut in range(1, len(text)):
+        candidate, repaired = _scan(text[:cut], 0)
+        assert repaired, cut
+        partial = json.loads(candidate)
+        assert isinstance(partial, dict), cut
+        for key, value in partial.items():
+            assert key in DOC, cut
+            if not isinstance(value, (dict, list)):
+                assert value == DOC[key], cut
+
+
+def test_complete_object_is_returned_unrepaired():
+    text = json.dumps(DOC) + " trailing"
+    assert _scan(text, 0) == (json.dumps(DOC), False)
+
+
+def test_mismatched_brackets_are_not_repaired():
+    assert _scan('{"a": [1}', 0) is None
+    with pytest.raises(JsonExtractionError):
+        extract_json('{"a": [1}')
+
+
+@pytest.mark.parametrize("text", ["", "   ", "no json at all", "[1, 2, 3]", '"just a string"'])
+def test_no_object(text):
+    with pytest.raises(JsonExtractionError):
+        extract_json(text)
+
+
+def test_model_validation_rejects_repaired_but_incomplete_answers():
+    assert extract_json('{"program_name": "X", "total_credits": 120}', Program)["total_credits"] == 120
+    with pytest.raises(JsonExtractionError, match="Program"):
+        extract_json('{"program_name": "X", "total_cre', Program)
+    with pytest.raises(JsonExtractionError):
+        validate_json({"program_name": "X", "total_credits": "many"}, Program)
@@ -0,0 +1,47 @@
+import gc
+import asyncio
+import threading
+
+import openrouter_client
+from openrouter_client import close_client, get_client
+
+
+def test_one_client_per_loop_and_all_closed_on_shutdown():
+    # A second loop running in a thread, as an embedded caller or test harness might have
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        async def in_other_loop():
+            return get_client()
+
+        other = asyncio.run_coroutine_threadsafe(in_other_loop(), other_loop).result(5)
+
+        async def main():
+            client = get_client()
+            assert get_client() is client and client is not other
+            await close_client()
+            return client
+
+        client = asyncio.run(main())
+        assert client.is_closed
+        for _ in range(100):
+            if other.is_closed:
+                break
+            threading.Event().wait(0.01)
+        assert other.is_closed
+        assert len(openrouter_client._clients) == 0
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(5)
+        other_loop.close()
+
+
+def test_finished_loops_do_not_keep_clients():
+    async def create():
+        get_client()
+
+    asyncio.run(create())
+    asyncio.run(create())
+    gc.collect()
+    assert len(openrouter_client._clients) == 0
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+import pytest
+
+import outbound_scheduler as outbound
+from outbound_scheduler import OutboundScheduler, OutboundRejected, outbound_priority
+from gemini_scheduler import GeminiScheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setitem(outbound.OUTBOUND_PROVIDER_LIMITS, "test", 4)
+    monkeypatch.setitem(outbound.OUTBOUND_CLASS_SHARES, "standard", 0.75)
+    monkeypatch.setitem(outbound.OUTBOUND_CLASS_SHARES, "batch", 0.5)
+    for priority in outbound.PRIORITIES:
+        monkeypatch.setitem(outbound.OUTBOUND_QUEUE_LIMITS, priority, 1)
+        monkeypatch.setitem(outbound.OUTBOUND_MAX_WAIT, priority, 0.05)
+    return OutboundScheduler()
+
+
+_held = []
+
+
+def _hold(scheduler, count, priority, model="m"):
+    """Enter `count` slots and return their exit callbacks (kept referenced so they stay held)."""
+    exits = []
+    for _ in range(count):
+        cm = scheduler.slot("test", model, "x", priority)
+        cm.__enter__()
+        _held.append(cm)
+        exits.append(lambda cm=cm: cm.__exit__(None, None, None))
+    return exits
+
+
+@pytest.fixture(autouse=True)
+def _release_held():
+    yield
+    while _held:
+        _held.pop().__exit__(None, None, None)
+
+
+def test_class_shares_leave_room_for_higher_classes(scheduler):
+    _hold(scheduler, 2, "batch")
+    with pytest.raises(OutboundRejected) as rejected:
+        with scheduler.slot("test", "m", "x", "batch"):
+            pass
+    assert rejected.value.reason == "wait exceeded"
+    _hold(scheduler, 1, "standard")
+    with pytest.raises(OutboundRejected):
+        with scheduler.slot("test", "m", "x", "standard"):  # 3 of 4 used: the standard share
+            pass
+    _hold(scheduler, 1, "interactive")
+    assert scheduler.status()["providers"]["test"]["active"] == 4
+
+
+def test_queue_limit_refuses_immediately(scheduler, monkeypatch):
+    monkeypatch.setitem(outbound.OUTBOUND_MAX_WAIT, "batch", 5)
+    release = _hold(scheduler, 2, "batch")[0]
+    waiting = threading.Thread(target=_hold, args=(scheduler, 1, "batch"))
+    waiting.start()
+    while not scheduler.status()["queued"]["batch"]:
+        pass
+    with pytest.raises(OutboundRejected) as rejected:
+        with scheduler.slot("test", "m", "x", "batch"):
+            pass
+    assert rejected.value.reason == "queue full"
+    assert scheduler.status()["rejected"] == {"batch": 1}
+    release()  # the freed slot goes to the queued waiter
+    waiting.join(1)
+    assert not waiting.is_alive()
+
+
+def test_retry_after_follows_recent_call_time(scheduler):
+    _hold(scheduler, 1, "interactive")[0]()
+    assert scheduler._retry_after("test", "batch") == 1  # a near-instant call
+    scheduler._avg_hold["test"] = 20.0
+    assert scheduler._retry_after("test", "batch") == 5  # 20 s / 4 slots
+    scheduler._avg_hold["test"] = 1000.0
+    assert scheduler._retry_after("test", "batch") == 60
+
+
+def test_model_limit_does_not_block_other_models(scheduler, monkeypatch):
+    monkeypatch.setitem(outbound.OUTBOUND_MODEL_LIMITS, "test:slow", 1)
+    _hold(scheduler, 1, "interactive", model="slow")
+    with pytest.raises(OutboundRejected):
+        with scheduler.slot("test", "slow", "x", "interactive"):
+            pass
+    with scheduler.slot("test", "fast", "x", "interactive"):
+        assert scheduler.status()["providers"]["test"]["active"] == 2
+
+
+def test_async_slot_priority_from_context(scheduler):
+    async def main():
+        token = outbound_priority.set("batch")
+        try:
+            async with scheduler.aslot("test", "m", "chatbot"):
+                return scheduler.status()["providers"]["test"]["active_by_priority"]
+        finally:
+            outbound_priority.reset(token)
+
+    assert asyncio.run(main()) == {"interactive": 0, "standard": 0, "batch": 1}
+    assert scheduler.status()["providers"]["test"]["active"] == 0
+
+
+def test_refused_slot_hands_gemini_quota_back():
+    quota = GeminiScheduler(rpm=2, tpm=1000, max_wait=0, max_queue=4)
+    assert quota.acquire(10) == (True, "")
+    assert quota.acquire(20) == (True, "")
+    assert quota.acquire(10)[0] is False
+    quota.refund(20)
+    assert (quota.status()["requests_in_window"], quota.status()["tokens_in_window"]) == (1, 10)
+    assert quota.acquire(10) == (True, "")
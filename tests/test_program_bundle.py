@@ -0,0 +1,50 @@
+import asyncio
+
+import program_bundle
+from openrouter_client import UpstreamError
+
+CURRICULUM = {
+    "program_title": "B.Tech in Robotics", "program_type": "B.Tech", "domain": "Robotics",
+    "courses_by_semester": {
+        "Semester 1": [{"course_code": "RB101", "course_name": "Kinematics"}, {"course_code": "RB1XX"}],
+        "Semester 2": [{"course_code": "RB201", "course_name": "Control Systems"}],
+    },
+}
+
+
+def _run(curriculum, **kwargs):
+    async def collect():
+        return [event async for event in program_bundle.stream_program_bundle(curriculum, **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_calls_use_the_single_course_endpoint_arguments(monkeypatch):
+    calls = []
+
+    async def syllabus(course_name, program, domain, strict=False):
+        calls.append(("syllabus", course_name, program, domain, strict))
+        return f"# {course_name}"
+
+    async def resources(course_name, domain="", strict=False):
+        calls.append(("resources", course_name, domain, strict))
+        if course_name == "Control Systems":
+            raise UpstreamError("Resource service returned HTTP 502")
+        return {"books": []}
+
+    monkeypatch.setattr(program_bundle, "generate_syllabus", syllabus)
+    monkeypatch.setattr(program_bundle, "get_course_resources", resources)
+    events = _run(CURRICULUM)
+
+    # program is the program type, exactly what POST /generate-syllabus receives from the UI
+    assert sorted(calls) == [
+        ("resources", "Control Systems", "Robotics", True),
+        ("resources", "Kinematics", "Robotics", True),
+        ("syllabus", "Control Systems", "B.Tech", "Robotics", True),
+        ("syllabus", "Kinematics", "B.Tech", "Robotics", True),
+    ]
+    assert events[0] == {"type": "start", "program_title": "B.Tech in Robotics", "domain": "Robotics",
+                         "total_courses": 2}
+    courses = {event["course_code"]: event for event in events if event["type"] == "course"}
+    assert courses["RB101"]["status"] == "ok" and courses["RB101"]["syllabus"] == "# Kinematics"
+    assert courses["RB201"]["status"] == "error" and courses["RB201"]["resources"] is None
+    assert "502" in courses["RB201"]["errors"]["resources"]